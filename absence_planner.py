@@ -0,0 +1,151 @@
+"""
+Interval-based absence planning shared by the generator scripts.
+
+Each user's free working days are kept as a sorted list of gaps, i.e. the
+half-open index ranges [start, end) of WorkCalendar.working_days() that are not
+taken yet. Placing a period of n working days draws one of the valid start
+positions over all gaps uniformly and splits the gap it lands in, so a period
+is placed in one pass over a handful of gaps instead of by retrying random
+offsets. When no gap is long enough the period is shortened, and planning stops
+once the user has no free day left, so it always terminates.
+
+From one plan the generators emit both data files:
+
+- full-day absences (vacation, sick leave) are skipped in timetrackings.json
+- half days become short days with about half the work time
+- absences.json gets one row per period, as described in
+  .gitlab/absences_instruction.md (`duration` counts the calendar days from
+  from_date to to_date, "0.5" for a half day)
+"""
+import random
+from collections import namedtuple
+
+# kind -> (type_id, subtype_id)
+ABSENCE_TYPES = {
+    "vacation": ("1", "0"),
+    "sick": ("3", "11"),
+    "half_day": ("1", "0"),
+}
+FULL_DAY_KINDS = ("vacation", "sick")
+
+# A planned absence: kind from ABSENCE_TYPES, first and last day (datetimes)
+Absence = namedtuple("Absence", "kind first last")
+
+
+class FreeSlots:
+    """Free working-day indexes of one user as a sorted list of [start, end) gaps"""
+
+    def __init__(self, size):
+        self.gaps = [(0, size)] if size > 0 else []
+
+    def positions(self, length):
+        """Number of start indexes where `length` consecutive free days fit"""
+        return sum(max(0, end - start - length + 1) for start, end in self.gaps)
+
+    def allocate(self, length, rng=random):
+        """Take `length` consecutive free days at a uniformly drawn position
+
+        Returns the first index, or None if no gap is long enough.
+        """
+        choice = rng.randrange(self.positions(length) or 1)
+        for i, (start, end) in enumerate(self.gaps):
+            fits = end - start - length + 1
+            if fits <= 0:
+                continue
+            if choice < fits:
+                first = start + choice
+                self.gaps[i:i + 1] = [gap for gap in ((start, first), (first + length, end)) if gap[0] < gap[1]]
+                return first
+            choice -= fits
+        return None
+
+    def allocate_up_to(self, length, rng=random):
+        """Like allocate(), shortening the period until it fits; (first, length) or None"""
+        for size in range(length, 0, -1):
+            first = self.allocate(size, rng)
+            if first is not None:
+                return first, size
+        return None
+
+
+def vacation_period_length(remaining, rng=random):
+    """Periods of 3-5 days while enough is left, then the rest"""
+    if remaining >= 5:
+        return rng.randint(3, 5)
+    if remaining >= 3:
+        return rng.randint(2, remaining)
+    return remaining
+
+
+def sick_period_length(remaining, rng=random):
+    return rng.randint(1, min(3, remaining))
+
+
+def plan_absences(working_days, vacation_days=15, sick_days=0, half_days=0, rng=random):
+    """Place vacation, sick and half-day periods on a user's working days
+
+    Returns Absence tuples sorted by date.
+    """
+    slots = FreeSlots(len(working_days))
+    absences = []
+    for kind, total, period_length in (("vacation", vacation_days, vacation_period_length),
+                                       ("sick", sick_days, sick_period_length),
+                                       ("half_day", half_days, lambda remaining, rng: 1)):
+        remaining = total
+        while remaining > 0:
+            placed = slots.allocate_up_to(period_length(remaining, rng), rng)
+            if placed is None:
+                break
+            first, length = placed
+            absences.append(Absence(kind, working_days[first], working_days[first + length - 1]))
+            remaining -= length
+    return sorted(absences, key=lambda a: a.first)
+
+
+def absences_from_days(calendar, vacation_days=(), half_days=()):
+    """Absences for an existing day-level plan: runs of consecutive working days
+    become one vacation period, short days become half days"""
+    absences = []
+    run = []
+    for day in sorted(vacation_days):
+        # Consecutive working days have no other working day in between
+        if run and calendar.count_working_days(run[-1], day) != 2:
+            absences.append(Absence("vacation", run[0], run[-1]))
+            run = []
+        run.append(day)
+    if run:
+        absences.append(Absence("vacation", run[0], run[-1]))
+    absences += [Absence("half_day", day, day) for day in half_days]
+    return sorted(absences, key=lambda a: a.first)
+
+
+def absent_days(calendar, absences):
+    """Working days covered by full-day absences; they get no timetrackings"""
+    days = []
+    for absence in absences:
+        if absence.kind in FULL_DAY_KINDS:
+            days.extend(calendar.working_days(absence.first, absence.last))
+    return days
+
+
+def half_day_dates(absences):
+    return [absence.first for absence in absences if absence.kind == "half_day"]
+
+
+def absence_rows(user_id, absences):
+    """absences.json rows of one user"""
+    for absence in absences:
+        type_id, subtype_id = ABSENCE_TYPES[absence.kind]
+        if absence.kind == "half_day":
+            duration = "0.5"
+        else:
+            duration = str((absence.last - absence.first).days + 1)
+        yield {
+            "user_id": str(user_id),
+            "type_id": type_id,
+            "subtype_id": subtype_id,
+            "from_date": absence.first.strftime("%Y-%m-%d"),
+            "to_date": absence.last.strftime("%Y-%m-%d"),
+            "duration": duration,
+            "replacement_user_id": "0",
+        }
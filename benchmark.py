@@ -0,0 +1,322 @@
+"""
+Benchmarks for the generators and the upload path.
+
+Every case runs in a fresh process, so peak memory (max RSS) is measured per
+case and one case cannot warm up or fragment the heap of the next:
+
+    python benchmark.py                          # tiny + small scales
+    python benchmark.py --scale medium large     # up to 10k users x 1 year
+    python benchmark.py --case generate_python write_ndjson
+    python benchmark.py --save                   # store results as the baseline
+    python benchmark.py --compare                # fail on regressions against the baseline
+
+Cases
+    daily_timetrackings  generate_daily_timetrackings() for every user-day
+    working_days         WorkCalendar build + per-user masks and lookups
+    plan_absences        vacation/sick/half-day periods for every user (absence_planner.py)
+    generate_batches     multi-user generation into TimetrackingBatches, no formatting
+    generate_python      full multi-user generation, pure-Python backend
+    generate_numpy       the same with the NumPy backend (skipped without numpy)
+    write_json           JSON array serialization to disk
+    write_ndjson         NDJSON serialization to disk
+    write_npz            columnar .npz serialization to disk (skipped without numpy)
+    read_npz             generate into .npz, then iterate it memory-mapped as row dicts (skipped without numpy)
+    upload_mock          uploader.py against the local mock server
+
+A comparison fails when throughput drops or peak memory grows by more than
+--tolerance (default 20%). Baselines depend on the machine, so save one per
+machine before comparing.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import generate_multi_user_timetrackings as gen
+from work_calendar import WorkCalendar
+
+BASELINE_FILE = "benchmark_baseline.json"
+
+# name -> (users, first day, last day)
+SCALES = {
+    "tiny": (3, "2025-04-01", "2025-05-31"),
+    "small": (100, "2025-01-01", "2025-06-30"),
+    "medium": (1000, "2025-01-01", "2025-12-31"),
+    "large": (10000, "2025-01-01", "2025-12-31"),
+}
+DEFAULT_SCALES = ["tiny", "small"]
+
+# Uploads are network bound; larger scales only upload this many rows
+UPLOAD_ROW_CAP = 20000
+
+
+def _scale_setup(scale, seed=1):
+    users, start, end = SCALES[scale]
+    calendar = WorkCalendar(datetime.strptime(start, "%Y-%m-%d"), datetime.strptime(end, "%Y-%m-%d"))
+    user_ids = list(range(1, users + 1))
+    _, vacation, short = gen.plan_users(user_ids, calendar, 30, seed)
+    return calendar, user_ids, vacation, short
+
+
+def _sample_entries(count=5000, seed=1):
+    """A fixed block of realistic entries, repeated for serialization benchmarks"""
+    calendar, user_ids, vacation, short = _scale_setup("tiny", seed)
+    return list(itertools.islice(gen.generate_timetrackings(user_ids, calendar, vacation, short, seed), count))
+
+
+def _rows_for_scale(scale):
+    users, start, end = SCALES[scale]
+    calendar = WorkCalendar(datetime.strptime(start, "%Y-%m-%d"), datetime.strptime(end, "%Y-%m-%d"))
+    # About 7 entries per working day and user
+    return users * len(calendar) * 7
+
+
+# ==================================================================================
+# Cases: each takes a scale and returns the number of rows (or items) processed
+# ==================================================================================
+
+def case_daily_timetrackings(scale):
+    calendar, user_ids, _, _ = _scale_setup(scale)
+    rng = random.Random(1)
+    days = calendar.working_days()
+    rows = 0
+    for user_id in user_ids:
+        for day in days:
+            for _ in gen.generate_daily_timetrackings(day, user_id, False, rng):
+                rows += 1
+    return rows
+
+
+def case_working_days(scale):
+    users, start, end = SCALES[scale]
+    first, last = datetime.strptime(start, "%Y-%m-%d"), datetime.strptime(end, "%Y-%m-%d")
+    calendar = WorkCalendar(first, last)
+    days = calendar.working_days()
+    lookups = 0
+    for user_id in range(users):
+        mask = calendar.user_mask(days[user_id % 7::29], days[user_id % 5::31])
+        for day in days:
+            calendar.flags(mask, day)
+            lookups += 1
+        calendar.count_working_days(days[0], days[-1])
+    return lookups
+
+
+def case_plan_absences(scale):
+    from absence_planner import plan_absences
+    calendar, user_ids, _, _ = _scale_setup(scale)
+    days = calendar.working_days()
+    rng = random.Random(1)
+    return sum(len(plan_absences(days, 25, 5, 3, rng)) for _ in user_ids)
+
+
+def case_generate_batches(scale):
+    calendar, user_ids, vacation, short = _scale_setup(scale)
+    return sum(len(b) for b in gen.generate_batches(user_ids, calendar, vacation, short, 1))
+
+
+def case_generate_python(scale):
+    calendar, user_ids, vacation, short = _scale_setup(scale)
+    return sum(1 for _ in gen.generate_timetrackings(user_ids, calendar, vacation, short, 1))
+
+
+def case_generate_numpy(scale):
+    calendar, user_ids, vacation, short = _scale_setup(scale)
+    entries = gen.generate_timetrackings_with_backend("numpy", user_ids, calendar, vacation, short, 1)
+    return sum(1 for _ in entries)
+
+
+def _write(scale, suffix):
+    from streaming import write_entries
+    sample = _sample_entries()
+    rows = _rows_for_scale(scale)
+    entries = itertools.islice(itertools.cycle(sample), rows)
+    with tempfile.TemporaryDirectory() as tmp:
+        return write_entries(entries, os.path.join(tmp, "timetrackings" + suffix))
+
+
+def case_write_json(scale):
+    return _write(scale, ".json")
+
+
+def case_write_ndjson(scale):
+    return _write(scale, ".ndjson")
+
+
+def case_write_npz(scale):
+    return _write(scale, ".npz")
+
+
+def case_read_npz(scale):
+    from columnar import ColumnarFile, write_batches
+    calendar, user_ids, vacation, short = _scale_setup(scale)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "timetrackings.npz")
+        write_batches(gen.generate_batches(user_ids, calendar, vacation, short, 1), path)
+        return sum(1 for _ in ColumnarFile(path))
+
+
+def case_upload_mock(scale):
+    from mock_server import MockServer
+    from uploader import Uploader, load_collection
+
+    rows = list(itertools.islice(itertools.cycle(_sample_entries()), min(_rows_for_scale(scale), UPLOAD_ROW_CAP)))
+
+    async def upload():
+        async with MockServer() as server:
+            env = {"url": server.url, "account": "bench", "version": "v3", "access_token": "bench"}
+            uploader = Uploader(env, load_collection(), concurrency=32, rng=random.Random(1))
+            try:
+                stats = await uploader.upload("timetrackings", rows)
+            finally:
+                await uploader.close()
+            return stats.ok
+
+    return asyncio.run(upload())
+
+
+CASES = {name[len("case_"):]: fn for name, fn in globals().items() if name.startswith("case_")}
+NUMPY_CASES = {"generate_numpy", "write_npz", "read_npz"}
+
+
+# ==================================================================================
+# Runner
+# ==================================================================================
+
+def _reset_peak_rss():
+    """Reset the kernel's peak RSS counter (Linux); the spawned child otherwise
+    inherits the parent's peak, since ru_maxrss survives fork + exec"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _max_rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def _run_case(name, scale):
+    """Child process: run one case and measure it"""
+    _reset_peak_rss()
+    started = time.perf_counter()
+    rows = CASES[name](scale)
+    elapsed = time.perf_counter() - started
+    return {"case": name, "scale": scale, "rows": rows, "seconds": round(elapsed, 4),
+            "rows_per_s": round(rows / elapsed, 1) if elapsed > 0 else 0.0,
+            "peak_rss_mb": round(_max_rss_mb(), 1)}
+
+
+def run_benchmark(name, scale):
+    """Run a case in a fresh interpreter so peak memory belongs to this case alone"""
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(1) as pool:
+        return pool.apply(_run_case, (name, scale))
+
+
+def _numpy_available():
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def compare(results, baseline, tolerance):
+    """Return regressions: throughput or peak memory worse than the baseline by > tolerance"""
+    previous = {(r["case"], r["scale"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for r in results:
+        before = previous.get((r["case"], r["scale"]))
+        if before is None:
+            continue
+        if r["rows_per_s"] < before["rows_per_s"] * (1 - tolerance):
+            regressions.append(f"{r['case']}[{r['scale']}]: {r['rows_per_s']} rows/s "
+                               f"(baseline {before['rows_per_s']})")
+        if r["peak_rss_mb"] > before["peak_rss_mb"] * (1 + tolerance):
+            regressions.append(f"{r['case']}[{r['scale']}]: peak {r['peak_rss_mb']} MB "
+                               f"(baseline {before['peak_rss_mb']})")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark generation, serialization and upload")
+    parser.add_argument("--case", nargs="+", choices=sorted(CASES), default=sorted(CASES), help="Cases to run")
+    parser.add_argument("--scale", nargs="+", choices=list(SCALES), default=DEFAULT_SCALES,
+                        help="tiny=3 users x 2 months ... large=10k users x 1 year")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="Baseline results file")
+    parser.add_argument("--save", action="store_true", help="Save the results as the new baseline")
+    parser.add_argument("--compare", action="store_true", help="Exit 1 on regressions against the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression")
+    parser.add_argument("--json", dest="json_out", help="Also write the results to this file")
+    args = parser.parse_args(argv)
+
+    results = []
+    print(f"{'case':<20} {'scale':<7} {'rows':>11} {'seconds':>9} {'rows/s':>12} {'peak MB':>8}")
+    for scale in args.scale:
+        for name in args.case:
+            if name in NUMPY_CASES and not _numpy_available():
+                continue
+            r = run_benchmark(name, scale)
+            results.append(r)
+            print(f"{r['case']:<20} {r['scale']:<7} {r['rows']:>11} {r['seconds']:>9} "
+                  f"{r['rows_per_s']:>12} {r['peak_rss_mb']:>8}")
+
+    report = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump(report, f, indent=2)
+
+    status = 0
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            print(f"\n⚠️  No baseline at {args.baseline}; run with --save first")
+        else:
+            with open(args.baseline) as f:
+                regressions = compare(results, json.load(f), args.tolerance)
+            if regressions:
+                print("\n❌ Regressions:")
+                for regression in regressions:
+                    print(f"  - {regression}")
+                status = 1
+            else:
+                print(f"\n✅ No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+    if args.save:
+        if os.path.exists(args.baseline):
+            # Keep baselines of cases/scales that were not run this time
+            with open(args.baseline) as f:
+                kept = [r for r in json.load(f).get("results", [])
+                        if (r["case"], r["scale"]) not in {(n["case"], n["scale"]) for n in results}]
+            report["results"] = kept + results
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Baseline saved to {args.baseline}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+"""
+Content-addressed cache of generated per-(user, month) timetracking chunks.
+
+`generate_multi_user_timetrackings.py --cache-dir .chunk_cache` splits the
+dataset into one chunk per user and month. Each chunk is keyed by a hash of
+everything it depends on: seed, user id, month, the month's working days (so
+the holiday set and the requested date range), the vacation setting, the task
+ids and the generator code. A chunk whose key is already cached is read back
+instead of generated; only new and changed chunks cost generation time.
+
+Each run also records which key it emitted for every (user, month) of its
+output file in a manifest. The next run compares against it to write a delta
+of the rows that are new or changed since then, and to list the rows that
+disappeared:
+
+    python chunk_cache.py info                 # chunks, size, manifests
+    python chunk_cache.py prune                # drop chunks no manifest refers to
+    python chunk_cache.py clear
+
+Chunks are TimetrackingBatch columns as raw int32, 16 bytes per entry.
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+from array import array
+from collections import Counter
+
+from timetracking_batch import TimetrackingBatch
+
+CHUNK_CACHE_DIR = ".chunk_cache"
+# Bump when the chunk file layout changes
+CHUNK_FORMAT = b"TTC1"
+MANIFEST_DIR = "manifests"
+
+
+def chunk_key(**parts):
+    """sha256 over the canonical JSON of everything a chunk depends on"""
+    blob = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+def rows_of(batch):
+    return zip(batch.user_ids, batch.task_ids, batch.starts, batch.ends)
+
+
+def diff_rows(new, old):
+    """(rows only in new, rows only in old) of two batches, as multisets"""
+    if old is None:
+        return new, TimetrackingBatch()
+    remaining = Counter(rows_of(old))
+    added = TimetrackingBatch()
+    for row in rows_of(new):
+        if remaining[row]:
+            remaining[row] -= 1
+        else:
+            added.append(*row)
+    removed = TimetrackingBatch()
+    for row in rows_of(old):
+        if remaining[row]:
+            remaining[row] -= 1
+            removed.append(*row)
+    return added, removed
+
+
+class ChunkCache:
+    """Directory of <key[:2]>/<key>.bin chunk files plus per-output manifests"""
+
+    def __init__(self, directory=CHUNK_CACHE_DIR):
+        self.directory = directory
+        os.makedirs(os.path.join(directory, MANIFEST_DIR), exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".bin")
+
+    def __contains__(self, key):
+        return os.path.exists(self._path(key))
+
+    def load(self, key):
+        """The cached batch for key, or None"""
+        try:
+            with open(self._path(key), "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        if data[:4] != CHUNK_FORMAT:
+            return None
+        columns = [array("i") for _ in range(4)]
+        size = (len(data) - 4) // 4
+        for i, column in enumerate(columns):
+            column.frombytes(data[4 + i * size:4 + (i + 1) * size])
+        return TimetrackingBatch.from_columns(*columns)
+
+    def store(self, key, batch):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(CHUNK_FORMAT)
+            for column in (batch.user_ids, batch.task_ids, batch.starts, batch.ends):
+                column.tofile(f)
+        os.replace(tmp, path)
+
+    # ------------------------------------------------------------------
+    # Manifests: {"<user>:<YYYY-MM>": key} of the last run per output file
+    # ------------------------------------------------------------------
+
+    def _manifest_path(self, output):
+        name = os.path.basename(output)
+        digest = hashlib.sha256(os.path.abspath(output).encode()).hexdigest()[:12]
+        return os.path.join(self.directory, MANIFEST_DIR, f"{name}-{digest}.json")
+
+    def load_manifest(self, output):
+        try:
+            with open(self._manifest_path(output)) as f:
+                return json.load(f)["chunks"]
+        except (OSError, ValueError, KeyError):
+            return {}
+
+    def save_manifest(self, output, chunks):
+        path = self._manifest_path(output)
+        with open(path + ".tmp", "w") as f:
+            json.dump({"output": os.path.abspath(output), "chunks": chunks}, f, indent=1)
+        os.replace(path + ".tmp", path)
+
+    def manifests(self):
+        directory = os.path.join(self.directory, MANIFEST_DIR)
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(".json"):
+                with open(os.path.join(directory, name)) as f:
+                    yield json.load(f)
+
+    def keys(self):
+        for sub in sorted(os.listdir(self.directory)):
+            path = os.path.join(self.directory, sub)
+            if sub != MANIFEST_DIR and os.path.isdir(path):
+                for name in os.listdir(path):
+                    if name.endswith(".bin"):
+                        yield name[:-len(".bin")]
+
+    def prune(self):
+        """Delete chunks that no manifest refers to; returns how many"""
+        referenced = {key for manifest in self.manifests() for key in manifest["chunks"].values()}
+        removed = 0
+        for key in list(self.keys()):
+            if key not in referenced:
+                os.remove(self._path(key))
+                removed += 1
+        return removed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect or clean the generator's chunk cache")
+    parser.add_argument("--cache-dir", default=CHUNK_CACHE_DIR, help="Chunk cache directory")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("info", help="Show chunk count, size and manifests")
+    commands.add_parser("prune", help="Delete chunks no manifest refers to")
+    commands.add_parser("clear", help="Delete the whole cache")
+    args = parser.parse_args(argv)
+
+    if args.command == "clear":
+        shutil.rmtree(args.cache_dir, ignore_errors=True)
+        print(f"🗑️  Removed {args.cache_dir}")
+        return 0
+    cache = ChunkCache(args.cache_dir)
+    if args.command == "prune":
+        print(f"🗑️  Removed {cache.prune()} unreferenced chunks")
+        return 0
+    keys = list(cache.keys())
+    size = sum(os.path.getsize(cache._path(k)) for k in keys)
+    print(f"{args.cache_dir}: {len(keys)} chunks, {size / 1e6:.1f} MB")
+    for manifest in cache.manifests():
+        print(f"  {manifest['output']}: {len(manifest['chunks'])} chunks")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
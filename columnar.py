@@ -0,0 +1,431 @@
+"""
+Columnar binary data files (.npz) for generated timetrackings and absences.
+
+An .npz file holds one uncompressed NumPy column per field instead of a JSON
+object per row: ids as int32, timestamps as epoch minutes, dates as epoch days
+and other strings (e.g. an absence's duration) dictionary-encoded. A year of
+timetrackings for 1000 users is about 28 MB instead of 260 MB of indented JSON,
+and the files still open with plain `numpy.load()`.
+
+    python generate_multi_user_timetrackings.py --users 1-1000 --output test_data/timetrackings.npz
+    python columnar.py to-json test_data/timetrackings.npz test_data/timetrackings.json
+    python columnar.py from-json test_data/absences.json test_data/absences.npz
+    python columnar.py info test_data/timetrackings.npz
+
+Writers stream rows (or whole TimetrackingBatches) into per-column temp files
+and assemble the archive at the end, so memory stays flat. ColumnarFile
+memory-maps the columns straight out of the archive (members are stored, not
+deflated) and only builds the API's strings for the chunk being iterated.
+
+`to-json` streams into the JSON array Newman reads with `-d` (or NDJSON, by
+extension). create_test_data.sh and uploader.py pick up `test_data/<folder>.npz`
+instead of the .json when it is the newer of the two, and say so.
+
+NumPy is optional for everything else; only this format requires it.
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import struct
+import sys
+import tempfile
+import zipfile
+from array import array
+from datetime import date
+from functools import lru_cache
+
+from timetracking_batch import EPOCH_ORDINAL, MINUTES_PER_DAY, TimestampFormatter
+
+COLUMNAR_EXTENSIONS = (".npz",)
+SCHEMA_MEMBER = "__schema__.json"
+# Rows buffered per column before they are appended to the column's temp file
+FLUSH_ROWS = 65536
+# Rows formatted at a time when iterating a ColumnarFile
+READ_CHUNK = 8192
+
+# Column kinds: (array typecode, NumPy dtype)
+KINDS = {
+    "int": ("i", "<i4"),       # canonical integer strings, e.g. "51"
+    "minute": ("i", "<i4"),    # "YYYY-MM-DD HH:MM:00" as minutes since 1970-01-01
+    "day": ("i", "<i4"),       # "YYYY-MM-DD" as days since 1970-01-01
+    "text": ("i", "<i4"),      # anything else: codes into a table of distinct values
+}
+
+# Kinds of the known API fields; fields not listed here are inferred from the first row
+FIELD_KINDS = {
+    "user_id": "int",
+    "task_id": "int",
+    "start_time": "minute",
+    "end_time": "minute",
+    "type_id": "int",
+    "subtype_id": "int",
+    "from_date": "day",
+    "to_date": "day",
+    "duration": "text",
+    "replacement_user_id": "int",
+}
+
+TIMETRACKING_FIELDS = ("user_id", "task_id", "start_time", "end_time")
+
+_DATETIME = re.compile(r"\d{4}-\d{2}-\d{2} \d{2}:\d{2}:00\Z")
+_DATE = re.compile(r"\d{4}-\d{2}-\d{2}\Z")
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise SystemExit("Columnar .npz data files require numpy (pip install numpy)") from None
+    return numpy
+
+
+def is_columnar(path):
+    return path.endswith(COLUMNAR_EXTENSIONS)
+
+
+def columnar_sibling(path):
+    """<name>.npz next to a .json/.ndjson data file"""
+    return os.path.splitext(path)[0] + COLUMNAR_EXTENSIONS[0]
+
+
+# .npz files already reported as replacing their JSON file in this process
+_announced = set()
+
+
+def resolve_data_file(path):
+    """The .npz sibling of a data file when it exists and is newer, else the file itself
+
+    Replacing an existing file is reported on stderr, once per process.
+    """
+    sibling = columnar_sibling(path)
+    if sibling == path or not os.path.exists(sibling):
+        return path
+    if not os.path.exists(path):
+        return sibling
+    if os.path.getmtime(sibling) > os.path.getmtime(path):
+        if sibling not in _announced:
+            _announced.add(sibling)
+            print(f"📦 Using {sibling}: it is newer than {path} (delete or touch one to change this)",
+                  file=sys.stderr)
+        return sibling
+    return path
+
+
+def infer_kind(value):
+    value = str(value)
+    if _DATETIME.match(value):
+        return "minute"
+    if _DATE.match(value):
+        return "day"
+    if value.lstrip("-").isdigit() and str(int(value)) == value:
+        return "int"
+    return "text"
+
+
+# ==================================================================================
+# Encoding
+# ==================================================================================
+
+def _encode_int(value):
+    number = int(value)
+    if str(number) != str(value):
+        raise ValueError(f"{value!r} is not a canonical integer")
+    return number
+
+
+@lru_cache(maxsize=4096)
+def _encode_day(value):
+    if not _DATE.match(value):
+        raise ValueError(f"{value!r} is not a YYYY-MM-DD date")
+    return date.fromisoformat(value).toordinal() - EPOCH_ORDINAL
+
+
+def _encode_minute(value):
+    if not _DATETIME.match(value):
+        raise ValueError(f"{value!r} is not a 'YYYY-MM-DD HH:MM:00' timestamp")
+    return (_encode_day(value[:10]) * MINUTES_PER_DAY
+            + int(value[11:13]) * 60 + int(value[14:16]))
+
+
+class _Column:
+    """One column being written: a buffer, its temp file and, for text, the value table"""
+
+    def __init__(self, field, kind, path):
+        self.field = field
+        self.kind = kind
+        self.path = path
+        self.file = open(self.path, "wb")
+        self.buffer = array(KINDS[kind][0])
+        self.codes = {} if kind == "text" else None
+        self.encode = {"int": _encode_int, "day": _encode_day, "minute": _encode_minute,
+                       "text": self._encode_text}[kind]
+
+    def _encode_text(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.codes)
+        return code
+
+    def append(self, value):
+        try:
+            self.buffer.append(self.encode(value))
+        except (ValueError, TypeError, OverflowError) as e:
+            raise ValueError(f"{self.field}: {e} (column kind {self.kind})") from None
+
+    def flush(self):
+        self.buffer.tofile(self.file)
+        del self.buffer[:]
+
+    def extend(self, values):
+        """Append a whole typed array, e.g. a TimetrackingBatch column"""
+        self.flush()
+        values.tofile(self.file)
+
+
+class ColumnarWriter:
+    """Streams rows into an .npz archive with one column per field
+
+        with ColumnarWriter("test_data/absences.npz") as writer:
+            for row in rows:
+                writer.write(row)
+    """
+
+    def __init__(self, path, kinds=None):
+        self.path = path
+        self.kinds = dict(FIELD_KINDS, **(kinds or {}))
+        self.columns = None
+        self.count = 0
+        self._pending = 0
+        self._tmp = tempfile.mkdtemp(prefix=".columns-", dir=os.path.dirname(os.path.abspath(path)))
+
+    def _start(self, fields):
+        self.columns = [_Column(field, kind, os.path.join(self._tmp, f"{i:03d}.bin"))
+                        for i, (field, kind) in enumerate(fields)]
+
+    def write(self, row):
+        if self.columns is None:
+            self._start([(field, self.kinds.get(field) or infer_kind(value)) for field, value in row.items()])
+        if len(row) != len(self.columns):
+            raise ValueError(f"row {self.count} has fields {sorted(row)}, expected "
+                             f"{[c.field for c in self.columns]} (every row needs the same fields)")
+        for column in self.columns:
+            try:
+                value = row[column.field]
+            except KeyError:
+                raise ValueError(f"row {self.count} has no {column.field!r}") from None
+            column.append(value)
+        self.count += 1
+        self._pending += 1
+        if self._pending >= FLUSH_ROWS:
+            for column in self.columns:
+                column.flush()
+            self._pending = 0
+
+    def write_batch(self, batch):
+        """Append a TimetrackingBatch without formatting it"""
+        if self.columns is None:
+            self._start([(field, FIELD_KINDS[field]) for field in TIMETRACKING_FIELDS])
+        if [c.field for c in self.columns] != list(TIMETRACKING_FIELDS):
+            raise ValueError("batches can only be written to a timetrackings file")
+        for column, values in zip(self.columns, (batch.user_ids, batch.task_ids, batch.starts, batch.ends)):
+            column.extend(values)
+        self.count += len(batch)
+
+    def close(self):
+        """Assemble the archive from the column files and remove them"""
+        np = _numpy()
+        try:
+            for column in self.columns or []:
+                column.flush()
+                column.file.close()
+            schema = {"rows": self.count,
+                      "columns": [{"field": c.field, "kind": c.kind} for c in self.columns or []]}
+            tmp_path = os.path.join(self._tmp, "archive.npz")
+            with zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_STORED, allowZip64=True) as archive:
+                archive.writestr(SCHEMA_MEMBER, json.dumps(schema, indent=2))
+                for column in self.columns or []:
+                    header = {"descr": KINDS[column.kind][1], "fortran_order": False, "shape": (self.count,)}
+                    with archive.open(f"{column.field}.npy", "w", force_zip64=True) as member, \
+                            open(column.path, "rb") as data:
+                        np.lib.format.write_array_header_2_0(member, header)
+                        shutil.copyfileobj(data, member)
+                    if column.codes is not None:
+                        with archive.open(f"{column.field}.values.npy", "w", force_zip64=True) as member:
+                            np.save(member, np.array(list(column.codes) or [""]))
+            os.replace(tmp_path, self.path)
+        finally:
+            shutil.rmtree(self._tmp, ignore_errors=True)
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            for column in self.columns or []:
+                column.file.close()
+            shutil.rmtree(self._tmp, ignore_errors=True)
+
+
+def write_rows(rows, path, kinds=None):
+    """Write row dicts to an .npz file and return the count"""
+    with ColumnarWriter(path, kinds) as writer:
+        for row in rows:
+            writer.write(row)
+    return writer.count
+
+
+def write_batches(batches, path):
+    """Write TimetrackingBatches to an .npz file and return the entry count"""
+    with ColumnarWriter(path) as writer:
+        for batch in batches:
+            writer.write_batch(batch)
+    return writer.count
+
+
+# ==================================================================================
+# Reading
+# ==================================================================================
+
+def _member_offset(f, info):
+    """File offset of a stored zip member's data"""
+    f.seek(info.header_offset)
+    header = f.read(30)
+    if header[:4] != b"PK\x03\x04":
+        raise ValueError(f"bad local header for {info.filename}")
+    name_length, extra_length = struct.unpack("<HH", header[26:30])
+    return info.header_offset + 30 + name_length + extra_length
+
+
+class ColumnarFile:
+    """Read-only view of an .npz data file with memory-mapped columns
+
+    Iterating yields the rows as the same string dicts the JSON file would
+    contain; `column(field)` gives the raw NumPy column without a copy.
+    """
+
+    def __init__(self, path):
+        np = _numpy()
+        self.path = path
+        self._columns = {}
+        self._values = {}
+        with zipfile.ZipFile(path) as archive, open(path, "rb") as f:
+            schema = json.loads(archive.read(SCHEMA_MEMBER))
+            self.rows = schema["rows"]
+            self.kinds = {c["field"]: c["kind"] for c in schema["columns"]}
+            for field, kind in self.kinds.items():
+                info = archive.getinfo(f"{field}.npy")
+                if info.compress_type != zipfile.ZIP_STORED:
+                    raise ValueError(f"{path}: column {field} is compressed and cannot be memory-mapped")
+                f.seek(_member_offset(f, info))
+                if np.lib.format.read_magic(f) == (1, 0):
+                    shape, _, dtype = np.lib.format.read_array_header_1_0(f)
+                else:
+                    shape, _, dtype = np.lib.format.read_array_header_2_0(f)
+                if shape[0]:
+                    self._columns[field] = np.memmap(path, dtype=dtype, mode="r", offset=f.tell(), shape=shape)
+                else:
+                    self._columns[field] = np.empty(shape, dtype=dtype)
+                if kind == "text":
+                    with archive.open(f"{field}.values.npy") as member:
+                        self._values[field] = np.lib.format.read_array(member).tolist()
+
+    @property
+    def fields(self):
+        return list(self.kinds)
+
+    def __len__(self):
+        return self.rows
+
+    def column(self, field):
+        return self._columns[field]
+
+    def to_batch(self, first=0, end=None):
+        """Rows [first, end) of a timetrackings file as a TimetrackingBatch"""
+        from timetracking_batch import TimetrackingBatch
+        return TimetrackingBatch.from_columns(*(self._columns[f][first:end] for f in TIMETRACKING_FIELDS))
+
+    def _formatter(self, field):
+        kind = self.kinds[field]
+        if kind == "int":
+            return str
+        if kind == "minute":
+            return TimestampFormatter()
+        if kind == "day":
+            days = {}
+
+            def day(value):
+                text = days.get(value)
+                if text is None:
+                    text = days[value] = date.fromordinal(value + EPOCH_ORDINAL).isoformat()
+                return text
+            return day
+        return self._values[field].__getitem__
+
+    def iter_rows(self, first=0, end=None):
+        """Yield rows [first, end) as dicts of strings, READ_CHUNK rows at a time"""
+        end = self.rows if end is None else min(end, self.rows)
+        formatters = [(field, self._formatter(field)) for field in self.kinds]
+        for start in range(first, end, READ_CHUNK):
+            stop = min(start + READ_CHUNK, end)
+            chunk = [list(map(fmt, self._columns[field][start:stop].tolist())) for field, fmt in formatters]
+            fields = [field for field, _ in formatters]
+            for values in zip(*chunk):
+                yield dict(zip(fields, values))
+
+    __iter__ = iter_rows
+
+    def __getitem__(self, index):
+        return next(self.iter_rows(index, index + 1))
+
+    def close(self):
+        # Memory maps are released once the arrays are garbage collected
+        self._columns.clear()
+
+
+# ==================================================================================
+# CLI
+# ==================================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert between .npz columnar data files and JSON/NDJSON")
+    commands = parser.add_subparsers(dest="command", required=True)
+    to_json = commands.add_parser("to-json", help="Stream an .npz file into a JSON array (or .ndjson)")
+    to_json.add_argument("source")
+    to_json.add_argument("target")
+    from_json = commands.add_parser("from-json", help="Convert a JSON/NDJSON data file to .npz")
+    from_json.add_argument("source")
+    from_json.add_argument("target")
+    from_json.add_argument("--text", nargs="+", default=[], metavar="FIELD",
+                           help="Store these fields as text columns instead of the inferred kind")
+    info = commands.add_parser("info", help="Show rows, columns and size of an .npz file")
+    info.add_argument("source")
+    args = parser.parse_args(argv)
+
+    from streaming import iter_rows, write_entries
+
+    if args.command == "to-json":
+        count = write_entries(ColumnarFile(args.source), args.target)
+    elif args.command == "from-json":
+        try:
+            count = write_rows(iter_rows(args.source), args.target, {field: "text" for field in args.text})
+        except ValueError as e:
+            print(f"❌ {e}", file=sys.stderr)
+            return 1
+    else:
+        data = ColumnarFile(args.source)
+        print(f"{args.source}: {len(data)} rows, {os.path.getsize(args.source)} bytes")
+        for field, kind in data.kinds.items():
+            extra = f", {len(data._values[field])} distinct values" if kind == "text" else ""
+            print(f"  {field:<22} {kind}{extra}")
+        return 0
+    print(f"✅ {count} rows: {args.source} -> {args.target}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
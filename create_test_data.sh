@@ -31,6 +31,14 @@ COLLECTION="test_collection.json"
 ENVIRONMENT="stage-env.json"
 OUTPUT_FILE="output.txt"
 
+# Local registry of created ids (see id_registry.py) and per-folder Newman JSON reports
+REGISTRY_FILE="id_registry.sqlite3"
+REPORT_DIR="reports"
+TOKEN_CACHE_FILE=".token_cache.json"
+
+# One NDJSON record per request (see run_log.py) instead of Newman's verbose output
+RUN_LOG="$REPORT_DIR/run_log.ndjson"
+
 # Define folder-to-data-file mappings (now in test_data/ subdirectory)
 declare -A FOLDER_DATA_MAP=(
     ["timetrackings"]="test_data/timetrackings.json"
@@ -41,6 +49,24 @@ declare -A FOLDER_DATA_MAP=(
     ["absences"]="test_data/absences.json"
 )
 
+# Dependency levels of the foreign-key graph (users.department_id -> departments,
+# tasks.mother_id -> projects, timetrackings/absences -> users and tasks).
+# Folders of one level do not depend on each other and run concurrently.
+FOLDER_LEVELS=(
+    "departments projects"
+    "users tasks"
+    "timetrackings absences"
+)
+
+# Folders whose rows are checked against the server first with --preflight (see
+# preflight.py), so that running them again only uploads what is missing instead
+# of duplicates. Off by default: the read filters it uses are not documented in
+# .gitlab/API_CONTEXT.md and only confirmed against mock_server.py
+PREFLIGHT_FOLDERS="timetrackings absences"
+PREFLIGHT="false"
+# Exit code of preflight.py when every row already exists
+PREFLIGHT_NOTHING_MISSING=3
+
 # Logging function
 log() {
     local timestamp=$(date '+%Y-%m-%d %H:%M:%S')
@@ -65,40 +91,86 @@ show_usage() {
     log_plain "  $0 users                    # Run only users folder"
     log_plain "  $0 departments users        # Run departments and users folders"
     log_plain "  $0 timetrackings departments users  # Run all three folders"
+    log_plain "  $0 --sequential tasks projects     # Run in the given order, one at a time"
+    log_plain "  $0 --preflight timetrackings       # Only upload rows that do not exist yet"
+    log_plain ""
+    log_plain "Folders are run in dependency order; independent folders run concurrently:"
+    for level in "${FOLDER_LEVELS[@]}"; do
+        log_plain "  ${level// / + }"
+    done
     log_plain ""
 }
 
-# Function to extract project IDs from output and set environment variable for smart assignment
+# Function to record the ids created by a newman run in the local id registry
+record_created_ids() {
+    local folder=$1
+    local data_file=$2
+    local report=$3
+
+    if [[ ! -f "$report" ]]; then
+        log "⚠️  No newman report found at $report, ids of $folder not recorded"
+        return
+    fi
+    log "🗂️  $(python3 id_registry.py --registry "$REGISTRY_FILE" import-newman "$folder" "$report" --source "$data_file")"
+}
+
+# Function to append the requests of a newman run to the structured run log
+record_run_log() {
+    local folder=$1
+    local report=$2
+
+    [[ -f "$report" ]] || return
+    log "📝 $(python3 run_log.py import-newman "$folder" "$report" "$RUN_LOG")"
+    # The first failures with their error and response body
+    python3 run_log.py failures "$RUN_LOG" --resource "$folder" --limit 5 | while IFS= read -r line; do
+        log_plain "   $line"
+    done
+}
+
+# Function to look up project IDs in the id registry and set environment variable for smart assignment
 extract_project_ids() {
-    log "🔍 Extracting project IDs from output..."
-    
-    # Extract project IDs from the output file using grep and sed
-    # Strategy: Find project creation API responses and extract only the newly created project IDs
-    # 1. Look for lines containing '"ResourceName":"projects"' (project creation responses)
-    # 2. Get the next 10 lines after each match (contains the Results section)
-    # 3. Extract all "id":number patterns from those lines
-    # 4. Convert to comma-separated list, limit to 10 IDs max
-    local project_ids=$(grep -E '"ResourceName":"projects"' -A 10 "$OUTPUT_FILE" | grep -o '"id":[0-9]*' | head -10 | sed 's/"id"://' | tr '\n' ',' | sed 's/,$//')
-    
-    if [[ -n "$project_ids" ]]; then
-        # Convert to JSON array format for Newman global variables
-        local ids_array="[${project_ids}]"
-        log "📋 Extracted project IDs: $ids_array"
-        
+    log "🔍 Looking up created project IDs in $REGISTRY_FILE..."
+
+    # All projects created from the projects data file, keyed by row, so there is no
+    # limit on the number of IDs and reruns replace the IDs of earlier runs
+    local ids_array=$(python3 id_registry.py --registry "$REGISTRY_FILE" ids projects --source "$(resolve_data_file "${FOLDER_DATA_MAP[projects]}")")
+
+    if [[ -n "$ids_array" && "$ids_array" != "[]" ]]; then
+        log "📋 Extracted $(echo "$ids_array" | tr -cd ',' | wc -c | awk '{print $1 + 1}') project IDs: $ids_array"
+
         # Set environment variable for Newman to use in collection prerequest scripts
         export EXTRACTED_PROJECT_IDS="$ids_array"
-        
-        # Also write to a temporary file (backup method, not currently used)
-        echo "extracted_project_ids=$ids_array" > temp_extracted_ids.json
-        
+
         log "✅ Project IDs extracted and ready for use"
     else
-        log "⚠️  No project IDs found in output"
+        log "⚠️  No project IDs found in registry"
         # Set fallback array with default project ID for tasks when no projects were created
         export EXTRACTED_PROJECT_IDS="[3]"
     fi
 }
 
+# A valid access token for the next folder: the cached one until shortly before it
+# expires, then a new one, shared with other runs through the token cache
+fetch_access_token() {
+    if ACCESS_TOKEN=$(python3 token_cache.py token --env "$ENVIRONMENT" 2>> "$OUTPUT_FILE"); then
+        export ACCESS_TOKEN
+        return 0
+    fi
+    ACCESS_TOKEN=""
+    return 1
+}
+
+# A newer columnar test_data/<folder>.npz replaces the JSON file (same rule as uploader.py)
+resolve_data_file() {
+    local data_file=$1
+    local npz_file="${data_file%.json}.npz"
+    if [[ -f "$npz_file" && ( ! -f "$data_file" || "$npz_file" -nt "$data_file" ) ]]; then
+        echo "$npz_file"
+    else
+        echo "$data_file"
+    fi
+}
+
 # Function to run newman for a specific folder with enhanced logging and smart ID handling
 run_folder() {
     local folder=$1
@@ -110,6 +182,52 @@ run_folder() {
         return 1
     fi
     
+    local source_file=$(resolve_data_file "$data_file")
+    if [[ "$source_file" != "$data_file" && -f "$data_file" ]]; then
+        log "📦 Using $source_file: it is newer than $data_file (delete or touch one to change this)"
+    fi
+
+    # Long runs outlive a token, so every folder asks the cache for a valid one
+    if ! fetch_access_token; then
+        log "⚠️  Could not get a shared access token, $folder will authenticate itself"
+    fi
+
+    # Only rows that do not exist on the server yet are uploaded
+    if [[ "$PREFLIGHT" == "true" && " $PREFLIGHT_FOLDERS " == *" $folder "* && -f "$source_file" ]]; then
+        local missing_file="$REPORT_DIR/$folder.missing.json"
+        local token_args=()
+        [[ -n "$ACCESS_TOKEN" ]] && token_args=(--token "$ACCESS_TOKEN")
+        mkdir -p "$REPORT_DIR"
+        log "🛫 Checking $source_file against the $folder already on the server..."
+        local preflight_output
+        preflight_output=$(python3 preflight.py "$folder" --data-file "$source_file" --env "$ENVIRONMENT" \
+            --collection "$COLLECTION" --output "$missing_file" "${token_args[@]}" 2>&1)
+        local preflight_code=$?
+        log_plain "$preflight_output"
+        if [[ $preflight_code -eq $PREFLIGHT_NOTHING_MISSING ]]; then
+            log "✅ Completed: $folder (all rows already exist)"
+            return 0
+        fi
+        if [[ $preflight_code -ne 0 ]]; then
+            log "❌ Pre-flight check failed for $folder (run without --preflight to upload anyway)"
+            return 1
+        fi
+        source_file=$missing_file
+        data_file=$missing_file
+    fi
+
+    # Newman only reads JSON arrays, so a columnar .npz is streamed into one next to the report
+    if [[ "$source_file" == *.npz ]]; then
+        local npz_file=$source_file
+        data_file="$REPORT_DIR/$folder.data.json"
+        mkdir -p "$REPORT_DIR"
+        log "🔄 Converting $npz_file for Newman: $data_file"
+        if ! python3 columnar.py to-json "$npz_file" "$data_file" > /dev/null; then
+            log "❌ Error: Could not convert '$npz_file'"
+            return 1
+        fi
+    fi
+    
     # Validate data file exists
     if [[ ! -f "$data_file" ]]; then
         log "❌ Error: Data file '$data_file' not found for folder '$folder'"
@@ -117,34 +235,44 @@ run_folder() {
     fi
     
     log "🚀 Running folder: $folder with data file: $data_file"
-    log "▶️  Command: newman run $COLLECTION -e $ENVIRONMENT -d $data_file --folder \"$folder\" --verbose"
+    local started=$SECONDS
+    local report="$REPORT_DIR/$folder.json"
+    mkdir -p "$REPORT_DIR"
+    local newman_log="$REPORT_DIR/$folder.newman.txt"
+    log "▶️  Command: newman run $COLLECTION -e $ENVIRONMENT -d $data_file --folder \"$folder\" --reporters cli,json --reporter-json-export $report"
+    log "   Newman output: $newman_log, request log: $RUN_LOG"
     log_plain ""
     
     # Enhanced newman execution with smart ID passing
-    # Pass extracted project IDs as global variables for smart assignment in collection prerequest scripts
+    local extra_args=()
     if [[ -n "$EXTRACTED_PROJECT_IDS" ]]; then
-        # Run with extracted IDs available for smart assignment (e.g., tasks can auto-assign to projects)
-        newman run "$COLLECTION" -e "$ENVIRONMENT" -d "$data_file" --folder "$folder" \
-            --global-var "extracted_project_ids=$EXTRACTED_PROJECT_IDS" \
-            --verbose 2>&1 | tee -a "$OUTPUT_FILE"
-    else
-        # Run without extracted IDs (first run or no previous extractions)
-        newman run "$COLLECTION" -e "$ENVIRONMENT" -d "$data_file" --folder "$folder" \
-            --verbose 2>&1 | tee -a "$OUTPUT_FILE"
+        # Pass extracted project IDs as global variables for smart assignment in collection
+        # prerequest scripts (e.g., tasks can auto-assign to projects)
+        extra_args+=(--global-var "extracted_project_ids=$EXTRACTED_PROJECT_IDS")
     fi
+    if [[ -n "$ACCESS_TOKEN" ]]; then
+        # The collection only fetches a token when access_token is not set
+        extra_args+=(--env-var "access_token=$ACCESS_TOKEN")
+    fi
+
+    # Newman's own output is kept per folder and overwritten by the next run; the
+    # requests themselves are summarized in the run log from the JSON report
+    newman run "$COLLECTION" -e "$ENVIRONMENT" -d "$data_file" --folder "$folder" \
+        "${extra_args[@]}" \
+        --reporters cli,json --reporter-json-export "$report" \
+        > "$newman_log" 2>&1
     
-    local exit_code=${PIPESTATUS[0]}
-    
+    local exit_code=$?
+    local elapsed=$((SECONDS - started))
+
+    # Record created ids even for partially failed runs, they exist on the server
+    record_created_ids "$folder" "$source_file" "$report"
+    record_run_log "$folder" "$report"
+
     if [[ $exit_code -eq 0 ]]; then
-        log "✅ Completed: $folder"
-        
-        # Special handling: If this was the projects folder, extract project IDs for future use
-        # This enables smart assignment for subsequent task creation
-        if [[ "$folder" == "projects" ]]; then
-            extract_project_ids
-        fi
+        log "✅ Completed: $folder in ${elapsed}s"
     else
-        log "❌ Failed: $folder (exit code: $exit_code)"
+        log "❌ Failed: $folder after ${elapsed}s (exit code: $exit_code)"
     fi
     
     # Visual separator for readability
@@ -157,11 +285,13 @@ run_folder() {
 
 # Main script logic
 main() {
-    # Clear/create output file at the start
+    # Clear/create output file and run log at the start
     > "$OUTPUT_FILE"
+    mkdir -p "$REPORT_DIR"
+    > "$RUN_LOG"
     
     log "🔄 Starting test data creation script..."
-    log "📝 Output will be logged to: $OUTPUT_FILE"
+    log "📝 Output will be logged to: $OUTPUT_FILE (requests: $RUN_LOG)"
     log_plain ""
     
     # Check if newman is installed
@@ -184,6 +314,20 @@ main() {
         show_usage
         exit 0
     fi
+
+    # --sequential keeps the given order instead of scheduling by dependency,
+    # --preflight only uploads the rows that do not exist on the server yet
+    SEQUENTIAL="false"
+    while [[ "$1" == "--sequential" || "$1" == "--preflight" ]]; do
+        [[ "$1" == "--sequential" ]] && SEQUENTIAL="true"
+        [[ "$1" == "--preflight" ]] && PREFLIGHT="true"
+        shift
+        if [[ $# -eq 0 ]]; then
+            log "❌ Error: No folders specified"
+            show_usage
+            exit 1
+        fi
+    done
     
     # Check if collection and environment files exist
     if [[ ! -f "$COLLECTION" ]]; then
@@ -196,6 +340,14 @@ main() {
         exit 1
     fi
     
+    # Tokens are shared with other runs through the token cache and refreshed per folder
+    if fetch_access_token; then
+        log "🔑 Using cached access token (see $TOKEN_CACHE_FILE)"
+    else
+        log "⚠️  Could not get a shared access token, each folder will authenticate itself"
+    fi
+    log_plain ""
+
     log "📋 Running Newman with:"
     log "   Collection: $COLLECTION"
     log "   Environment: $ENVIRONMENT"
@@ -207,15 +359,61 @@ main() {
     local total_folders=$#
     local successful_folders=0
     local failed_folders=0
-    
-    # Run each specified folder
-    for folder in "$@"; do
-        run_folder "$folder"
-        if [[ $? -eq 0 ]]; then
-            ((successful_folders++))
+
+    local batches=()
+    if [[ "$SEQUENTIAL" == "true" ]]; then
+        batches=("$@")
+    else
+        # Group the requested folders by dependency level; unknown folders are
+        # passed on as their own batch so run_folder reports them
+        for level in "${FOLDER_LEVELS[@]}"; do
+            local batch=""
+            for folder in "$@"; do
+                [[ " $level " == *" $folder "* && " $batch " != *" $folder "* ]] && batch="$batch $folder"
+            done
+            [[ -n "$batch" ]] && batches+=("${batch# }")
+        done
+        for folder in "$@"; do
+            [[ " ${FOLDER_LEVELS[*]} " != *" $folder "* ]] && batches+=("$folder")
+        done
+        log "🗺️  Dependency order: $(printf '%s -> ' "${batches[@]// / + }" | sed 's/ -> $//')"
+    fi
+
+    # Run each batch; folders of one batch run concurrently with their own logs,
+    # which are appended to the output file and run log once the batch is done
+    for batch in "${batches[@]}"; do
+        local folders=($batch)
+        local -A exit_codes=()
+        if [[ ${#folders[@]} -eq 1 ]]; then
+            run_folder "${folders[0]}"
+            exit_codes[${folders[0]}]=$?
         else
-            ((failed_folders++))
+            local -A pids=()
+            log "⏩ Running concurrently: $batch (logs are appended when all are done)"
+            for folder in "${folders[@]}"; do
+                OUTPUT_FILE="$OUTPUT_FILE.$folder" RUN_LOG="$RUN_LOG.$folder" run_folder "$folder" > /dev/null &
+                pids[$folder]=$!
+            done
+            for folder in "${folders[@]}"; do
+                wait "${pids[$folder]}"
+                exit_codes[$folder]=$?
+                cat "$OUTPUT_FILE.$folder" >> "$OUTPUT_FILE" && rm -f "$OUTPUT_FILE.$folder"
+                [[ -f "$RUN_LOG.$folder" ]] && cat "$RUN_LOG.$folder" >> "$RUN_LOG" && rm -f "$RUN_LOG.$folder"
+            done
         fi
+
+        for folder in "${folders[@]}"; do
+            if [[ ${exit_codes[$folder]} -eq 0 ]]; then
+                ((successful_folders++))
+                # Tasks created later in this run use the newly created projects
+                if [[ "$folder" == "projects" ]]; then
+                    extract_project_ids
+                fi
+            else
+                ((failed_folders++))
+            fi
+        done
+        unset exit_codes pids
     done
     
     # Summary
@@ -223,6 +421,9 @@ main() {
     log "   Total folders: $total_folders"
     log "   Successful: $successful_folders"
     log "   Failed: $failed_folders"
+    python3 run_log.py summary "$RUN_LOG" | while IFS= read -r line; do
+        log "   $line"
+    done
     log_plain ""
     log "🏁 Script execution completed at $(date '+%Y-%m-%d %H:%M:%S')"
     
@@ -0,0 +1,259 @@
+"""
+Seed several TimeTac accounts at once.
+
+A fleet file lists account environments, each with its own generation profile
+(users, date range, holidays) and the folders to upload:
+
+    {
+      "concurrency": 64,
+      "folders": ["timetrackings", "absences"],
+      "accounts": [
+        {"name": "acme", "env": "envs/acme.json",
+         "profile": {"users": "100-599", "start": "2025-01-01", "end": "2025-06-30",
+                     "region": "AT", "vacation_days": 12, "seed": 1}},
+        {"name": "globex", "env": "envs/globex.json", "concurrency": 8,
+         "profile": {"users": "51-80", "holidays_file": "envs/globex_holidays.txt"}}
+      ]
+    }
+
+Every account generates its data in its own process and starts uploading as
+soon as its files are written. Each account gets its own access token (the
+token cache is keyed by url, account and client), its own connection pool and
+AIMD limiter, and its own namespace in the ID registry, progress journals and
+run log. All accounts share one global budget of requests in flight
+(--concurrency), handed out round-robin so a large account cannot starve a
+small one. A fleet run therefore takes about as long as its slowest account
+instead of the sum of all of them.
+
+    python fleet.py fleet.json
+    python fleet.py fleet.json --only acme --resume
+    python fleet.py fleet.json --no-generate --skip-existing --stats-interval 5
+
+The env files a fleet file names must exist first. To try fleet.example.json
+against mock_server.py, create its envs/acme.json and envs/globex.json (e.g.
+copies of stage-env.json; envs/ is git-ignored):
+
+    mkdir -p envs && cp stage-env.json envs/acme.json && cp stage-env.json envs/globex.json
+    python fleet.py fleet.example.json --url http://127.0.0.1:8080
+
+An account entry may also set "account" or "url" to override its environment
+file, and "data": {"users": "envs/acme_users.json"} for folders that are not
+generated. Generated files go to <workdir>/<name>/.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+from metrics import Metrics, live_metrics, profiled
+from metrics import add_arguments as add_metrics_arguments
+from preflight import PreflightError
+from rate_limit import FairBudget
+from uploader import FOLDER_DATA_MAP, build_parser, load_environment
+from uploader import run as upload
+
+FLEET_WORKDIR = "fleet_data"
+GENERATOR = "generate_multi_user_timetrackings.py"
+DEFAULT_FOLDERS = ["timetrackings", "absences"]
+# Profile key -> generator option
+PROFILE_OPTIONS = {
+    "users": "--users",
+    "start": "--start",
+    "end": "--end",
+    "region": "--region",
+    "holidays_file": "--holidays-file",
+    "vacation_days": "--vacation-days",
+    "seed": "--seed",
+    "workers": "--workers",
+    "cache_dir": "--cache-dir",
+}
+
+
+class FleetError(ValueError):
+    """The fleet file is invalid"""
+
+
+def load_fleet(path):
+    with open(path) as f:
+        fleet = json.load(f)
+    accounts = fleet.get("accounts") or []
+    if not accounts:
+        raise FleetError(f"{path} lists no accounts")
+    names = set()
+    for account in accounts:
+        if "env" not in account:
+            raise FleetError(f"account {account.get('name', '?')} has no env file")
+        account.setdefault("name", load_environment(account["env"]).get("account", ""))
+        if not account["name"] or account["name"] in names:
+            raise FleetError(f"account names must be set and unique, got {account['name']!r}")
+        names.add(account["name"])
+        unknown = set(account.get("profile", {})) - set(PROFILE_OPTIONS)
+        if unknown:
+            raise FleetError(f"account {account['name']}: unknown profile keys {', '.join(sorted(unknown))}")
+        folders = account.get("folders", fleet.get("folders", DEFAULT_FOLDERS))
+        unknown = set(folders) - set(FOLDER_DATA_MAP)
+        if unknown:
+            raise FleetError(f"account {account['name']}: unknown folders {', '.join(sorted(unknown))}")
+    return fleet
+
+
+def account_dir(workdir, account):
+    return os.path.join(workdir, account["name"])
+
+
+def generated_files(workdir, account):
+    """{folder: data file} written by the generator for an account"""
+    directory = account_dir(workdir, account)
+    return {"timetrackings": os.path.join(directory, "timetrackings.json"),
+            "absences": os.path.join(directory, "absences.json")}
+
+
+def generator_command(workdir, account):
+    files = generated_files(workdir, account)
+    generator = os.path.join(os.path.dirname(os.path.abspath(__file__)), GENERATOR)
+    command = [sys.executable, generator, "--output", files["timetrackings"],
+               "--absences-output", files["absences"], "--quiet"]
+    for key, value in account.get("profile", {}).items():
+        command += [PROFILE_OPTIONS[key], str(value)]
+    return command
+
+
+def upload_args(account, folders, data_files, args):
+    """uploader.py arguments of one account"""
+    argv = list(folders) + ["--namespace", account["name"],
+                            "--concurrency", str(account.get("concurrency", args.account_concurrency)),
+                            "--run-log", os.path.join(account_dir(args.workdir, account), "run_log.ndjson")]
+    for folder, path in data_files.items():
+        argv += ["--data", f"{folder}={path}"]
+    for flag in ("resume", "skip_existing", "allow_overlaps", "sequential", "no_token_cache", "verbose"):
+        if getattr(args, flag):
+            argv.append("--" + flag.replace("_", "-"))
+    options = {"url": args.url or account.get("url"), "token": args.token,
+               "registry": args.registry, "collection": args.collection}
+    for option, value in options.items():
+        if value:
+            argv += ["--" + option, value]
+    return build_parser().parse_args(argv)
+
+
+# ==================================================================================
+# Fan-out
+# ==================================================================================
+
+async def generate(account, args):
+    """Run the generator for one account in its own process"""
+    os.makedirs(account_dir(args.workdir, account), exist_ok=True)
+    started = time.perf_counter()
+    process = await asyncio.create_subprocess_exec(
+        *generator_command(args.workdir, account),
+        stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT)
+    output, _ = await process.communicate()
+    text = output.decode(errors="replace").strip()
+    if process.returncode != 0:
+        raise RuntimeError(f"generator failed with exit code {process.returncode}:\n{text}")
+    print(f"[{account['name']}] 🧮 {text.splitlines()[-1] if text else 'generated'} "
+          f"in {time.perf_counter() - started:.1f}s")
+
+
+async def seed_account(account, folders, args, budget, metrics):
+    """Generate and upload one account; returns its result"""
+    started = time.perf_counter()
+    result = {"account": account["name"], "folders": folders, "summaries": [], "error": None}
+    data_files = dict(account.get("data", {}))
+    try:
+        # Accounts without a profile upload their "data" files or the defaults of FOLDER_DATA_MAP
+        if "profile" in account:
+            if args.generate:
+                await generate(account, args)
+            for folder, path in generated_files(args.workdir, account).items():
+                if folder in folders:
+                    data_files.setdefault(folder, path)
+        env = load_environment(account["env"])
+        if account.get("account"):
+            env["account"] = account["account"]
+        result["summaries"] = await upload(folders, upload_args(account, folders, data_files, args),
+                                           metrics, env=env, budget=budget)
+    except (OSError, RuntimeError, PreflightError) as e:
+        result["error"] = str(e)
+        print(f"[{account['name']}] ❌ {e}")
+    result["elapsed_s"] = round(time.perf_counter() - started, 2)
+    return result
+
+
+async def run(fleet, args, metrics=None):
+    budget = FairBudget(args.concurrency or fleet.get("concurrency", 64))
+    if metrics is not None:
+        metrics.gauge("budget_in_flight", lambda: budget.in_flight)
+        metrics.gauge("budget_waiting", lambda: budget.waiting)
+    accounts = [a for a in fleet["accounts"] if not args.only or a["name"] in args.only]
+    default_folders = fleet.get("folders", DEFAULT_FOLDERS)
+    print(f"🛰️  Seeding {len(accounts)} accounts with at most {budget.total} requests in flight")
+    return await asyncio.gather(*(seed_account(account, account.get("folders", default_folders),
+                                               args, budget, metrics) for account in accounts))
+
+
+def print_results(results, elapsed):
+    print("\n📊 Fleet summary:")
+    for result in results:
+        ok = sum(s["ok"] for s in result["summaries"])
+        rows = sum(s["rows"] for s in result["summaries"])
+        failed = sum(s["failed"] for s in result["summaries"])
+        status = f"❌ {result['error']}" if result["error"] else f"{ok}/{rows} ok, {failed} failed"
+        print(f"   {result['account']}: {status} in {result['elapsed_s']}s")
+    slowest = max((r["elapsed_s"] for r in results), default=0)
+    print(f"⏱️  {len(results)} accounts in {elapsed:.1f}s (slowest account {slowest:.1f}s)")
+
+
+def main(argv=None):
+    uploader_defaults = build_parser()
+    parser = argparse.ArgumentParser(description="Generate and upload test data for several accounts at once")
+    parser.add_argument("fleet", help="Fleet file (see fleet.example.json)")
+    parser.add_argument("--only", type=lambda s: s.split(","), help="Comma separated account names")
+    parser.add_argument("--concurrency", type=int,
+                        help="Global budget of requests in flight (default: the fleet file's, or 64)")
+    parser.add_argument("--account-concurrency", type=int, default=uploader_defaults.get_default("concurrency"),
+                        help="Max requests in flight per account unless the account sets its own")
+    parser.add_argument("--no-generate", dest="generate", action="store_false",
+                        help="Upload the files already in --workdir instead of generating them")
+    parser.add_argument("--workdir", default=FLEET_WORKDIR, help="Directory for the generated files")
+    parser.add_argument("--url", help="Override the url of every account (e.g. a local mock server)")
+    parser.add_argument("--token", help="Use this access token for every account")
+    parser.add_argument("--registry", help="SQLite registry of created ids (one namespace per account)")
+    parser.add_argument("--collection", help="Postman collection file")
+    parser.add_argument("--no-token-cache", action="store_true", help="Always fetch new tokens")
+    parser.add_argument("--resume", action="store_true", help="Skip rows already acknowledged per account")
+    parser.add_argument("--skip-existing", action="store_true",
+                        help="Only upload timetrackings and absences the accounts do not have yet")
+    parser.add_argument("--allow-overlaps", action="store_true", help="See uploader.py --allow-overlaps")
+    parser.add_argument("--sequential", action="store_true",
+                        help="Upload the folders of each account one after another")
+    parser.add_argument("--json", dest="json_out", help="Write the per-account summaries to this file")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Log failed requests")
+    add_metrics_arguments(parser)
+    args = parser.parse_args(argv)
+
+    try:
+        fleet = load_fleet(args.fleet)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
+    unknown = set(args.only or ()) - {a["name"] for a in fleet["accounts"]}
+    if unknown:
+        parser.error(f"unknown accounts: {', '.join(sorted(unknown))}")
+
+    metrics = Metrics() if args.metrics_port is not None or args.stats_interval else None
+    started = time.perf_counter()
+    with profiled(args.profile, args.tracemalloc), live_metrics(metrics, args.metrics_port, args.stats_interval):
+        results = asyncio.run(run(fleet, args, metrics))
+    print_results(results, time.perf_counter() - started)
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump(results, f, indent=2)
+    failed = any(r["error"] or any(s["failed"] for s in r["summaries"]) for r in results)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,21 @@
-import json
+import argparse
+import hashlib
+import inspect
+import os
 import random
+import shutil
+import tempfile
+import time
 from datetime import datetime, timedelta
+from multiprocessing import Pool
+
+from absence_planner import absence_rows, absences_from_days
+from chunk_cache import ChunkCache, chunk_key, diff_rows
+from metrics import Metrics, live_metrics, profiled, timed_stages
+from metrics import add_arguments as add_metrics_arguments
+from streaming import detect_format, write_entries, write_fragment, write_shards
+from timetracking_batch import BREAK_TASK_ID, TimetrackingBatch
+from work_calendar import HOLIDAY_SETS, SHORT_DAY, VACATION, WorkCalendar, load_holiday_file
 
 # Task IDs provided
 work_task_ids = [4, 6, 7, 65, 76, 114, 116, 131, 136, 62, 77, 80, 83, 86, 108, 112, 126, 142,
@@ -11,61 +26,50 @@ work_task_ids = [4, 6, 7, 65, 76, 114, 116, 131, 136, 62, 77, 80, 83, 86, 108, 1
                  127, 129, 141, 148, 154, 160, 94, 101, 106, 118, 122, 132, 135, 138, 61, 82,
                  92, 137, 151, 153, 155, 157]
 
-# Austrian public holidays in 2025
-austrian_holidays_2025 = [
-    datetime(2025, 1, 1), datetime(2025, 1, 6), datetime(2025, 4, 21),
-    datetime(2025, 5, 1), datetime(2025, 5, 29), datetime(2025, 6, 9),
-    datetime(2025, 6, 19), datetime(2025, 8, 15), datetime(2025, 10, 26),
-    datetime(2025, 11, 1), datetime(2025, 12, 8), datetime(2025, 12, 25),
-    datetime(2025, 12, 26)
-]
-
-def get_all_working_days(start_date, end_date):
+def get_all_working_days(calendar):
     """Get all working days in the period"""
-    working_days = []
-    current = start_date
-    while current <= end_date:
-        if current.weekday() < 5 and current not in austrian_holidays_2025:
-            working_days.append(current)
-        current += timedelta(days=1)
-    return working_days
-
-def generate_vacation_days(working_days, num_days):
+    return calendar.working_days()
+
+def derive_seed(base_seed, *parts):
+    """Stable 64-bit seed for (base seed, user id, purpose), independent of PYTHONHASHSEED"""
+    key = ":".join(str(p) for p in (base_seed,) + parts).encode()
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "big")
+
+def generate_vacation_days(working_days, num_days, rng=random):
     """Generate random vacation days"""
-    return sorted(random.sample(working_days, min(num_days, len(working_days))))
+    return sorted(rng.sample(working_days, min(num_days, len(working_days))))
 
-def generate_short_days(working_days, vacation_days, num_short_days):
+def generate_short_days(calendar, vacation_days, num_short_days, rng=random):
     """Generate days with short working hours (2-5 hours)"""
-    available_days = [d for d in working_days if d not in vacation_days]
-    return sorted(random.sample(available_days, min(num_short_days, len(available_days))))
+    vacation_mask = calendar.user_mask(vacation_days)
+    available_days = [d for d in calendar.working_days() if not calendar.flags(vacation_mask, d)]
+    return sorted(rng.sample(available_days, min(num_short_days, len(available_days))))
 
-def generate_daily_timetrackings(date, user_id, is_short_day=False):
-    """Generate timetracking entries for one day"""
-    entries = []
-    
+def daily_sessions(is_short_day=False, rng=random):
+    """Yield (task id, start minute, end minute) of one day's sessions and breaks"""
     # Random start time between 7:30 and 9:00
-    start_hour = random.randint(7, 8)
-    start_minute = random.choice([0, 15, 30, 45]) if start_hour == 7 else random.choice([0, 15, 30])
-    current_time = datetime(date.year, date.month, date.day, start_hour, start_minute)
+    start_hour = rng.randint(7, 8)
+    start_minute = rng.choice([0, 15, 30, 45]) if start_hour == 7 else rng.choice([0, 15, 30])
+    current = start_hour * 60 + start_minute
     
     if is_short_day:
         # Short day: 2-5 hours total work time
-        total_work_minutes = random.randint(120, 300)  # 2-5 hours
+        total_work_minutes = rng.randint(120, 300)  # 2-5 hours
         # 1-2 breaks for short days
-        num_breaks = random.choice([1, 2])
+        num_breaks = rng.choice([1, 2])
         if num_breaks == 1:
-            break_durations = [random.randint(10, 20)]
+            break_durations = [rng.randint(10, 20)]
         else:
-            break_durations = [random.randint(10, 15), random.randint(10, 15)]
+            break_durations = [rng.randint(10, 15), rng.randint(10, 15)]
     else:
         # Normal day: 8 hours work time
         total_work_minutes = 8 * 60
         # 2-3 breaks
-        num_breaks = random.choice([2, 3])
+        num_breaks = rng.choice([2, 3])
         if num_breaks == 2:
-            break_durations = [random.randint(10, 20), random.randint(20, 30)]
+            break_durations = [rng.randint(10, 20), rng.randint(20, 30)]
         else:
-            break_durations = [random.randint(10, 15), random.randint(10, 15), random.randint(10, 15)]
+            break_durations = [rng.randint(10, 15), rng.randint(10, 15), rng.randint(10, 15)]
     
     # Distribute work time across sessions
     num_work_sessions = num_breaks + 1
@@ -77,143 +81,513 @@ def generate_daily_timetrackings(date, user_id, is_short_day=False):
         max_duration = min(180, remaining_work - 30 * (num_work_sessions - i - 1))
         if max_duration < min_duration:
             max_duration = remaining_work
-        duration = random.randint(min_duration, max_duration)
+        duration = rng.randint(min_duration, max_duration)
         work_session_durations.append(duration)
         remaining_work -= duration
     
     work_session_durations.append(remaining_work)
     
-    # Generate entries
+    # Generate sessions
     break_idx = 0
     for i in range(num_work_sessions):
         work_duration = work_session_durations[i]
         if work_duration <= 0:
             continue
             
-        task_id = random.choice(work_task_ids)
-        start_time_str = current_time.strftime("%Y-%m-%d %H:%M:%S")
-        current_time += timedelta(minutes=work_duration)
-        end_time_str = current_time.strftime("%Y-%m-%d %H:%M:%S")
-        
-        entries.append({
-            "user_id": str(user_id),
-            "task_id": str(task_id),
-            "start_time": start_time_str,
-            "end_time": end_time_str
-        })
+        task_id = rng.choice(work_task_ids)
+        yield task_id, current, current + work_duration
+        current += work_duration
         
         # Add break if not the last work session
         if i < num_work_sessions - 1 and break_idx < len(break_durations):
             break_duration = break_durations[break_idx]
-            start_time_str = current_time.strftime("%Y-%m-%d %H:%M:%S")
-            current_time += timedelta(minutes=break_duration)
-            end_time_str = current_time.strftime("%Y-%m-%d %H:%M:%S")
-            
-            entries.append({
-                "user_id": str(user_id),
-                "task_id": "9",
-                "start_time": start_time_str,
-                "end_time": end_time_str
-            })
+            yield BREAK_TASK_ID, current, current + break_duration
+            current += break_duration
             break_idx += 1
+
+def generate_daily_timetrackings(date, user_id, is_short_day=False, rng=random):
+    """Yield timetracking entries for one day"""
+    midnight = datetime(date.year, date.month, date.day)
+    for task_id, start, end in daily_sessions(is_short_day, rng):
+        yield {
+            "user_id": str(user_id),
+            "task_id": str(task_id),
+            "start_time": (midnight + timedelta(minutes=start)).strftime("%Y-%m-%d %H:%M:%S"),
+            "end_time": (midnight + timedelta(minutes=end)).strftime("%Y-%m-%d %H:%M:%S")
+        }
+
+def plan_users(user_ids, calendar, total_vacation_days, base_seed):
+    """Draw the vacation and short days of all users
+
+    Returns (all vacation days, {user: vacation days}, {user: short days}).
+    """
+    plan_rng = random.Random(derive_seed(base_seed, "vacation"))
+
+    # Generate vacation days distributed among users
+    vacation_days_list = generate_vacation_days(get_all_working_days(calendar), total_vacation_days, plan_rng)
+
+    # Distribute vacation days among users (roughly equal)
+    user_vacation_days = {}
+    days_per_user = total_vacation_days // len(user_ids)
+    remaining_days = total_vacation_days % len(user_ids)
+
+    vacation_pool = vacation_days_list.copy()
+    plan_rng.shuffle(vacation_pool)
+
+    for i, user_id in enumerate(user_ids):
+        num_days = days_per_user + (1 if i < remaining_days else 0)
+        user_vacation_days[user_id] = vacation_pool[:num_days]
+        vacation_pool = vacation_pool[num_days:]
+
+    # Generate short days for each user (different days per user)
+    user_short_days = {}
+    for user_id in user_ids:
+        rng = random.Random(derive_seed(base_seed, user_id, "short"))
+        num_short = rng.randint(3, 8)  # 3-8 short days per user
+        user_short_days[user_id] = generate_short_days(calendar, user_vacation_days[user_id], num_short, rng)
+
+    return vacation_days_list, user_vacation_days, user_short_days
+
+def fill_user_batch(batch, user_id, calendar, vacation_days, short_days, rng=random):
+    """Append all timetracking entries of one user to a TimetrackingBatch, day by day"""
+    mask = calendar.user_mask(vacation_days, short_days)
     
-    return entries
-
-# Configuration
-start_date = datetime(2025, 4, 1)
-end_date = datetime(2025, 6, 6)
-user_ids = [51, 52, 53]
-total_vacation_days = 30
-num_users = len(user_ids)
-
-# Get all working days
-all_working_days = get_all_working_days(start_date, end_date)
-print(f"Total working days in period: {len(all_working_days)}")
-
-# Generate 30 vacation days distributed among users
-vacation_days_list = generate_vacation_days(all_working_days, total_vacation_days)
-
-# Distribute vacation days among users (roughly equal)
-user_vacation_days = {}
-days_per_user = total_vacation_days // num_users
-remaining_days = total_vacation_days % num_users
-
-vacation_pool = vacation_days_list.copy()
-random.shuffle(vacation_pool)
-
-for i, user_id in enumerate(user_ids):
-    num_days = days_per_user + (1 if i < remaining_days else 0)
-    user_vacation_days[user_id] = vacation_pool[:num_days]
-    vacation_pool = vacation_pool[num_days:]
-
-# Generate short days for each user (different days per user)
-user_short_days = {}
-all_short_days = []
-for user_id in user_ids:
-    available_days = [d for d in all_working_days if d not in user_vacation_days[user_id]]
-    num_short = random.randint(3, 8)  # 3-8 short days per user
-    short_days = generate_short_days(all_working_days, user_vacation_days[user_id], num_short)
-    user_short_days[user_id] = short_days
-    all_short_days.extend([(user_id, d) for d in short_days])
-
-# Generate timetrackings for all users
-all_entries = []
-
-for user_id in user_ids:
-    current_date = start_date
-    
-    while current_date <= end_date:
-        # Skip weekends and holidays
-        if current_date.weekday() >= 5 or current_date in austrian_holidays_2025:
-            current_date += timedelta(days=1)
-            continue
+    # Weekends and holidays are already excluded by the calendar index
+    for current_date in calendar.working_days():
+        flags = calendar.flags(mask, current_date)
         
         # Skip vacation days for this user
-        if current_date in user_vacation_days[user_id]:
-            current_date += timedelta(days=1)
+        if flags & VACATION:
             continue
         
         # Check if it's a short day for this user
-        is_short = current_date in user_short_days[user_id]
-        
-        # Generate entries
-        daily_entries = generate_daily_timetrackings(current_date, user_id, is_short)
-        all_entries.extend(daily_entries)
+        is_short = bool(flags & SHORT_DAY)
         
-        current_date += timedelta(days=1)
-
-# Write to file
-with open('test_data/timetrackings.json', 'w') as f:
-    json.dump(all_entries, f, indent=2)
-
-# Print summary
-print(f"\n{'='*70}")
-print(f"Generated {len(all_entries)} timetracking entries")
-print(f"Users: {user_ids}")
-print(f"Period: {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}")
-print(f"\n{'='*70}")
-print(f"VACATION DAYS (30 days total distributed among all users):")
-print(f"{'='*70}")
-
-for user_id in user_ids:
-    print(f"\nUser {user_id} - {len(user_vacation_days[user_id])} vacation days:")
-    for vday in user_vacation_days[user_id]:
-        print(f"  - {vday.strftime('%Y-%m-%d')}")
-
-print(f"\n{'='*70}")
-print(f"SHORT WORKING DAYS (2-5 hours per day):")
-print(f"{'='*70}")
-
-for user_id in user_ids:
-    print(f"\nUser {user_id} - {len(user_short_days[user_id])} short days:")
-    for sday in user_short_days[user_id]:
-        print(f"  - {sday.strftime('%Y-%m-%d')}")
-
-print(f"\n{'='*70}")
-print(f"ALL VACATION DATES (30 days):")
-print(f"{'='*70}")
-for vday in sorted(vacation_days_list):
-    users_on_vacation = [uid for uid in user_ids if vday in user_vacation_days[uid]]
-    print(f"{vday.strftime('%Y-%m-%d')} - Users: {users_on_vacation}")
-
-print(f"\n{'='*70}")
+        batch.extend_day(user_id, current_date, daily_sessions(is_short, rng))
+    return batch
+
+def generate_batches(user_ids, calendar, user_vacation_days, user_short_days, base_seed, users_per_batch=256,
+                     metrics=None):
+    """Yield TimetrackingBatches of up to users_per_batch users
+
+    Each user draws from its own RNG seeded by (base_seed, user_id), so a user's
+    entries do not depend on which other users are generated or in which process.
+    """
+    for i in range(0, len(user_ids), users_per_batch):
+        batch = TimetrackingBatch()
+        for user_id in user_ids[i:i + users_per_batch]:
+            started, rows = time.perf_counter(), len(batch)
+            rng = random.Random(derive_seed(base_seed, user_id, "entries"))
+            fill_user_batch(batch, user_id, calendar, user_vacation_days[user_id], user_short_days[user_id], rng)
+            if metrics is not None:
+                metrics.observe("generate_user", (time.perf_counter() - started) * 1000)
+                metrics.count("rows", len(batch) - rows)
+        yield batch
+
+def generate_timetrackings(user_ids, calendar, user_vacation_days, user_short_days, base_seed):
+    """Yield timetracking entries for all users without materializing them
+
+    Entries are generated into compact batches and only turned into API strings
+    here, one batch of users at a time.
+    """
+    for batch in generate_batches(user_ids, calendar, user_vacation_days, user_short_days, base_seed):
+        yield from batch.entries()
+
+def generate_batches_with_backend(backend, user_ids, calendar,
+                                  user_vacation_days, user_short_days, base_seed, metrics=None):
+    """Dispatch to the pure-Python generator or the vectorized NumPy backend
+
+    The NumPy backend draws whole batches at once, so it is only timed per batch.
+    """
+    if backend == "numpy":
+        from numpy_backend import generate_batches_numpy
+        batches = generate_batches_numpy(user_ids, calendar, user_vacation_days,
+                                         user_short_days, base_seed, work_task_ids)
+        return counted_batches(batches, metrics) if metrics is not None else batches
+    return generate_batches(user_ids, calendar, user_vacation_days, user_short_days, base_seed,
+                            metrics=metrics)
+
+def generate_timetrackings_with_backend(backend, user_ids, calendar,
+                                        user_vacation_days, user_short_days, base_seed):
+    """Entries of generate_batches_with_backend() in the API's string form"""
+    for batch in generate_batches_with_backend(backend, user_ids, calendar,
+                                               user_vacation_days, user_short_days, base_seed):
+        yield from batch.entries()
+
+def _generate_shard(task):
+    """Process pool worker: write one shard of users to its own fragment file
+
+    Returns (fragment path, entry count, {user: summary}).
+    """
+    (shard_path, fmt, backend, user_ids, calendar,
+     user_vacation_days, user_short_days, base_seed) = task
+    summaries = {}
+
+    def entries():
+        for batch in generate_batches_with_backend(backend, user_ids, calendar,
+                                                   user_vacation_days, user_short_days, base_seed):
+            for user_id in batch.users():
+                summaries[user_id] = batch.user_summary(user_id)
+            yield from batch.entries()
+
+    with open(shard_path, "w") as f:
+        count = write_fragment(entries(), f, fmt)
+    return shard_path, count, summaries
+
+def write_timetrackings_parallel(output, workers, user_ids, calendar,
+                                 user_vacation_days, user_short_days, base_seed, backend="python",
+                                 user_totals=None):
+    """Shard users across a process pool and concatenate the shards in user order
+
+    The per-user summaries of the shards are merged into `user_totals`.
+    """
+    fmt = detect_format(output)
+    # Several shards per worker keeps all cores busy when users differ in size
+    shard_size = max(1, -(-len(user_ids) // (workers * 4)))
+    if backend == "numpy":
+        # Shards must start on NumPy batch boundaries to keep the output worker-independent
+        from numpy_backend import BATCH_USERS
+        shard_size = -(-shard_size // BATCH_USERS) * BATCH_USERS
+    shard_dir = tempfile.mkdtemp(prefix=".shards-", dir=os.path.dirname(os.path.abspath(output)))
+    tasks = []
+    for i in range(0, len(user_ids), shard_size):
+        shard_users = user_ids[i:i + shard_size]
+        tasks.append((
+            os.path.join(shard_dir, f"shard-{i:09d}"), fmt, backend, shard_users, calendar,
+            {u: user_vacation_days[u] for u in shard_users},
+            {u: user_short_days[u] for u in shard_users},
+            base_seed,
+        ))
+    def fragments(results):
+        for shard_path, count, summaries in results:
+            if user_totals is not None:
+                user_totals.update(summaries)
+            yield shard_path, count
+
+    try:
+        with Pool(workers) as pool:
+            # imap keeps shard order, so shards are appended while later ones still run
+            return write_shards(fragments(pool.imap(_generate_shard, tasks)), output, fmt)
+    finally:
+        shutil.rmtree(shard_dir, ignore_errors=True)
+
+# ==================================================================================
+# Incremental generation: per-(user, month) chunks through a ChunkCache
+# ==================================================================================
+
+def month_ranges(start_date, end_date):
+    """(YYYY-MM, first day, last day) of every calendar month touching [start, end]"""
+    months = []
+    first = datetime(start_date.year, start_date.month, 1)
+    while first <= end_date:
+        following = datetime(first.year + first.month // 12, first.month % 12 + 1, 1)
+        months.append((first.strftime("%Y-%m"), first, following - timedelta(days=1)))
+        first = following
+    return months
+
+def plan_user_month(user_id, month, month_days, vacation_days, base_seed):
+    """Vacation and 1-3 short days of one user in one month, drawn from the whole
+    month so that extending the date range does not move them"""
+    rng = random.Random(derive_seed(base_seed, user_id, "plan", month))
+    vacation = sorted(rng.sample(month_days, min(vacation_days, len(month_days))))
+    taken = set(vacation)
+    available = [d for d in month_days if d not in taken]
+    short = sorted(rng.sample(available, min(rng.randint(1, 3), len(available))))
+    return vacation, short
+
+def generate_user_month(user_id, month, days, vacation, short, base_seed):
+    """TimetrackingBatch of one user's days of one month, from the month's own RNG
+
+    Days are drawn in order, so appending days at the end of a month keeps the
+    entries of the earlier days unchanged.
+    """
+    rng = random.Random(derive_seed(base_seed, user_id, "entries", month))
+    vacation, short = set(vacation), set(short)
+    batch = TimetrackingBatch()
+    for day in days:
+        if day not in vacation:
+            batch.extend_day(user_id, day, daily_sessions(day in short, rng))
+    return batch
+
+def generator_fingerprint():
+    """Hash of the code that shapes a chunk, so edits to it invalidate the cache"""
+    source = "".join(inspect.getsource(f) for f in (daily_sessions, plan_user_month, generate_user_month))
+    return hashlib.sha256(source.encode()).hexdigest()[:16]
+
+def write_incremental(output, delta_output, cache, user_ids, start_date, end_date, holidays,
+                      base_seed, vacation_days, metrics=None):
+    """Write the full dataset from cached or newly generated chunks, plus a delta
+
+    The delta file gets the rows that are new or changed since the last run for
+    the same output; rows that no longer exist go to <delta>.removed<ext>.
+    Returns (entries, per-user summaries, plans, chunk statistics).
+    """
+    # Whole months, so a chunk's plan does not depend on where the range is cut
+    months = month_ranges(start_date, end_date)
+    calendar = WorkCalendar(months[0][1], months[-1][2], holidays)
+    fingerprint = generator_fingerprint()
+    previous = cache.load_manifest(output)
+    chunks = {}
+    plans = {}
+    user_totals = {}
+    stats = {"cached": 0, "generated": 0, "changed": 0, "removed": 0, "delta": 0, "delta_removed": 0}
+
+    def user_batches():
+        for user_id in user_ids:
+            started = time.perf_counter()
+            batch = TimetrackingBatch()
+            vacation_all, short_all = [], []
+            for month, first, last in months:
+                month_days = calendar.working_days(first, last)
+                days = [d for d in month_days if start_date <= d <= end_date]
+                if not days:
+                    continue
+                vacation, short = plan_user_month(user_id, month, month_days, vacation_days, base_seed)
+                vacation_all += [d for d in vacation if start_date <= d <= end_date]
+                short_all += [d for d in short if start_date <= d <= end_date]
+                key = chunk_key(seed=base_seed, user=user_id, month=month, vacation_days=vacation_days,
+                                month_days=month_days, days=[days[0], days[-1]], tasks=work_task_ids,
+                                code=fingerprint)
+                chunk = cache.load(key)
+                if chunk is None:
+                    chunk = generate_user_month(user_id, month, days, vacation, short, base_seed)
+                    cache.store(key, chunk)
+                    stats["generated"] += 1
+                else:
+                    stats["cached"] += 1
+                chunks[f"{user_id}:{month}"] = key
+                batch.extend(chunk)
+            plans[user_id] = (vacation_all, short_all)
+            if len(batch):
+                user_totals[user_id] = batch.user_summary(user_id)
+            if metrics is not None:
+                metrics.observe("generate_user", (time.perf_counter() - started) * 1000)
+                metrics.count("rows", len(batch))
+            yield batch
+
+    total = write_batch_output(user_batches(), output, metrics)
+
+    # Second pass over the cache: only chunks whose key differs from the last run
+    changed = [(key, previous.get(name)) for name, key in chunks.items() if previous.get(name) != key]
+    gone = [key for name, key in previous.items() if name not in chunks]
+    stats["changed"], stats["removed"] = len(changed), len(gone)
+    removed_rows = []
+
+    def delta_batches():
+        for key, old_key in changed:
+            added, removed = diff_rows(cache.load(key), cache.load(old_key) if old_key else None)
+            stats["delta"] += len(added)
+            if len(removed):
+                removed_rows.append(removed)
+            yield added
+        for old_key in gone:
+            old = cache.load(old_key)
+            if old is not None:
+                removed_rows.append(old)
+
+    write_batch_output(delta_batches(), delta_output)
+    root, ext = os.path.splitext(delta_output)
+    removed_output = f"{root}.removed{ext}"
+    if removed_rows:
+        stats["delta_removed"] = write_batch_output(removed_rows, removed_output)
+    elif os.path.exists(removed_output):
+        os.remove(removed_output)
+    cache.save_manifest(output, chunks)
+    return total, user_totals, plans, stats
+
+def write_batch_output(batches, path, metrics=None):
+    """Write TimetrackingBatches to a data file in the format its extension asks for"""
+    if metrics is not None:
+        batches = timed_stages(batches, metrics, "generate_batch", "serialize")
+    if detect_format(path) == "npz":
+        from columnar import write_batches
+        return write_batches(batches, path)
+    return write_entries((entry for batch in batches for entry in batch.entries()), path)
+
+def counted_batches(batches, metrics):
+    for batch in batches:
+        yield batch
+        metrics.count("rows", len(batch))
+
+def parse_user_ids(value):
+    """'51,52,53' or a range '100-5099'"""
+    if "-" in value and "," not in value:
+        first, last = value.split("-")
+        return list(range(int(first), int(last) + 1))
+    return [int(v) for v in value.split(",") if v]
+
+def generate(args, metrics=None):
+    """Generate, write and summarize the data set described by the parsed arguments"""
+    base_seed = args.seed if args.seed is not None else random.randrange(2 ** 32)
+
+    # Configuration
+    start_date = datetime.strptime(args.start, "%Y-%m-%d")
+    end_date = datetime.strptime(args.end, "%Y-%m-%d")
+    user_ids = parse_user_ids(args.users)
+    total_vacation_days = args.vacation_days
+
+    # Precompute the working-day index once for all users
+    holidays = load_holiday_file(args.holidays_file) if args.holidays_file else args.region
+    calendar = WorkCalendar(start_date, end_date, holidays)
+    all_working_days = get_all_working_days(calendar)
+    print(f"Total working days in period: {len(all_working_days)}")
+    print(f"Seed: {base_seed}")
+
+    user_totals = {}
+    chunk_stats = None
+    if args.cache_dir:
+        # Vacation and short days are planned per user and month, so chunks are independent
+        root, ext = os.path.splitext(args.output)
+        delta_output = args.delta or f"{root}.delta{ext}"
+        total_entries, user_totals, plans, chunk_stats = write_incremental(
+            args.output, delta_output, ChunkCache(args.cache_dir), user_ids, start_date, end_date,
+            holidays, base_seed, args.monthly_vacation_days, metrics)
+        user_vacation_days = {u: plans[u][0] for u in user_ids}
+        user_short_days = {u: plans[u][1] for u in user_ids}
+        vacation_days_list = sorted({d for days in user_vacation_days.values() for d in days})
+        vacation_title = f"{args.monthly_vacation_days} days per user and month"
+    else:
+        # Vacation days distributed among users, short days per user
+        vacation_days_list, user_vacation_days, user_short_days = plan_users(
+            user_ids, calendar, total_vacation_days, base_seed)
+        vacation_title = f"{total_vacation_days} days total distributed among all users"
+
+        # Stream timetrackings for all users straight to disk
+        if args.workers > 1:
+            total_entries = write_timetrackings_parallel(
+                args.output, args.workers, user_ids, calendar,
+                user_vacation_days, user_short_days, base_seed, args.backend, user_totals)
+        else:
+            batches = generate_batches_with_backend(
+                args.backend, user_ids, calendar, user_vacation_days, user_short_days, base_seed, metrics)
+
+            def summarized():
+                # Summarize each batch from its int columns before it is written and dropped
+                for batch in batches:
+                    for user_id in batch.users():
+                        user_totals[user_id] = batch.user_summary(user_id)
+                    yield batch
+
+            total_entries = write_batch_output(summarized(), args.output, metrics)
+
+    # Absences from the same plan, so they match the days without timetrackings
+    total_absences = None
+    if args.absences_output:
+        total_absences = write_entries(
+            (row for user_id in user_ids
+             for row in absence_rows(user_id, absences_from_days(
+                 calendar, user_vacation_days[user_id], user_short_days[user_id]))),
+            args.absences_output)
+
+    # Print summary
+    print(f"\n{'='*70}")
+    print(f"Generated {total_entries} timetracking entries")
+    if total_absences is not None:
+        print(f"Generated {total_absences} absences in {args.absences_output}")
+    print(f"Users: {user_ids}")
+    print(f"Period: {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}")
+    print(f"Output: {args.output}")
+    if chunk_stats is not None:
+        print(f"Chunks: {chunk_stats['cached']} cached, {chunk_stats['generated']} generated, "
+              f"{chunk_stats['changed']} new/changed, {chunk_stats['removed']} removed since the last run")
+        print(f"Delta: {chunk_stats['delta']} new/changed rows in {delta_output}"
+              + (f", {chunk_stats['delta_removed']} rows gone" if chunk_stats['delta_removed'] else ""))
+    if args.quiet:
+        return
+
+    print(f"\n{'='*70}")
+    print(f"VACATION DAYS ({vacation_title}):")
+    print(f"{'='*70}")
+
+    for user_id in user_ids:
+        print(f"\nUser {user_id} - {len(user_vacation_days[user_id])} vacation days:")
+        for vday in user_vacation_days[user_id]:
+            print(f"  - {vday.strftime('%Y-%m-%d')}")
+
+    print(f"\n{'='*70}")
+    print(f"SHORT WORKING DAYS (2-5 hours per day):")
+    print(f"{'='*70}")
+
+    for user_id in user_ids:
+        print(f"\nUser {user_id} - {len(user_short_days[user_id])} short days:")
+        for sday in user_short_days[user_id]:
+            print(f"  - {sday.strftime('%Y-%m-%d')}")
+
+    print(f"\n{'='*70}")
+    print(f"ALL VACATION DATES ({len(vacation_days_list)} days):")
+    print(f"{'='*70}")
+    vacation_users = {}
+    for uid in user_ids:
+        for vday in user_vacation_days[uid]:
+            vacation_users.setdefault(vday, []).append(uid)
+    for vday in sorted(vacation_days_list):
+        users_on_vacation = vacation_users.get(vday, [])
+        print(f"{vday.strftime('%Y-%m-%d')} - Users: {users_on_vacation}")
+
+    if user_totals:
+        print(f"\n{'='*70}")
+        print(f"WORKED HOURS PER USER:")
+        print(f"{'='*70}")
+        for user_id in user_ids:
+            totals = user_totals.get(user_id)
+            if totals:
+                print(f"User {user_id}: {totals['work_minutes'] / 60:.1f}h on {totals['days']} days "
+                      f"({totals['entries']} entries, {totals['break_minutes'] / 60:.1f}h breaks)")
+
+    print(f"\n{'='*70}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate timetrackings for several users")
+    parser.add_argument("--start", default="2025-04-01", help="First day (YYYY-MM-DD)")
+    parser.add_argument("--end", default="2025-06-06", help="Last day (YYYY-MM-DD)")
+    parser.add_argument("--users", default="51,52,53", help="User ids, e.g. 51,52,53 or 100-5099")
+    parser.add_argument("--region", default="AT", choices=sorted(HOLIDAY_SETS), help="Public holiday set")
+    parser.add_argument("--holidays-file", help="Holidays from a file (one YYYY-MM-DD per line) instead of --region")
+    parser.add_argument("--vacation-days", type=int, default=30, help="Vacation days shared by all users")
+    parser.add_argument("--output", default="test_data/timetrackings.json",
+                        help="Output file; .ndjson/.jsonl streams one entry per line, "
+                             ".npz writes binary columns (requires numpy)")
+    parser.add_argument("--absences-output",
+                        help="Also write the planned vacation (and short days as half days) as absences, "
+                             "e.g. test_data/absences.json")
+    parser.add_argument("--seed", type=int, help="Base seed; output is reproducible for the same seed")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Generate users in N processes (output is identical for any N)")
+    parser.add_argument("--backend", choices=["python", "numpy"], default="python",
+                        help="numpy draws whole batches of user-days at once (requires numpy)")
+    parser.add_argument("--cache-dir",
+                        help="Generate per-(user, month) chunks through this cache (e.g. .chunk_cache); "
+                             "unchanged chunks are reused and a delta file lists new/changed rows")
+    parser.add_argument("--monthly-vacation-days", type=int, default=2,
+                        help="With --cache-dir: vacation days per user and month (replaces --vacation-days)")
+    parser.add_argument("--delta", help="With --cache-dir: delta file (default: <output>.delta<ext>)")
+    parser.add_argument("--quiet", action="store_true", help="Only print the entry count")
+    add_metrics_arguments(parser)
+    args = parser.parse_args(argv)
+
+    try:
+        user_ids = parse_user_ids(args.users)
+    except ValueError:
+        parser.error(f"--users {args.users!r} is not a list like 51,52,53 or a range like 100-5099")
+    if not user_ids:
+        parser.error(f"--users {args.users!r} selects no users (a range is first-last with first <= last)")
+    output_format = detect_format(args.output)
+    if output_format == "npz" and args.workers > 1:
+        parser.error("--workers needs a .json or .ndjson output; .npz is written from one process")
+    if args.cache_dir and (args.workers > 1 or args.backend != "python"):
+        parser.error("--cache-dir generates chunks in one process with the python backend")
+    if args.backend == "numpy" or output_format == "npz":
+        try:
+            import numpy  # noqa: F401
+        except ImportError:
+            parser.error("--backend numpy and .npz output require numpy (pip install numpy)")
+    live = args.metrics_port is not None or args.stats_interval
+    if live and args.workers > 1:
+        parser.error("--metrics-port and --stats-interval measure a single process; use --workers 1")
+
+    metrics = Metrics() if live else None
+    with profiled(args.profile, args.tracemalloc), live_metrics(metrics, args.metrics_port, args.stats_interval):
+        generate(args, metrics)
+
+if __name__ == "__main__":
+    main()
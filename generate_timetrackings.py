@@ -1,7 +1,10 @@
-import json
+import argparse
 import random
 from datetime import datetime, timedelta
 
+from streaming import write_entries
+from work_calendar import HOLIDAY_SETS, WorkCalendar, load_holiday_file
+
 # Task IDs provided (excluding break task 9 which will be used separately)
 work_task_ids = [4, 6, 7, 65, 76, 114, 116, 131, 136, 62, 77, 80, 83, 86, 108, 112, 126, 142,
                  71, 73, 79, 90, 91, 102, 109, 120, 133, 134, 139, 146, 150, 60, 74, 78, 84,
@@ -11,35 +14,8 @@ work_task_ids = [4, 6, 7, 65, 76, 114, 116, 131, 136, 62, 77, 80, 83, 86, 108, 1
                  127, 129, 141, 148, 154, 160, 94, 101, 106, 118, 122, 132, 135, 138, 61, 82,
                  92, 137, 151, 153, 155, 157]
 
-# Austrian public holidays in 2025 (excluding weekends)
-austrian_holidays_2025 = [
-    datetime(2025, 1, 1),   # New Year's Day
-    datetime(2025, 1, 6),   # Epiphany
-    datetime(2025, 4, 21),  # Easter Monday
-    datetime(2025, 5, 1),   # Labour Day
-    datetime(2025, 5, 29),  # Ascension Day
-    datetime(2025, 6, 9),   # Whit Monday
-    datetime(2025, 6, 19),  # Corpus Christi
-    datetime(2025, 8, 15),  # Assumption Day
-    datetime(2025, 10, 26), # National Day
-    datetime(2025, 11, 1),  # All Saints' Day
-    datetime(2025, 12, 8),  # Immaculate Conception
-    datetime(2025, 12, 25), # Christmas Day
-    datetime(2025, 12, 26), # St. Stephen's Day
-]
-
-def is_working_day(date):
-    """Check if date is a working day (not weekend or public holiday)"""
-    if date.weekday() >= 5:  # Saturday=5, Sunday=6
-        return False
-    if date in austrian_holidays_2025:
-        return False
-    return True
-
 def generate_daily_timetrackings(date, user_id):
-    """Generate realistic timetracking entries for one day"""
-    entries = []
-    
+    """Yield realistic timetracking entries for one day"""
     # Random start time between 7:30 and 9:00
     start_hour = random.randint(7, 8)
     start_minute = random.choice([0, 15, 30, 45]) if start_hour == 7 else random.choice([0, 15, 30])
@@ -83,12 +59,12 @@ def generate_daily_timetrackings(date, user_id):
         current_time += timedelta(minutes=work_duration)
         end_time_str = current_time.strftime("%Y-%m-%d %H:%M:%S")
         
-        entries.append({
+        yield {
             "user_id": str(user_id),
             "task_id": str(task_id),
             "start_time": start_time_str,
             "end_time": end_time_str
-        })
+        }
         
         # Add break if not the last work session
         if i < num_work_sessions - 1:
@@ -97,34 +73,58 @@ def generate_daily_timetrackings(date, user_id):
             current_time += timedelta(minutes=break_duration)
             end_time_str = current_time.strftime("%Y-%m-%d %H:%M:%S")
             
-            entries.append({
+            yield {
                 "user_id": str(user_id),
                 "task_id": "9",  # Break task
                 "start_time": start_time_str,
                 "end_time": end_time_str
-            })
+            }
             break_idx += 1
-    
-    return entries
 
-# Generate timetrackings from May 1, 2025 to November 6, 2025
-start_date = datetime(2025, 5, 1)
-end_date = datetime(2025, 11, 6)
-user_id = 1
+def generate_timetrackings(user_id, calendar):
+    """Yield timetracking entries for every working day of the calendar"""
+    for current_date in calendar.working_days():
+        yield from generate_daily_timetrackings(current_date, user_id)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate timetrackings for one user")
+    parser.add_argument("--start", default="2025-05-01", help="First day (YYYY-MM-DD)")
+    parser.add_argument("--end", default="2025-11-06", help="Last day (YYYY-MM-DD)")
+    parser.add_argument("--user-id", type=int, default=1)
+    parser.add_argument("--region", default="AT", choices=sorted(HOLIDAY_SETS), help="Public holiday set")
+    parser.add_argument("--holidays-file", help="Holidays from a file (one YYYY-MM-DD per line) instead of --region")
+    parser.add_argument("--output", default="test_data/timetrackings.json",
+                        help="Output file; .ndjson/.jsonl streams one entry per line, "
+                             ".npz writes binary columns (requires numpy)")
+    parser.add_argument("--seed", type=int, help="Random seed for reproducible output")
+    args = parser.parse_args(argv)
+
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    # Generate timetrackings from May 1, 2025 to November 6, 2025 by default
+    start_date = datetime.strptime(args.start, "%Y-%m-%d")
+    end_date = datetime.strptime(args.end, "%Y-%m-%d")
+    user_id = args.user_id
+    holidays = load_holiday_file(args.holidays_file) if args.holidays_file else args.region
+    calendar = WorkCalendar(start_date, end_date, holidays)
+
+    work_entries = 0
 
-all_entries = []
-current_date = start_date
+    def count_work_entries(entries):
+        nonlocal work_entries
+        for entry in entries:
+            if entry["task_id"] != "9":
+                work_entries += 1
+            yield entry
 
-while current_date <= end_date:
-    if is_working_day(current_date):
-        daily_entries = generate_daily_timetrackings(current_date, user_id)
-        all_entries.extend(daily_entries)
-    current_date += timedelta(days=1)
+    # Stream to file
+    total_entries = write_entries(
+        count_work_entries(generate_timetrackings(user_id, calendar)), args.output)
 
-# Write to file
-with open('test_data/timetrackings.json', 'w') as f:
-    json.dump(all_entries, f, indent=2)
+    print(f"Generated {total_entries} timetracking entries for user {user_id}")
+    print(f"Period: {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}")
+    print(f"Working days: {work_entries // 4}")  # Approximate
 
-print(f"Generated {len(all_entries)} timetracking entries for user {user_id}")
-print(f"Period: {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}")
-print(f"Working days: {len([e for e in all_entries if e['task_id'] != '9']) // 4}")  # Approximate
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,11 @@
-import json
+import argparse
 import random
 from datetime import datetime, timedelta
 
+from absence_planner import absence_rows, absent_days, half_day_dates, plan_absences
+from streaming import write_entries
+from work_calendar import HOLIDAY_SETS, SHORT_DAY, VACATION, WorkCalendar, load_holiday_file
+
 # Task IDs provided (excluding break task 9 which will be used separately)
 work_task_ids = [4, 6, 7, 65, 76, 114, 116, 131, 136, 62, 77, 80, 83, 86, 108, 112, 126, 142,
                  71, 73, 79, 90, 91, 102, 109, 120, 133, 134, 139, 146, 150, 60, 74, 78, 84,
@@ -11,91 +15,12 @@ work_task_ids = [4, 6, 7, 65, 76, 114, 116, 131, 136, 62, 77, 80, 83, 86, 108, 1
                  127, 129, 141, 148, 154, 160, 94, 101, 106, 118, 122, 132, 135, 138, 61, 82,
                  92, 137, 151, 153, 155, 157]
 
-# Austrian public holidays in 2025
-austrian_holidays_2025 = [
-    datetime(2025, 1, 1),   # New Year's Day
-    datetime(2025, 1, 6),   # Epiphany
-    datetime(2025, 4, 21),  # Easter Monday
-    datetime(2025, 5, 1),   # Labour Day
-    datetime(2025, 5, 29),  # Ascension Day
-    datetime(2025, 6, 9),   # Whit Monday
-    datetime(2025, 6, 19),  # Corpus Christi
-    datetime(2025, 8, 15),  # Assumption Day
-    datetime(2025, 10, 26), # National Day
-    datetime(2025, 11, 1),  # All Saints' Day
-    datetime(2025, 12, 8),  # Immaculate Conception
-    datetime(2025, 12, 25), # Christmas Day
-    datetime(2025, 12, 26), # St. Stephen's Day
-]
-
-def is_working_day(date, vacation_days):
-    """Check if date is a working day"""
-    if date.weekday() >= 5:  # Weekend
-        return False
-    if date in austrian_holidays_2025:  # Public holiday
-        return False
-    if date in vacation_days:  # Vacation
-        return False
-    return True
-
-def generate_vacation_days(start_date, end_date):
-    """Generate 15 vacation days in periods of 1-5 consecutive days"""
-    vacation_days = []
-    vacation_periods = []
-    
-    # We need 15 days total - create 3-5 vacation periods
-    # Possible combinations: 5+5+5, 5+5+3+2, 5+4+3+2+1, etc.
-    remaining_days = 15
-    
-    # Generate vacation periods
-    while remaining_days > 0:
-        if remaining_days >= 5:
-            period_length = random.randint(3, 5)
-        elif remaining_days >= 3:
-            period_length = random.randint(2, remaining_days)
-        else:
-            period_length = remaining_days
-        
-        # Find a valid start date for vacation
-        attempts = 0
-        while attempts < 100:
-            # Random date between start and end
-            days_between = (end_date - start_date).days
-            random_days = random.randint(0, days_between - period_length)
-            vacation_start = start_date + timedelta(days=random_days)
-            
-            # Generate consecutive working days
-            period_dates = []
-            current = vacation_start
-            working_days_found = 0
-            
-            while working_days_found < period_length and current <= end_date:
-                if current.weekday() < 5 and current not in austrian_holidays_2025 and current not in vacation_days:
-                    period_dates.append(current)
-                    working_days_found += 1
-                current += timedelta(days=1)
-            
-            # Check if we found enough consecutive working days
-            if len(period_dates) == period_length:
-                # Check no overlap with existing vacation
-                if not any(d in vacation_days for d in period_dates):
-                    vacation_days.extend(period_dates)
-                    vacation_periods.append((period_dates[0], period_dates[-1], period_length))
-                    remaining_days -= period_length
-                    break
-            
-            attempts += 1
-        
-        if attempts >= 100:
-            # If we can't find a spot, just add remaining days randomly
-            break
-    
-    return sorted(vacation_days), sorted(vacation_periods, key=lambda x: x[0])
+def is_working_day(date, calendar, vacation_mask):
+    """Check if date is a working day (not weekend, public holiday or vacation)"""
+    return calendar.is_working_day(date) and not calendar.flags(vacation_mask, date) & VACATION
 
-def generate_daily_timetrackings(date, user_id):
-    """Generate realistic timetracking entries for one day"""
-    entries = []
-    
+def generate_daily_timetrackings(date, user_id, half_day=False):
+    """Yield realistic timetracking entries for one day (4 instead of 8 hours on a half day)"""
     # Random start time between 7:30 and 9:00
     start_hour = random.randint(7, 8)
     start_minute = random.choice([0, 15, 30, 45]) if start_hour == 7 else random.choice([0, 15, 30])
@@ -109,8 +34,8 @@ def generate_daily_timetrackings(date, user_id):
     else:  # 3 breaks
         break_durations = [random.randint(10, 15), random.randint(10, 15), random.randint(10, 15)]
     
-    # Calculate total work time (8 hours)
-    total_work_minutes = 8 * 60
+    # Calculate total work time (8 hours, or 4 next to a half-day absence)
+    total_work_minutes = (4 if half_day else 8) * 60
     total_break_minutes = sum(break_durations)
     
     # Distribute work time across sessions
@@ -139,12 +64,12 @@ def generate_daily_timetrackings(date, user_id):
         current_time += timedelta(minutes=work_duration)
         end_time_str = current_time.strftime("%Y-%m-%d %H:%M:%S")
         
-        entries.append({
+        yield {
             "user_id": str(user_id),
             "task_id": str(task_id),
             "start_time": start_time_str,
             "end_time": end_time_str
-        })
+        }
         
         # Add break if not the last work session
         if i < num_work_sessions - 1:
@@ -153,48 +78,100 @@ def generate_daily_timetrackings(date, user_id):
             current_time += timedelta(minutes=break_duration)
             end_time_str = current_time.strftime("%Y-%m-%d %H:%M:%S")
             
-            entries.append({
+            yield {
                 "user_id": str(user_id),
                 "task_id": "9",  # Break task
                 "start_time": start_time_str,
                 "end_time": end_time_str
-            })
+            }
             break_idx += 1
-    
-    return entries
 
-# Generate vacation days
-start_date = datetime(2025, 5, 1)
-end_date = datetime(2025, 11, 6)
-user_id = 1
+def generate_timetrackings(user_id, calendar, vacation_days, half_days=()):
+    """Yield timetracking entries for every working day outside the vacation"""
+    vacation_mask = calendar.user_mask(vacation_days, half_days)
+    for current_date in calendar.working_days():
+        if is_working_day(current_date, calendar, vacation_mask):
+            half_day = bool(calendar.flags(vacation_mask, current_date) & SHORT_DAY)
+            yield from generate_daily_timetrackings(current_date, user_id, half_day)
+
+def parse_user_ids(value):
+    """'1,2,3' or a range '100-5099'"""
+    if "-" in value and "," not in value:
+        first, last = value.split("-")
+        return list(range(int(first), int(last) + 1))
+    return [int(v) for v in value.split(",") if v]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate timetrackings and matching absences with vacation periods")
+    parser.add_argument("--start", default="2025-05-01", help="First day (YYYY-MM-DD)")
+    parser.add_argument("--end", default="2025-11-06", help="Last day (YYYY-MM-DD)")
+    parser.add_argument("--user-id", type=int, default=1)
+    parser.add_argument("--users", help="Several user ids instead of --user-id, e.g. 1,2,3 or 100-5099")
+    parser.add_argument("--vacation-days", type=int, default=15, help="Vacation days per user (periods of 1-5 days)")
+    parser.add_argument("--sick-days", type=int, default=0, help="Sick days per user (periods of 1-3 days)")
+    parser.add_argument("--half-days", type=int, default=0,
+                        help="Half-day vacations per user (4 hours of timetrackings on those days)")
+    parser.add_argument("--region", default="AT", choices=sorted(HOLIDAY_SETS), help="Public holiday set")
+    parser.add_argument("--holidays-file", help="Holidays from a file (one YYYY-MM-DD per line) instead of --region")
+    parser.add_argument("--output", default="test_data/timetrackings.json",
+                        help="Output file; .ndjson/.jsonl streams one entry per line, "
+                             ".npz writes binary columns (requires numpy)")
+    parser.add_argument("--absences-output", default="test_data/absences.json",
+                        help="Absences of the same plan, one row per period")
+    parser.add_argument("--seed", type=int, help="Random seed for reproducible output")
+    args = parser.parse_args(argv)
+
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    start_date = datetime.strptime(args.start, "%Y-%m-%d")
+    end_date = datetime.strptime(args.end, "%Y-%m-%d")
+    user_ids = parse_user_ids(args.users) if args.users else [args.user_id]
+    holidays = load_holiday_file(args.holidays_file) if args.holidays_file else args.region
+    calendar = WorkCalendar(start_date, end_date, holidays)
 
-vacation_days, vacation_periods = generate_vacation_days(start_date, end_date)
+    # Plan vacation, sick and half days; both output files are written from this plan
+    working_days = calendar.working_days()
+    plans = {user_id: plan_absences(working_days, args.vacation_days, args.sick_days, args.half_days)
+             for user_id in user_ids}
 
-# Generate timetrackings
-all_entries = []
-current_date = start_date
+    # Generate timetrackings and stream them to file
+    total_entries = write_entries(
+        (entry for user_id in user_ids
+         for entry in generate_timetrackings(user_id, calendar, absent_days(calendar, plans[user_id]),
+                                             half_day_dates(plans[user_id]))),
+        args.output)
+    total_absences = write_entries(
+        (row for user_id in user_ids for row in absence_rows(user_id, plans[user_id])),
+        args.absences_output)
 
-while current_date <= end_date:
-    if is_working_day(current_date, vacation_days):
-        daily_entries = generate_daily_timetrackings(current_date, user_id)
-        all_entries.extend(daily_entries)
-    current_date += timedelta(days=1)
+    # Print results
+    users = f"user {user_ids[0]}" if len(user_ids) == 1 else f"{len(user_ids)} users"
+    print(f"Generated {total_entries} timetracking entries for {users}")
+    print(f"Generated {total_absences} absences in {args.absences_output}")
+    print(f"Period: {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}")
+    if len(user_ids) > 10:
+        return
 
-# Write to file
-with open('test_data/timetrackings.json', 'w') as f:
-    json.dump(all_entries, f, indent=2)
+    for user_id in user_ids:
+        absences = plans[user_id]
+        vacation_days = absent_days(calendar, [a for a in absences if a.kind == "vacation"])
+        if len(user_ids) > 1:
+            print(f"\nUser {user_id}:")
+        print(f"\nVacation days excluded ({len(vacation_days)} days total):")
+        print("\nAbsence periods:")
+        for absence in absences:
+            length = calendar.count_working_days(absence.first, absence.last)
+            label = absence.kind.replace("_", " ")
+            if absence.first == absence.last:
+                print(f"  - {absence.first.strftime('%Y-%m-%d')} (1 day, {label})")
+            else:
+                print(f"  - {absence.first.strftime('%Y-%m-%d')} to {absence.last.strftime('%Y-%m-%d')} "
+                      f"({length} days, {label})")
 
-# Print results
-print(f"Generated {len(all_entries)} timetracking entries for user {user_id}")
-print(f"Period: {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}")
-print(f"\nVacation days excluded ({len(vacation_days)} days total):")
-print("\nVacation periods:")
-for start, end, length in vacation_periods:
-    if start == end:
-        print(f"  - {start.strftime('%Y-%m-%d')} (1 day)")
-    else:
-        print(f"  - {start.strftime('%Y-%m-%d')} to {end.strftime('%Y-%m-%d')} ({length} days)")
+        print("\nAll vacation dates:")
+        for vday in vacation_days:
+            print(f"  - {vday.strftime('%Y-%m-%d')}")
 
-print("\nAll vacation dates:")
-for vday in vacation_days:
-    print(f"  - {vday.strftime('%Y-%m-%d')}")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+HDR-style latency histogram.
+
+Values are recorded in microseconds into log-linear buckets: every power of two
+is split into 64 linear sub-buckets, so each recorded value is kept with a
+relative error below 1.6% no matter whether it is 80 µs or 80 s. Memory is a
+few hundred counters per histogram, independent of the number of samples, and
+histograms of several workers or time slices can simply be merged.
+"""
+SUB_BUCKET_BITS = 7
+SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS          # values below this are exact
+SUB_BUCKET_HALF = SUB_BUCKET_COUNT // 2
+
+
+def bucket_index(value):
+    if value < SUB_BUCKET_COUNT:
+        return value
+    shift = value.bit_length() - SUB_BUCKET_BITS
+    return SUB_BUCKET_COUNT + (shift - 1) * SUB_BUCKET_HALF + (value >> shift) - SUB_BUCKET_HALF
+
+
+def bucket_bounds(index):
+    """Lowest and highest value that fall into a bucket"""
+    if index < SUB_BUCKET_COUNT:
+        return index, index
+    shift, sub = divmod(index - SUB_BUCKET_COUNT, SUB_BUCKET_HALF)
+    shift += 1
+    low = (sub + SUB_BUCKET_HALF) << shift
+    return low, low + (1 << shift) - 1
+
+
+class LatencyHistogram:
+    """Counts of latencies in log-linear microsecond buckets"""
+
+    def __init__(self):
+        self.counts = {}
+        self.total = 0
+        self.sum_us = 0
+        self.min_us = None
+        self.max_us = 0
+
+    def record(self, latency_ms):
+        value = max(0, int(latency_ms * 1000))
+        index = bucket_index(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.total += 1
+        self.sum_us += value
+        self.max_us = max(self.max_us, value)
+        self.min_us = value if self.min_us is None else min(self.min_us, value)
+
+    def merge(self, other):
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.total += other.total
+        self.sum_us += other.sum_us
+        self.max_us = max(self.max_us, other.max_us)
+        if other.min_us is not None:
+            self.min_us = other.min_us if self.min_us is None else min(self.min_us, other.min_us)
+        return self
+
+    def percentile(self, p):
+        """Latency in ms at percentile p (0-100); the upper bound of its bucket"""
+        if not self.total:
+            return 0.0
+        rank = max(1, -(-self.total * p // 100))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(bucket_bounds(index)[1], self.max_us) / 1000
+        return self.max_us / 1000
+
+    @property
+    def mean(self):
+        return self.sum_us / self.total / 1000 if self.total else 0.0
+
+    def distribution(self):
+        """(latency ms, percentile, cumulative count) per bucket, like HdrHistogram's output"""
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            yield min(bucket_bounds(index)[1], self.max_us) / 1000, seen * 100 / self.total, seen
+
+    def summary(self):
+        return {
+            "count": self.total,
+            "min_ms": (self.min_us or 0) / 1000,
+            "mean_ms": round(self.mean, 3),
+            "p50_ms": self.percentile(50),
+            "p90_ms": self.percentile(90),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "p99_9_ms": self.percentile(99.9),
+            "max_ms": self.max_us / 1000,
+        }
+
+    def to_dict(self):
+        return {"counts": {str(i): c for i, c in sorted(self.counts.items())}, **self.summary()}
@@ -0,0 +1,204 @@
+"""
+Persistent registry of server ids for seeded entities.
+
+Every entity created by uploader.py (or imported from a Newman JSON report by
+create_test_data.sh) is recorded in a local SQLite file keyed by resource,
+source data file and row index. Lookups such as "project ids for tasks" or
+"department ids for users" are answered from it instead of grepping output.txt
+or sending a read-* request for every row.
+
+    python id_registry.py ids projects                      # JSON array of created project ids
+    python id_registry.py import-newman projects report.json
+    python id_registry.py summary
+"""
+import argparse
+import json
+import sqlite3
+import sys
+import time
+
+REGISTRY_FILE = "id_registry.sqlite3"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS created (
+    namespace   TEXT NOT NULL,
+    resource    TEXT NOT NULL,
+    source      TEXT NOT NULL,
+    row_index   INTEGER NOT NULL,
+    server_id   INTEGER NOT NULL,
+    created_at  REAL NOT NULL,
+    PRIMARY KEY (namespace, resource, source, row_index)
+);
+CREATE INDEX IF NOT EXISTS created_by_resource ON created (namespace, resource, server_id);
+CREATE TABLE IF NOT EXISTS known (
+    namespace   TEXT NOT NULL,
+    resource    TEXT NOT NULL,
+    server_id   INTEGER NOT NULL,
+    read_at     REAL NOT NULL,
+    PRIMARY KEY (namespace, resource, server_id)
+);
+"""
+
+
+class IdRegistry:
+    """SQLite-backed map of (resource, source file, row index) -> server id"""
+
+    def __init__(self, path=REGISTRY_FILE, namespace="", batch_size=500):
+        self.path = path
+        self.namespace = namespace
+        self.batch_size = batch_size
+        self._db = sqlite3.connect(path)
+        self._db.executescript(SCHEMA)
+        self._pending = []
+
+    def record_created(self, resource, source, row_index, server_id):
+        """Queue a created entity; written in batches"""
+        self._pending.append((self.namespace, resource, source, row_index, int(server_id), time.time()))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self._pending:
+            with self._db:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO created VALUES (?, ?, ?, ?, ?, ?)", self._pending)
+            self._pending = []
+
+    def created_ids(self, resource, source=None):
+        """Server ids of entities this registry created, in creation order"""
+        self.flush()
+        query = "SELECT server_id FROM created WHERE namespace = ? AND resource = ?"
+        params = [self.namespace, resource]
+        if source is not None:
+            query += " AND source = ?"
+            params.append(source)
+        return [r[0] for r in self._db.execute(query + " ORDER BY created_at, row_index", params)]
+
+    def created_rows(self, resource, source):
+        """{row index: server id} for one data file"""
+        self.flush()
+        rows = self._db.execute(
+            "SELECT row_index, server_id FROM created WHERE namespace = ? AND resource = ? AND source = ?",
+            (self.namespace, resource, source))
+        return dict(rows)
+
+    def sources(self, resource):
+        """Data files entities of a resource were created from"""
+        self.flush()
+        return [r[0] for r in self._db.execute(
+            "SELECT DISTINCT source FROM created WHERE namespace = ? AND resource = ? ORDER BY source",
+            (self.namespace, resource))]
+
+    def store_read(self, resource, server_ids):
+        """Replace the ids known from one bulk read of a resource"""
+        now = time.time()
+        with self._db:
+            self._db.execute("DELETE FROM known WHERE namespace = ? AND resource = ?",
+                             (self.namespace, resource))
+            self._db.executemany("INSERT OR IGNORE INTO known VALUES (?, ?, ?, ?)",
+                                 [(self.namespace, resource, int(i), now) for i in server_ids])
+
+    def known_ids(self, resource):
+        return [r[0] for r in self._db.execute(
+            "SELECT server_id FROM known WHERE namespace = ? AND resource = ? ORDER BY server_id",
+            (self.namespace, resource))]
+
+    def forget(self, resource, server_ids):
+        """Drop entities that no longer exist on the server"""
+        # Queued records would otherwise be written after, and bring the ids back
+        self.flush()
+        with self._db:
+            for table in ("created", "known"):
+                self._db.executemany(
+                    f"DELETE FROM {table} WHERE namespace = ? AND resource = ? AND server_id = ?",
+                    [(self.namespace, resource, int(i)) for i in server_ids])
+
+    def summary(self):
+        self.flush()
+        rows = self._db.execute(
+            "SELECT namespace, resource, COUNT(*) FROM created GROUP BY namespace, resource ORDER BY 1, 2")
+        return [{"namespace": n, "resource": r, "created": c} for n, r, c in rows]
+
+    def close(self):
+        self.flush()
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def parse_response(data):
+    """Return (success, created id) from a TimeTac JSON response"""
+    try:
+        payload = json.loads(data)
+    except (TypeError, ValueError):
+        return False, None
+    if not isinstance(payload, dict):
+        return False, None
+    results = payload.get("Results")
+    created_id = None
+    if isinstance(results, list) and results and isinstance(results[0], dict):
+        created_id = results[0].get("id")
+    elif isinstance(results, dict):
+        created_id = results.get("id")
+    return payload.get("Success", True) is not False, created_id
+
+
+def import_newman_report(registry, resource, report_path, source):
+    """Record the ids created by a `newman --reporters json` run; returns the count"""
+    with open(report_path) as f:
+        report = json.load(f)
+    count = 0
+    for execution in report.get("run", {}).get("executions", []):
+        if execution.get("item", {}).get("name") != "create":
+            continue
+        stream = (execution.get("response") or {}).get("stream") or {}
+        body = bytes(stream.get("data", [])).decode("utf-8", "replace")
+        success, created_id = parse_response(body)
+        if success and created_id is not None:
+            registry.record_created(resource, source, execution.get("cursor", {}).get("iteration", count), created_id)
+            count += 1
+    registry.flush()
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the local registry of created entity ids")
+    parser.add_argument("--registry", default=REGISTRY_FILE, help="SQLite registry file")
+    parser.add_argument("--namespace", default="", help="Registry namespace (e.g. one per account)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ids = commands.add_parser("ids", help="Print created ids of a resource as a JSON array")
+    ids.add_argument("resource")
+    ids.add_argument("--source", help="Only ids created from this data file")
+    ids.add_argument("--include-read", action="store_true", help="Also include ids known from bulk reads")
+
+    imp = commands.add_parser("import-newman", help="Record ids from a newman JSON report")
+    imp.add_argument("resource")
+    imp.add_argument("report")
+    imp.add_argument("--source", help="Data file the report was run with")
+
+    commands.add_parser("summary", help="Created entities per resource")
+    args = parser.parse_args(argv)
+
+    with IdRegistry(args.registry, args.namespace) as registry:
+        if args.command == "ids":
+            result = registry.created_ids(args.resource, args.source)
+            if args.include_read:
+                seen = set(result)
+                result += [i for i in registry.known_ids(args.resource) if i not in seen]
+            print(json.dumps(result))
+        elif args.command == "import-newman":
+            count = import_newman_report(registry, args.resource, args.report, args.source or args.resource)
+            print(f"Recorded {count} {args.resource} ids from {args.report}")
+        else:
+            for row in registry.summary():
+                print(f"{row['namespace'] or '-'}\t{row['resource']}\t{row['created']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""
+Append-only progress journal for bulk loads.
+
+Every acknowledged row index is appended to `<data file>.progress` (for example
+test_data/timetrackings.json.progress) together with the id the server created.
+A rerun with --resume skips the rows that are already in the journal, so a
+failed or interrupted load does not create duplicates.
+"""
+import os
+
+JOURNAL_SUFFIX = ".progress"
+
+
+def journal_path(data_file, namespace="", shard=None):
+    """<data file>.progress, with .<namespace> per account and .<k>of<N> per shard"""
+    parts = [data_file]
+    if namespace:
+        parts.append(namespace)
+    if shard:
+        parts.append(f"{shard[0]}of{shard[1]}")
+    return ".".join(parts) + JOURNAL_SUFFIX
+
+
+class ProgressJournal:
+    """Write-ahead log of acknowledged row indexes for one data file"""
+
+    def __init__(self, path, flush_every=64):
+        self.path = path
+        self.flush_every = flush_every
+        self._file = None
+        self._pending = 0
+
+    def load(self):
+        """Return {row index: created id or None} of rows already done"""
+        done = {}
+        if not os.path.exists(self.path):
+            return done
+        with open(self.path) as f:
+            for line in f:
+                # A torn last line after a crash is simply ignored
+                if not line.endswith("\n"):
+                    break
+                index, _, created_id = line.rstrip("\n").partition("\t")
+                try:
+                    done[int(index)] = created_id or None
+                except ValueError:
+                    continue
+        return done
+
+    def open(self, resume=False):
+        """Start appending; without resume an existing journal is discarded"""
+        if resume and os.path.exists(self.path):
+            self._drop_torn_line()
+        self._file = open(self.path, "a" if resume else "w")
+        return self
+
+    def _drop_torn_line(self):
+        with open(self.path, "rb+") as f:
+            data = f.read()
+            if data and not data.endswith(b"\n"):
+                f.truncate(data.rfind(b"\n") + 1)
+
+    def record(self, index, created_id=None):
+        # Handed to the OS right away so a killed process loses nothing;
+        # fsync is batched because it dominates the cost per row
+        self._file.write(f"{index}\t{created_id if created_id is not None else ''}\n")
+        self._file.flush()
+        self._pending += 1
+        if self._pending >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if self._file is not None and self._pending:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._pending = 0
+
+    def close(self):
+        if self._file is not None:
+            self.flush()
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,274 @@
+"""
+Load test for the TimeTac create endpoints.
+
+Replays generated data (e.g. the output of generate_multi_user_timetrackings.py)
+against the same endpoints uploader.py uses, either open-loop at a fixed request
+rate or closed-loop with N virtual users, and reports per-endpoint latency
+histograms, error rates and throughput per second:
+
+    python loadtest.py timetrackings --rps 200 --duration 60
+    python loadtest.py timetrackings absences --users 50 --duration 120 --json run.json --csv run.csv
+    python loadtest.py timetrackings --rps 500 --duration 30 --mock    # offline, built-in mock server
+
+Open-loop latencies are measured from the moment a request was scheduled, not
+from when it was actually sent, so a slow server is not hidden by requests
+queueing up on the client (coordinated omission). The time spent on the wire
+alone is reported as service time.
+
+Every replayed row is really created on the target; point it at a staging
+account that may be filled with duplicates.
+"""
+import argparse
+import asyncio
+import csv
+import itertools
+import json
+import random
+import sys
+import time
+from collections import Counter
+
+from columnar import resolve_data_file
+from histogram import LatencyHistogram
+from mock_server import MockServer
+from streaming import iter_rows
+from token_cache import TokenCache
+from uploader import ENVIRONMENT, COLLECTION, FOLDER_DATA_MAP, Uploader, load_collection, load_environment
+
+
+class EndpointStats:
+    """Latency histograms, status codes and a per-second timeline for one endpoint"""
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.response = LatencyHistogram()
+        self.service = LatencyHistogram()
+        self.statuses = Counter()
+        self.errors = 0
+        # second since start -> [requests, errors, histogram]
+        self.timeline = {}
+
+    def record(self, second, success, status, response_ms, service_ms):
+        self.response.record(response_ms)
+        self.service.record(service_ms)
+        self.statuses[status if status is not None else "connection error"] += 1
+        slot = self.timeline.setdefault(second, [0, 0, LatencyHistogram()])
+        slot[0] += 1
+        slot[2].record(response_ms)
+        if not success:
+            self.errors += 1
+            slot[1] += 1
+
+    def summary(self, elapsed):
+        total = self.response.total
+        return {
+            "endpoint": self.folder,
+            "requests": total,
+            "errors": self.errors,
+            "error_rate": round(self.errors / total, 4) if total else 0.0,
+            "throughput_rps": round(total / elapsed, 1) if elapsed > 0 else 0.0,
+            "statuses": {str(k): v for k, v in sorted(self.statuses.items(), key=str)},
+            "response_time": self.response.to_dict(),
+            "service_time": self.service.to_dict(),
+        }
+
+
+class LoadTest:
+    """Replays rows through an Uploader without retries or adaptive limiting"""
+
+    def __init__(self, uploader, folders, rows):
+        self.uploader = uploader
+        self.folders = folders
+        self.rows = rows
+        self.stats = {folder: EndpointStats(folder) for folder in folders}
+        self.started = None
+        self.elapsed = 0.0
+
+    def _requests(self):
+        """Endless round-robin over the endpoints, cycling through each one's rows"""
+        cycles = [zip(itertools.repeat(folder), itertools.cycle(self.rows[folder])) for folder in self.folders]
+        for group in itertools.cycle(cycles):
+            yield next(group)
+
+    async def _send(self, folder, row, scheduled):
+        # Long runs outlive a token; this is a no-op while the current one is valid
+        await self.uploader.authenticate()
+        result = await self.uploader.send_row(folder, row)
+        now = time.perf_counter()
+        self.stats[folder].record(int(scheduled - self.started), result.success, result.status,
+                                  (now - scheduled) * 1000, result.latency_ms)
+
+    async def open_loop(self, rps, duration, max_requests, max_in_flight):
+        """Start requests on a fixed schedule regardless of how fast responses come back"""
+        in_flight = asyncio.Semaphore(max_in_flight)
+        tasks = set()
+
+        async def fire(folder, row, scheduled):
+            async with in_flight:
+                await self._send(folder, row, scheduled)
+
+        self.started = time.perf_counter()
+        for i, (folder, row) in enumerate(self._requests()):
+            scheduled = self.started + i / rps
+            if i >= max_requests or scheduled - self.started >= duration:
+                break
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            task = asyncio.create_task(fire(folder, row, scheduled))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+        self.elapsed = time.perf_counter() - self.started
+
+    async def closed_loop(self, users, duration, max_requests, think_ms=0):
+        """N virtual users that each send their next request when the last one is answered"""
+        requests = self._requests()
+        sent = 0
+
+        async def virtual_user():
+            nonlocal sent
+            while sent < max_requests and time.perf_counter() - self.started < duration:
+                sent += 1
+                folder, row = next(requests)
+                await self._send(folder, row, time.perf_counter())
+                if think_ms:
+                    await asyncio.sleep(think_ms / 1000)
+
+        self.started = time.perf_counter()
+        await asyncio.gather(*(virtual_user() for _ in range(users)))
+        self.elapsed = time.perf_counter() - self.started
+
+    def report(self):
+        return {
+            "elapsed_s": round(self.elapsed, 3),
+            "endpoints": [s.summary(self.elapsed) for s in self.stats.values()],
+        }
+
+    def write_timeline_csv(self, path):
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["second", "endpoint", "requests", "errors", "p50_ms", "p99_ms", "max_ms"])
+            for folder, stats in self.stats.items():
+                for second in sorted(stats.timeline):
+                    count, errors, hist = stats.timeline[second]
+                    writer.writerow([second, folder, count, errors, hist.percentile(50),
+                                     hist.percentile(99), hist.max_us / 1000])
+
+    def write_histogram_csv(self, path):
+        """Response-time distribution per endpoint in HdrHistogram's percentile format"""
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["endpoint", "latency_ms", "percentile", "total_count"])
+            for folder, stats in self.stats.items():
+                for latency_ms, pct, count in stats.response.distribution():
+                    writer.writerow([folder, latency_ms, round(pct, 4), count])
+
+
+def print_report(report):
+    print(f"\n📈 Load test finished in {report['elapsed_s']}s")
+    for e in report["endpoints"]:
+        r = e["response_time"]
+        print(f"   {e['endpoint']}: {e['requests']} requests, {e['throughput_rps']} req/s, "
+              f"{e['errors']} errors ({e['error_rate']:.2%})")
+        print(f"      response p50={r['p50_ms']}ms p90={r['p90_ms']}ms p99={r['p99_ms']}ms "
+              f"p99.9={r['p99_9_ms']}ms max={r['max_ms']}ms")
+        print(f"      service  p50={e['service_time']['p50_ms']}ms p99={e['service_time']['p99_ms']}ms, "
+              f"statuses {e['statuses']}")
+
+
+async def run(args):
+    collection = load_collection(args.collection)
+    rows = {}
+    for folder in args.folders:
+        data_file = args.data.get(folder) or resolve_data_file(FOLDER_DATA_MAP[folder])
+        rows[folder] = list(itertools.islice(iter_rows(data_file), args.max_rows))
+        if not rows[folder]:
+            raise SystemExit(f"No rows to replay for {folder}")
+
+    mock = None
+    if args.mock:
+        mock = await MockServer(latency_ms=args.mock_latency_ms, max_in_flight=args.mock_max_in_flight,
+                                error_rate=args.mock_error_rate).start()
+        env = {"url": mock.url, "account": "mock", "version": "v3", "access_token": "mock-token"}
+        print(f"🧪 Built-in mock server at {mock.url}")
+    else:
+        env = load_environment(args.env)
+        if args.token:
+            env["access_token"] = args.token
+
+    max_in_flight = args.users or args.max_in_flight
+    uploader = Uploader(env, collection, concurrency=max_in_flight, url=args.url,
+                        rng=random.Random(args.seed), retries=0, adaptive=False, verbose=args.verbose,
+                        token_cache=None if args.mock else TokenCache())
+    test = LoadTest(uploader, args.folders, rows)
+    try:
+        await uploader.authenticate()
+        for folder in args.folders:
+            await uploader.prefetch(folder)
+        if args.users:
+            print(f"🏃 {args.users} virtual users for {args.duration}s on {', '.join(args.folders)}")
+            await test.closed_loop(args.users, args.duration, args.requests, args.think_ms)
+        else:
+            print(f"🏃 {args.rps} req/s open-loop for {args.duration}s on {', '.join(args.folders)}")
+            await test.open_loop(args.rps, args.duration, args.requests, max_in_flight)
+    finally:
+        await uploader.close()
+        if mock is not None:
+            await mock.stop()
+    return test
+
+
+def _data_file(value):
+    folder, sep, path = value.partition("=")
+    if not sep or folder not in FOLDER_DATA_MAP:
+        raise argparse.ArgumentTypeError("expected <folder>=<data file>")
+    return folder, path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay generated data against the TimeTac API under load")
+    parser.add_argument("folders", nargs="+", choices=sorted(FOLDER_DATA_MAP), metavar="folder",
+                        help="Endpoints to replay, e.g. timetrackings absences")
+    parser.add_argument("--data", type=_data_file, action="append", default=[], metavar="FOLDER=FILE",
+                        help="Data file for a folder (default: FOLDER_DATA_MAP)")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--rps", type=float, default=50, help="Open-loop request rate over all endpoints")
+    mode.add_argument("--users", type=int, help="Closed-loop: number of concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to run")
+    parser.add_argument("--requests", type=int, default=sys.maxsize, help="Stop after this many requests")
+    parser.add_argument("--max-in-flight", type=int, default=256, help="Open-loop cap on outstanding requests")
+    parser.add_argument("--think-ms", type=float, default=0, help="Closed-loop pause between requests")
+    parser.add_argument("--max-rows", type=int, help="Only replay the first N rows of each data file")
+    parser.add_argument("--env", default=ENVIRONMENT, help="Postman environment file")
+    parser.add_argument("--collection", default=COLLECTION, help="Postman collection file")
+    parser.add_argument("--url", help="Override the environment url")
+    parser.add_argument("--token", help="Use this access token instead of the password grant")
+    parser.add_argument("--mock", action="store_true", help="Run against a built-in local mock server")
+    parser.add_argument("--mock-latency-ms", type=float, default=0, help="Mock server delay per request")
+    parser.add_argument("--mock-max-in-flight", type=int, help="Mock server answers 429 above this")
+    parser.add_argument("--mock-error-rate", type=float, default=0.0, help="Mock server 503 fraction")
+    parser.add_argument("--seed", type=int, help="Seed for the random default assignment")
+    parser.add_argument("--json", dest="json_out", help="Write the report with full histograms to this file")
+    parser.add_argument("--csv", dest="csv_out", help="Write per-second throughput and latency to this file")
+    parser.add_argument("--histogram-csv", help="Write the response-time percentile distribution to this file")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Log failed requests")
+    args = parser.parse_args(argv)
+    args.data = dict(args.data)
+
+    test = asyncio.run(run(args))
+    report = test.report()
+    print_report(report)
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.csv_out:
+        test.write_timeline_csv(args.csv_out)
+    if args.histogram_csv:
+        test.write_histogram_csv(args.histogram_csv)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
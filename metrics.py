@@ -0,0 +1,278 @@
+"""
+Hot-path instrumentation for generation and upload runs.
+
+A Metrics registry holds counters, gauges and timers. Timers are
+LatencyHistograms, so recording a value costs a dict update and quantiles are
+available at any time. Nothing is recorded unless a run creates a registry,
+and the instrumented code checks for None before timing anything.
+
+Timers
+    generate_user   generating the entries of one user
+    serialize       formatting and writing one batch of entries
+    token           acquiring an access token (cache or password grant)
+    queue_wait      waiting for a free slot of the concurrency limiter
+    request         request round trip on the wire
+
+During a run the registry can be watched in two ways:
+
+    python uploader.py timetrackings --metrics-port 9100      # curl localhost:9100/metrics
+    python uploader.py timetrackings --stats-interval 5       # one stats line every 5s
+
+and either script can be profiled:
+
+    python generate_multi_user_timetrackings.py --users 1-500 --profile gen.prof
+    python uploader.py timetrackings --tracemalloc 15
+"""
+import contextlib
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from histogram import LatencyHistogram
+
+QUANTILES = (0.5, 0.9, 0.99)
+METRIC_PREFIX = "testdata_"
+
+
+class Metrics:
+    """Counters, gauges and latency timers of one run"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        # (name, label) -> value; label is e.g. the folder, an (account, folder)
+        # pair in fan-out runs, or "" for none
+        self.counters = {}
+        self.timers = {}
+        # (name, label) -> callable returning the current value
+        self.gauges = {}
+
+    def count(self, name, value=1, label=""):
+        key = (name, label)
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, latency_ms, label=""):
+        timer = self.timers.get((name, label))
+        if timer is None:
+            timer = self.timers[(name, label)] = LatencyHistogram()
+        timer.record(latency_ms)
+
+    @contextlib.contextmanager
+    def timer(self, name, label=""):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, (time.perf_counter() - started) * 1000, label)
+
+    def gauge(self, name, read, label=""):
+        self.gauges[(name, label)] = read
+
+    def total(self, name):
+        """A counter summed over all labels"""
+        return sum(value for (counter, _), value in list(self.counters.items()) if counter == name)
+
+    def merged(self, name):
+        """A timer merged over all labels"""
+        merged = LatencyHistogram()
+        for (timer, _), histogram in list(self.timers.items()):
+            if timer == name:
+                merged.merge(histogram)
+        return merged
+
+    # ------------------------------------------------------------------
+    # Output
+    # ------------------------------------------------------------------
+
+    def prometheus(self):
+        """Text exposition format: counters, gauges and timers as summaries in seconds"""
+        lines = []
+        for (name, label), value in sorted(self.counters.items()):
+            lines.append(f"{METRIC_PREFIX}{name}_total{_labels(label)} {value}")
+        for (name, label), read in sorted(self.gauges.items()):
+            lines.append(f"{METRIC_PREFIX}{name}{_account_label(label)} {read()}")
+        for (name, label), histogram in sorted(self.timers.items()):
+            metric = f"{METRIC_PREFIX}{name}_seconds"
+            for q in QUANTILES:
+                lines.append(f"{metric}{_labels(label, quantile=q)} {histogram.percentile(q * 100) / 1000:.6f}")
+            lines.append(f"{metric}_sum{_labels(label)} {histogram.sum_us / 1e6:.6f}")
+            lines.append(f"{metric}_count{_labels(label)} {histogram.total}")
+        lines.append(f"{METRIC_PREFIX}uptime_seconds {time.perf_counter() - self.started:.3f}")
+        return "\n".join(lines) + "\n"
+
+    def stats_line(self, rows, elapsed):
+        """One line for the periodic progress output"""
+        parts = [f"{rows / elapsed if elapsed > 0 else 0.0:.0f} rows/s", f"{self.total('rows')} rows"]
+        parts.append(f"{self.total('errors')} errors")
+        gauges = {}
+        for (name, _), read in sorted(self.gauges.items()):
+            gauges[name] = gauges.get(name, 0) + read()
+        for name, value in gauges.items():
+            parts.append(f"{name.replace('_', ' ')} {value}")
+        for name in ("request", "generate_user", "serialize"):
+            histogram = self.merged(name)
+            if histogram.total:
+                parts.append(f"{name.replace('_', ' ')} p50={histogram.percentile(50)}ms "
+                             f"p99={histogram.percentile(99)}ms")
+        return "📟 " + ", ".join(parts)
+
+
+def _labels(label, **extra):
+    if isinstance(label, tuple):
+        account, label = label
+        extra = dict(account=account, **extra)
+    pairs = ([f'folder="{label}"'] if label else []) + [f'{k}="{v}"' for k, v in extra.items()]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _account_label(account):
+    return f'{{account="{account}"}}' if account else ""
+
+
+def timed_stages(items, metrics, produce, consume):
+    """Yield from items, timing how long each item took to produce and to consume"""
+    iterator = iter(items)
+    while True:
+        started = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        produced = time.perf_counter()
+        metrics.observe(produce, (produced - started) * 1000)
+        yield item
+        metrics.observe(consume, (time.perf_counter() - produced) * 1000)
+
+
+# ==================================================================================
+# Live output
+# ==================================================================================
+
+class MetricsServer:
+    """GET /metrics in Prometheus text format from a background thread"""
+
+    def __init__(self, metrics, port, host="127.0.0.1"):
+        registry = metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class StatsReporter:
+    """Prints Metrics.stats_line() every `interval` seconds from a background thread"""
+
+    def __init__(self, metrics, interval, out=None):
+        self.metrics = metrics
+        self.interval = interval
+        self.out = out or sys.stderr
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stats", daemon=True)
+
+    def _run(self):
+        last_rows, last_time = 0, time.perf_counter()
+        while not self._stop.wait(self.interval):
+            rows, now = self.metrics.total("rows"), time.perf_counter()
+            print(self.metrics.stats_line(rows - last_rows, now - last_time), file=self.out, flush=True)
+            last_rows, last_time = rows, now
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+
+@contextlib.contextmanager
+def live_metrics(metrics, port=None, interval=None):
+    """Serve /metrics and/or print stats lines while the block runs"""
+    server = MetricsServer(metrics, port).start() if port is not None else None
+    reporter = StatsReporter(metrics, interval).start() if interval else None
+    if server is not None:
+        print(f"📟 Metrics at http://127.0.0.1:{server.port}/metrics")
+    try:
+        yield metrics
+    finally:
+        if reporter is not None:
+            reporter.stop()
+        if server is not None:
+            server.stop()
+
+
+# ==================================================================================
+# Profiling
+# ==================================================================================
+
+@contextlib.contextmanager
+def profiled(profile_path=None, tracemalloc_top=0, out=None):
+    """Optionally run the block under cProfile and/or tracemalloc and report afterwards
+
+    The cProfile stats are written to profile_path (for snakeviz / pstats) and
+    the slowest functions printed; tracemalloc prints the top allocation sites
+    and the peak traced memory.
+    """
+    out = out or sys.stderr
+    profiler = cProfile.Profile() if profile_path else None
+    if tracemalloc_top:
+        tracemalloc.start()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(profile_path)
+            report = io.StringIO()
+            pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(15)
+            print(f"\n🔬 cProfile stats written to {profile_path}\n{report.getvalue()}", file=out)
+        if tracemalloc_top:
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"\n🔬 tracemalloc peak {peak / 1e6:.1f} MB, top {tracemalloc_top} allocation sites:", file=out)
+            for stat in snapshot.statistics("lineno")[:tracemalloc_top]:
+                print(f"   {stat}", file=out)
+
+
+def add_arguments(parser, live=True):
+    """--profile/--tracemalloc and, for long runs, --metrics-port/--stats-interval"""
+    group = parser.add_argument_group("instrumentation")
+    if live:
+        group.add_argument("--metrics-port", type=int,
+                           help="Serve Prometheus metrics on 127.0.0.1:PORT/metrics during the run (0 = any port)")
+        group.add_argument("--stats-interval", type=float,
+                           help="Print rows/s, in-flight, queue depth, errors and latency every N seconds")
+    group.add_argument("--profile", metavar="FILE", help="Run under cProfile and write the stats to FILE")
+    group.add_argument("--tracemalloc", type=int, default=0, metavar="N",
+                       help="Trace allocations and print the top N allocation sites")
+    return group
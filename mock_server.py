@@ -0,0 +1,192 @@
+"""
+Local stand-in for the TimeTac API.
+
+Answers the requests used by test_collection.json (OAuth2 token, */create/
+and */read/) and the */delete/<id> requests of teardown.py, so the Python
+upload path can be exercised without staging.
+Reads support the filters and paging preflight.py sends (<field>=, <field>_in,
+<field>_gte, <field>_lte, _limit, _offset). Entries are kept per account (the
+first path segment), so several accounts can be seeded against one server.
+A delete of an id that does not exist answers 404, an unknown endpoint 400:
+
+    python mock_server.py --port 8080
+    python uploader.py timetrackings --url http://127.0.0.1:8080
+"""
+import argparse
+import asyncio
+import json
+import random
+from http import HTTPStatus
+from urllib.parse import parse_qsl, urlsplit
+
+
+class MockServer:
+    """Minimal keep-alive HTTP/1.1 server that mimics TimeTac responses"""
+
+    def __init__(self, host="127.0.0.1", port=0, latency_ms=0, max_in_flight=None, error_rate=0.0):
+        self.host = host
+        self.port = port
+        self.latency_ms = latency_ms
+        # Throttling simulation: 429 above max_in_flight, random 503s at error_rate
+        self.max_in_flight = max_in_flight
+        self.error_rate = error_rate
+        self.in_flight = 0
+        self.requests = 0
+        self.throttled = 0
+        # (account, resource) -> created records
+        self.created = {}
+        self._next_id = 1000
+        self._server = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", 0))
+                body = await reader.readexactly(length) if length else b""
+
+                self.requests += 1
+                self.in_flight += 1
+                try:
+                    if self.latency_ms:
+                        await asyncio.sleep(self.latency_ms / 1000)
+                    if self.max_in_flight is not None and self.in_flight > self.max_in_flight:
+                        self.throttled += 1
+                        status, payload = 429, {"Success": False, "Error": "Too many requests"}
+                    elif self.error_rate and random.random() < self.error_rate:
+                        status, payload = 503, {"Success": False, "Error": "Service unavailable"}
+                    else:
+                        status, payload = self.route(method, target, body)
+                finally:
+                    self.in_flight -= 1
+
+                data = json.dumps(payload).encode()
+                writer.write(
+                    f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"\r\n".encode("latin-1") + data
+                )
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        except asyncio.CancelledError:
+            # Idle keep-alive connections are cancelled when the event loop shuts
+            # down; ending quietly avoids a traceback from asyncio's stream callback
+            pass
+        finally:
+            writer.close()
+
+    def route(self, method, target, body):
+        """Return (status, payload) for a request"""
+        path = urlsplit(target).path.rstrip("/")
+        parts = path.split("/")
+
+        if path.endswith("/auth/oauth2/token"):
+            return 200, {"access_token": "mock-token", "token_type": "Bearer", "expires_in": 3600}
+
+        account = parts[1] if len(parts) > 3 else ""
+        if len(parts) >= 2 and parts[-1] == "create" and method == "POST":
+            resource = account, parts[-2]
+            fields = dict(parse_qsl(body.decode()))
+            self._next_id += 1
+            record = dict(fields, id=self._next_id)
+            self.created.setdefault(resource, []).append(record)
+            return 200, {"Success": True, "ResourceName": parts[-2], "Results": [record]}
+
+        if len(parts) >= 3 and parts[-2] == "delete" and method == "DELETE":
+            records = self.created.get((account, parts[-3]), [])
+            for i, record in enumerate(records):
+                if str(record["id"]) == parts[-1]:
+                    del records[i]
+                    return 200, {"Success": True, "ResourceName": parts[-3], "Results": [{"id": record["id"]}]}
+            return 404, {"Success": False, "Error": f"{parts[-3]} {parts[-1]} does not exist"}
+
+        if len(parts) >= 2 and parts[-1] == "read" and method == "GET":
+            resource = account, parts[-2]
+            query = dict(parse_qsl(urlsplit(target).query))
+            results = [r for r in [{"id": 1}] + self.created.get(resource, []) if matches(r, query)]
+            offset = int(query.get("_offset", 0))
+            limit = int(query.get("_limit", len(results)))
+            return 200, {"Success": True, "ResourceName": parts[-2], "Results": results[offset:offset + limit]}
+
+        # Not 404, so a client can tell a wrong path from a missing entity
+        return 400, {"Success": False, "Error": f"Unknown endpoint {method} {path}"}
+
+
+def matches(record, query):
+    """Whether a stored record passes the read filters of a query"""
+    for key, value in query.items():
+        if key.startswith("_"):
+            continue
+        field, _, op = key.rpartition("_")
+        if op == "in" and field:
+            if field not in record or str(record[field]) not in value.split(","):
+                return False
+        elif op in ("gte", "lte") and field:
+            if field not in record or (str(record[field]) < value if op == "gte" else str(record[field]) > value):
+                return False
+        elif key in record and str(record[key]) != value:
+            # Equality filters on fields a record does not have (e.g. active) are ignored
+            return False
+    return True
+
+
+async def serve(host, port, latency_ms, max_in_flight=None, error_rate=0.0):
+    server = await MockServer(host, port, latency_ms, max_in_flight, error_rate).start()
+    print(f"Mock TimeTac API listening on {server.url}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the TimeTac API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency-ms", type=float, default=0, help="Artificial delay per request")
+    parser.add_argument("--max-in-flight", type=int, help="Answer 429 above this many concurrent requests")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.latency_ms, args.max_in_flight, args.error_rate))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+"""
+Vectorized NumPy backend for generate_multi_user_timetrackings.py.
+
+Draws start times, break counts, break durations and work-session splits for a
+whole batch of (user, day) pairs at once and builds the timestamps with
+datetime64 arithmetic. The layout rules are the same as in
+generate_daily_timetrackings():
+
+- start between 7:00 and 8:30 in 15-minute steps (7:00-7:45 or 8:00-8:30)
+- normal days: 8h of work, 2 breaks (10-20 + 20-30 min) or 3 breaks (10-15 min each)
+- short days: 2-5h of work, 1 break (10-20 min) or 2 breaks (10-15 min each)
+- breaks are booked on task 9, work sessions are at least 30 minutes
+
+NumPy is optional; the generator only imports this module for --backend numpy.
+Run `python numpy_backend.py` for a statistical comparison with the Python path
+(also run by tests/test_numpy_backend.py).
+"""
+import random
+from datetime import datetime
+
+import numpy as np
+
+from timetracking_batch import BREAK_TASK_ID, EPOCH_ORDINAL, TimetrackingBatch
+from work_calendar import WorkCalendar
+
+# Users per batch. Batches are seeded from (base seed, their user ids), so the
+# output only depends on the seed as long as batches are cut the same way.
+BATCH_USERS = 256
+# Sessions and breaks of one day: S0 B0 S1 B1 S2 B2 S3
+SLOTS = 7
+
+
+def _day_index(calendar):
+    """Working days of the calendar as datetime64[D]"""
+    ordinals = np.frombuffer(calendar.working_ordinals(), dtype=np.dtype("l"))
+    return (ordinals - EPOCH_ORDINAL).astype("datetime64[D]")
+
+
+def _to_days(dates):
+    return np.array([np.datetime64(d.date()) for d in dates], dtype="datetime64[D]")
+
+
+def _batch_seed(base_seed, user_ids):
+    return [int(base_seed) & 0xFFFFFFFFFFFFFFFF, int(user_ids[0]), len(user_ids), 0x7E57DA7A]
+
+
+def layout_days(rng, is_short):
+    """Draw the day layout for n pairs; returns (start minute, durations, valid, is_break)"""
+    n = len(is_short)
+
+    # Start time between 7:00 and 8:30 in 15-minute steps
+    hour = rng.integers(7, 9, n)
+    minute = rng.integers(0, np.where(hour == 7, 4, 3)) * 15
+    start = hour * 60 + minute
+
+    # Breaks: normal days 2 or 3, short days 1 or 2
+    num_breaks = np.where(is_short, 1, 2) + rng.integers(0, 2, n)
+    breaks = np.zeros((n, 3), dtype=np.int64)
+    three = num_breaks == 3
+    long_pair = (num_breaks == 2) & ~is_short
+    short_pair = (num_breaks == 2) & is_short
+    single = num_breaks == 1
+    breaks[three] = rng.integers(10, 16, (three.sum(), 3))
+    breaks[long_pair, 0] = rng.integers(10, 21, long_pair.sum())
+    breaks[long_pair, 1] = rng.integers(20, 31, long_pair.sum())
+    breaks[short_pair, :2] = rng.integers(10, 16, (short_pair.sum(), 2))
+    breaks[single, 0] = rng.integers(10, 21, single.sum())
+
+    # Work time: 8h, or 2-5h on short days
+    total_work = np.where(is_short, rng.integers(120, 301, n), 8 * 60)
+
+    # Split work into num_breaks + 1 sessions of at least 30 minutes
+    num_sessions = num_breaks + 1
+    sessions = np.zeros((n, 4), dtype=np.int64)
+    remaining = total_work.copy()
+    for i in range(3):
+        active = i < num_sessions - 1
+        high = np.minimum(180, remaining - 30 * (num_sessions - i - 1))
+        high = np.where(high < 30, remaining, high)
+        duration = 30 + np.floor(rng.random(n) * (high - 30 + 1)).astype(np.int64)
+        duration = np.where(active, duration, 0)
+        sessions[:, i] = duration
+        remaining -= duration
+    sessions[np.arange(n), num_sessions - 1] = remaining
+
+    durations = np.zeros((n, SLOTS), dtype=np.int64)
+    durations[:, 0::2] = sessions
+    durations[:, 1::2] = breaks
+    slot = np.arange(SLOTS)
+    is_break = (slot % 2 == 1)[None, :].repeat(n, axis=0)
+    valid = np.where(is_break, slot // 2 < num_breaks[:, None], slot // 2 < num_sessions[:, None])
+    # A session without work time is skipped together with the break after it
+    empty = ~is_break & (durations <= 0)
+    valid &= ~empty
+    valid[:, 1::2] &= ~empty[:, 0:-1:2]
+    return start, durations, valid, is_break
+
+
+def generate_batches_numpy(user_ids, calendar, user_vacation_days, user_short_days,
+                           base_seed, work_task_ids):
+    """Yield one TimetrackingBatch per BATCH_USERS users, computed vectorized"""
+    days = _day_index(calendar)
+    task_ids = np.asarray(work_task_ids)
+
+    for b in range(0, len(user_ids), BATCH_USERS):
+        batch = list(user_ids[b:b + BATCH_USERS])
+        rng = np.random.default_rng(_batch_seed(base_seed, batch))
+
+        # (user, day) pairs that get bookings, in user-then-day order
+        users, day_list, short = [], [], []
+        for user_id in batch:
+            keep = ~np.isin(days, _to_days(user_vacation_days[user_id]))
+            user_days = days[keep]
+            users.append(np.full(len(user_days), user_id))
+            day_list.append(user_days)
+            short.append(np.isin(user_days, _to_days(user_short_days[user_id])))
+        pair_user = np.concatenate(users)
+        pair_day = np.concatenate(day_list)
+        is_short = np.concatenate(short)
+        if not len(pair_day):
+            continue
+
+        start, durations, valid, is_break = layout_days(rng, is_short)
+        ends = start[:, None] + np.cumsum(durations * valid, axis=1)
+        starts = ends - durations
+
+        # Epoch minutes, the unit TimetrackingBatch stores
+        day_minutes = pair_day.astype("datetime64[m]").astype(np.int64)[:, None]
+        entry_user = np.broadcast_to(pair_user[:, None], valid.shape)[valid]
+        entry_task = np.where(is_break, BREAK_TASK_ID,
+                              task_ids[rng.integers(0, len(task_ids), valid.shape)])[valid]
+        yield TimetrackingBatch.from_columns(entry_user, entry_task,
+                                             (day_minutes + starts)[valid], (day_minutes + ends)[valid])
+
+
+def generate_timetrackings_numpy(user_ids, calendar, user_vacation_days, user_short_days,
+                                 base_seed, work_task_ids):
+    """Yield timetracking entries for all users, computed in vectorized batches"""
+    for batch in generate_batches_numpy(user_ids, calendar, user_vacation_days, user_short_days,
+                                        base_seed, work_task_ids):
+        yield from batch.entries()
+
+
+# ==================================================================================
+# Statistical comparison with the pure-Python path
+# ==================================================================================
+
+def _day_profile(entries):
+    """Per (user, day): start minute, break count, break minutes, work minutes, min session"""
+    days = {}
+    for e in entries:
+        start = datetime.strptime(e["start_time"], "%Y-%m-%d %H:%M:%S")
+        end = datetime.strptime(e["end_time"], "%Y-%m-%d %H:%M:%S")
+        key = (e["user_id"], start.date())
+        d = days.setdefault(key, {"start": start.hour * 60 + start.minute, "breaks": 0,
+                                  "break_min": 0, "work_min": 0, "min_session": 24 * 60})
+        minutes = int((end - start).total_seconds() // 60)
+        if e["task_id"] == str(BREAK_TASK_ID):
+            d["breaks"] += 1
+            d["break_min"] += minutes
+        else:
+            d["work_min"] += minutes
+            d["min_session"] = min(d["min_session"], minutes)
+    return list(days.values())
+
+
+def _session_lengths(entries):
+    """Work session lengths in minutes, by position within their day ("all" pools them)"""
+    position = {}
+    lengths = {"all": []}
+    for e in entries:
+        if e["task_id"] == str(BREAK_TASK_ID):
+            continue
+        start = datetime.strptime(e["start_time"], "%Y-%m-%d %H:%M:%S")
+        end = datetime.strptime(e["end_time"], "%Y-%m-%d %H:%M:%S")
+        key = (e["user_id"], start.date())
+        index = position[key] = position.get(key, -1) + 1
+        minutes = int((end - start).total_seconds() // 60)
+        lengths.setdefault(index, []).append(minutes)
+        lengths["all"].append(minutes)
+    return lengths
+
+
+def ks_statistic(a, b):
+    """Two-sample Kolmogorov-Smirnov statistic: largest distance between the empirical CDFs"""
+    a, b = np.sort(np.asarray(a)), np.sort(np.asarray(b))
+    points = np.concatenate([a, b])
+    cdf_a = np.searchsorted(a, points, side="right") / len(a)
+    cdf_b = np.searchsorted(b, points, side="right") / len(b)
+    return float(np.max(np.abs(cdf_a - cdf_b)))
+
+
+def ks_critical(n, m, c_alpha=1.95):
+    """KS rejection threshold for samples of n and m values (c_alpha 1.95: alpha = 0.001)"""
+    return c_alpha * np.sqrt((n + m) / (n * m))
+
+
+def _summary(profiles, key):
+    values = np.array([p[key] for p in profiles], dtype=float)
+    return values.mean(), values.std()
+
+
+def _distribution(profiles, key):
+    values = [p[key] for p in profiles]
+    return {v: values.count(v) / len(values) for v in sorted(set(values))}
+
+
+def compare_backends(num_users=200, seed=1):
+    """Generate the same plan with both backends and compare the day-level distributions"""
+    import generate_multi_user_timetrackings as g
+
+    calendar = WorkCalendar(datetime(2025, 4, 1), datetime(2025, 6, 6))
+    user_ids = list(range(1, num_users + 1))
+    working_days = g.get_all_working_days(calendar)
+    plan_rng = random.Random(seed)
+    vacation = {u: sorted(plan_rng.sample(working_days, 3)) for u in user_ids}
+    short = {u: g.generate_short_days(calendar, vacation[u], 6, plan_rng) for u in user_ids}
+
+    python_entries = list(g.generate_timetrackings(user_ids, calendar, vacation, short, seed))
+    numpy_entries = list(generate_timetrackings_numpy(user_ids, calendar, vacation, short, seed,
+                                                      g.work_task_ids))
+    py, vec = _day_profile(python_entries), _day_profile(numpy_entries)
+
+    failures = []
+    if len(py) != len(vec):
+        failures.append(f"day count differs: {len(py)} vs {len(vec)}")
+    for name, profiles in (("python", py), ("numpy", vec)):
+        if min(p["min_session"] for p in profiles) < 30:
+            failures.append(f"{name}: work session shorter than 30 minutes")
+        if not all(7 * 60 <= p["start"] <= 8 * 60 + 30 for p in profiles):
+            failures.append(f"{name}: start outside 7:00-8:30")
+
+    for key in ("start", "breaks", "break_min", "work_min"):
+        (mean_py, std_py), (mean_np, std_np) = _summary(py, key), _summary(vec, key)
+        # Difference of means within 4 standard errors
+        stderr = np.sqrt(std_py ** 2 / len(py) + std_np ** 2 / len(vec)) or 1e-9
+        print(f"{key:>10}: python {mean_py:8.2f} ± {std_py:6.2f}   numpy {mean_np:8.2f} ± {std_np:6.2f}")
+        if abs(mean_py - mean_np) > 4 * stderr:
+            failures.append(f"{key}: means differ by more than 4 standard errors")
+
+    for key in ("start", "breaks"):
+        dist_py, dist_np = _distribution(py, key), _distribution(vec, key)
+        # Total variation distance between the categorical distributions
+        tvd = sum(abs(dist_py.get(k, 0) - dist_np.get(k, 0)) for k in set(dist_py) | set(dist_np)) / 2
+        print(f"{key:>10}: total variation distance {tvd:.4f}")
+        if tvd > 0.05:
+            failures.append(f"{key}: distributions differ (TVD {tvd:.3f})")
+
+    # Session lengths are what the vectorized split re-implements: compare the
+    # pooled lengths and those of each position within the day
+    sessions_py, sessions_np = _session_lengths(python_entries), _session_lengths(numpy_entries)
+    for position in sorted(set(sessions_py) | set(sessions_np), key=str):
+        a, b = sessions_py.get(position, []), sessions_np.get(position, [])
+        if not a or not b:
+            failures.append(f"session {position}: only one backend has sessions there")
+            continue
+        ks, critical = ks_statistic(a, b), ks_critical(len(a), len(b))
+        print(f"session {position!s:>3}: KS {ks:.4f} (critical {critical:.4f}, {len(a)} vs {len(b)} sessions)")
+        if ks > critical:
+            failures.append(f"session {position}: length distributions differ (KS {ks:.3f} > {critical:.3f})")
+
+    return failures
+
+
+if __name__ == "__main__":
+    problems = compare_backends()
+    if problems:
+        print("\n❌ Backends differ:")
+        for problem in problems:
+            print(f"  - {problem}")
+        raise SystemExit(1)
+    print("\n✅ NumPy backend is statistically equivalent to the Python path")
@@ -0,0 +1,332 @@
+"""
+Pre-flight checks that make timetracking and absence uploads idempotent.
+
+Before a folder is uploaded:
+
+1. Generated rows are sorted by (user, start) and swept once to find entries
+   of the same user that overlap each other, O(n log n) for n rows.
+2. The entries that already exist on the server for the affected users and
+   date range are read in bulk, page by page, and indexed by a hash of their
+   content (user, task/type, start and end).
+3. Rows whose content hash matches an existing entry are skipped, and rows
+   that overlap an existing entry with different content are reported as
+   conflicts. Only the missing rows are uploaded.
+
+Running the same upload twice therefore creates nothing the second time, and
+re-seeding an environment only costs the rows that are missing.
+
+    python uploader.py timetrackings absences --skip-existing
+    python preflight.py timetrackings                                # report only
+    python preflight.py timetrackings --output reports/timetrackings.missing.json
+
+The read endpoints are paged with _limit/_offset and filtered with the
+<field>_in/_gte/_lte parameters below; mock_server.py answers them the same way.
+.gitlab/API_CONTEXT.md does not document these parameters, so the check is
+opt-in everywhere (--skip-existing, create_test_data.sh --preflight) until
+they are confirmed against the real API.
+
+The exit code is 0 when rows are missing, NOTHING_MISSING (3) when every row
+already exists on the server, and 1 when the check itself failed.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import sys
+from urllib.parse import urlencode, urlsplit
+
+from columnar import resolve_data_file
+from streaming import iter_rows, write_entries
+from token_cache import TOKEN_CACHE_FILE, TokenCache
+from uploader import (COLLECTION, ENVIRONMENT, FOLDER_DATA_MAP, Uploader, build_request,
+                      load_collection, load_environment)
+
+# Exit code of main() when there is nothing left to upload
+NOTHING_MISSING = 3
+
+# Fields that identify an entry, compared after normalize()
+CONTENT_FIELDS = {
+    "timetrackings": ("user_id", "task_id", "start_time", "end_time"),
+    "absences": ("user_id", "type_id", "subtype_id", "from_date", "to_date"),
+}
+# (start field, end field, end is inclusive): timetrackings are [start, end),
+# absences cover whole days from from_date to to_date
+INTERVAL_FIELDS = {
+    "timetrackings": ("start_time", "end_time", False),
+    "absences": ("from_date", "to_date", True),
+}
+
+PAGE_SIZE = 1000
+# Users per bulk read, so the user_id_in list keeps the URL short
+USERS_PER_READ = 200
+# Overlaps and conflicts printed per folder
+MAX_REPORTED = 10
+
+
+class PreflightError(ValueError):
+    """Generated rows overlap each other, or the existing entries cannot be read"""
+
+
+def normalize(value):
+    """Compare ids, dates and timestamps independent of their server formatting"""
+    text = str(value).strip()
+    if len(text) >= 19 and text[10] in " T" and text[4] == "-":
+        # "2025-01-02T08:00:00+01:00" -> "2025-01-02 08:00:00"
+        return text[:10] + " " + text[11:19]
+    if text.isdigit():
+        return str(int(text))
+    return text
+
+
+def content_key(folder, row):
+    """Hash of the identifying fields of a row or server entry"""
+    blob = "\x1f".join(normalize(row.get(field, "")) for field in CONTENT_FIELDS[folder])
+    return hashlib.blake2b(blob.encode(), digest_size=8).digest()
+
+
+def interval(folder, row):
+    start_field, end_field, _ = INTERVAL_FIELDS[folder]
+    return normalize(row.get(start_field, "")), normalize(row.get(end_field, ""))
+
+
+# ==================================================================================
+# Overlap sweep
+# ==================================================================================
+
+def sweep(folder, generated, existing=()):
+    """Find overlapping entries per user in one pass over the sorted intervals
+
+    `generated` are (row index, row) and `existing` are server entries. Returns
+    (overlaps, conflicts): overlaps are (earlier index, index) pairs of
+    generated rows, conflicts map a generated row index to the id of an
+    existing entry it overlaps.
+    """
+    inclusive = INTERVAL_FIELDS[folder][2]
+    intervals = []
+    for index, row in generated:
+        start, end = interval(folder, row)
+        intervals.append((normalize(row.get("user_id", "")), start, end, True, index))
+    for entry in existing:
+        start, end = interval(folder, entry)
+        intervals.append((normalize(entry.get("user_id", "")), start, end, False, entry.get("id")))
+    # Timestamps and dates in normalized form sort chronologically as strings
+    intervals.sort(key=lambda i: (i[0], i[1]))
+
+    overlaps = []
+    conflicts = {}
+    user = None
+    for user_id, start, end, is_generated, ref in intervals:
+        if user_id != user:
+            user = user_id
+            latest = {True: None, False: None}
+        # The earlier interval of each kind that reaches furthest is the one to overlap
+        for kind, other in latest.items():
+            if other is None or not (start <= other[0] if inclusive else start < other[0]):
+                continue
+            if is_generated and kind:
+                overlaps.append((other[1], ref))
+            elif is_generated:
+                conflicts.setdefault(ref, other[1])
+            elif kind:
+                conflicts.setdefault(other[1], ref)
+        if latest[is_generated] is None or end > latest[is_generated][0]:
+            latest[is_generated] = (end, ref)
+    return overlaps, conflicts
+
+
+def match_existing(folder, rows, existing):
+    """{row index: server id} of rows whose content already exists on the server
+
+    Matching is a multiset: two identical rows need two existing entries.
+    Returns (matched, unmatched existing entries).
+    """
+    index = {}
+    for entry in existing:
+        index.setdefault(content_key(folder, entry), []).append(entry)
+    matched = {}
+    for row_index, row in enumerate(rows):
+        candidates = index.get(content_key(folder, row))
+        if candidates:
+            matched[row_index] = candidates.pop().get("id")
+    unmatched = [entry for entries in index.values() for entry in entries]
+    return matched, unmatched
+
+
+# ==================================================================================
+# Bulk reads
+# ==================================================================================
+
+def read_filters(folder, rows):
+    """Date range filter covering all rows of a folder"""
+    start_field, end_field, _ = INTERVAL_FIELDS[folder]
+    first = min(normalize(row[start_field]) for row in rows)[:10]
+    last = max(normalize(row[end_field]) for row in rows)[:10]
+    if folder == "timetrackings":
+        return {"start_time_gte": f"{first} 00:00:00", "start_time_lte": f"{last} 23:59:59"}
+    return {"to_date_gte": first, "from_date_lte": last}
+
+
+async def read_pages(uploader, folder, params):
+    """All entries of one filtered read, page by page"""
+    create = uploader.collection[folder]["create"]
+    url = create["url"] if isinstance(create["url"], str) else create["url"]["raw"]
+    request = {"method": "GET", "url": url.replace("/create/", "/read/"),
+               "header": create.get("header", [])}
+    method, url, headers, _ = build_request(request, uploader.env)
+    path = urlsplit(url).path
+
+    entries = []
+    seen = set()
+    offset = 0
+    while True:
+        query = urlencode(dict(params, _limit=PAGE_SIZE, _offset=offset))
+        response = await uploader.client.request(method, f"{path}?{query}", headers)
+        if response.status != 200:
+            raise PreflightError(f"Reading existing {folder} failed with HTTP {response.status}")
+        results = page_results(response.body)
+        # A server that ignores _offset would return the first page forever
+        fresh = [r for r in results if r.get("id") not in seen]
+        seen.update(r.get("id") for r in fresh)
+        entries += fresh
+        if len(results) < PAGE_SIZE or not fresh:
+            return entries
+        offset += PAGE_SIZE
+
+
+def page_results(body):
+    try:
+        results = json.loads(body).get("Results") or []
+    except (ValueError, AttributeError):
+        return []
+    if isinstance(results, dict):
+        results = [results]
+    return [r for r in results if isinstance(r, dict)]
+
+
+async def read_existing(uploader, folder, rows):
+    """Server entries of the users and date range the rows cover"""
+    await uploader.authenticate()
+    users = sorted({normalize(row["user_id"]) for row in rows}, key=lambda u: (len(u), u))
+    filters = read_filters(folder, rows)
+    existing = []
+    for first in range(0, len(users), USERS_PER_READ):
+        params = dict(filters, user_id_in=",".join(users[first:first + USERS_PER_READ]))
+        existing += await read_pages(uploader, folder, params)
+    return existing
+
+
+# ==================================================================================
+# Pre-flight
+# ==================================================================================
+
+class Preflight:
+    """Outcome of the checks for one folder"""
+
+    def __init__(self, folder, rows, overlaps, existing, conflicts, read):
+        self.folder = folder
+        self.rows = rows
+        self.overlaps = overlaps
+        self.existing = existing
+        self.conflicts = conflicts
+        self.read = read
+
+    @property
+    def skip(self):
+        """{row index: server id or None} of rows that must not be sent"""
+        done = dict.fromkeys(self.conflicts)
+        done.update(self.existing)
+        return done
+
+    @property
+    def missing(self):
+        return len(self.rows) - len(self.skip)
+
+    def missing_rows(self):
+        skip = self.skip
+        return (row for index, row in enumerate(self.rows) if index not in skip)
+
+    def report(self):
+        lines = [f"🛫 Pre-flight {self.folder}: {len(self.rows)} rows, {self.read} on the server, "
+                 f"{len(self.existing)} already exist, {len(self.conflicts)} conflict, "
+                 f"{self.missing} to upload"]
+        lines += overlap_lines(self.folder, self.rows, self.overlaps)
+        for index, server_id in list(self.conflicts.items())[:MAX_REPORTED]:
+            lines.append(f"   ⚠️  row {index} overlaps existing entry {server_id}: "
+                         f"{describe(self.folder, self.rows[index])}")
+        if len(self.overlaps) > MAX_REPORTED or len(self.conflicts) > MAX_REPORTED:
+            lines.append(f"   ... {len(self.overlaps)} overlaps and {len(self.conflicts)} conflicts in total")
+        return "\n".join(lines)
+
+
+def describe(folder, row):
+    start, end = interval(folder, row)
+    return f"user {row.get('user_id')} {start} - {end}"
+
+
+def overlap_lines(folder, rows, overlaps):
+    return [f"   ⚠️  rows {first} and {second} overlap: "
+            f"{describe(folder, rows[first])} / {describe(folder, rows[second])}"
+            for first, second in overlaps[:MAX_REPORTED]]
+
+
+async def preflight(uploader, folder, rows, allow_overlaps=False):
+    """Check rows against each other and against the server; returns a Preflight
+
+    Raises PreflightError when generated rows overlap, unless allow_overlaps.
+    """
+    overlaps, _ = sweep(folder, enumerate(rows))
+    if overlaps and not allow_overlaps:
+        lines = [f"{len(overlaps)} overlapping {folder} rows, fix the data or pass --allow-overlaps"]
+        raise PreflightError("\n".join(lines + overlap_lines(folder, rows, overlaps)))
+    existing = await read_existing(uploader, folder, rows) if rows else []
+    matched, others = match_existing(folder, rows, existing)
+    conflicts = {}
+    if not allow_overlaps:
+        remaining = ((i, row) for i, row in enumerate(rows) if i not in matched)
+        _, conflicts = sweep(folder, remaining, others)
+    return Preflight(folder, rows, overlaps, matched, conflicts, len(existing))
+
+
+async def run(args):
+    env = load_environment(args.env)
+    if args.token:
+        env["access_token"] = args.token
+    uploader = Uploader(env, load_collection(args.collection), url=args.url,
+                        rng=random.Random(), token_cache=None if args.no_token_cache else TokenCache())
+    try:
+        return await preflight(uploader, args.folder, list(iter_rows(args.data_file)), args.allow_overlaps)
+    finally:
+        await uploader.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check a data file for overlaps and rows that already exist")
+    parser.add_argument("folder", choices=sorted(CONTENT_FIELDS))
+    parser.add_argument("--data-file", help="Data file (default: FOLDER_DATA_MAP)")
+    parser.add_argument("--output", help="Write the rows that are missing on the server to this file")
+    parser.add_argument("--allow-overlaps", action="store_true",
+                        help="Do not fail on overlapping rows and upload rows that overlap existing entries")
+    parser.add_argument("--env", default=ENVIRONMENT, help="Postman environment file")
+    parser.add_argument("--collection", default=COLLECTION, help="Postman collection file")
+    parser.add_argument("--url", help="Override the environment url")
+    parser.add_argument("--token", help="Use this access token instead of the password grant")
+    parser.add_argument("--no-token-cache", action="store_true",
+                        help=f"Do not share the access token through {TOKEN_CACHE_FILE}")
+    args = parser.parse_args(argv)
+    args.data_file = args.data_file or resolve_data_file(FOLDER_DATA_MAP[args.folder])
+
+    try:
+        result = asyncio.run(run(args))
+    except PreflightError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    print(result.report())
+    if args.output:
+        write_entries(result.missing_rows(), args.output)
+        print(f"💾 {result.missing} missing rows written to {args.output}")
+    return 0 if result.missing else NOTHING_MISSING
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+"""
+Adaptive concurrency limiting and retry backoff for bulk loads.
+
+AimdLimiter keeps the number of requests in flight close to what the API can
+sustain: the limit grows by `increase` per window of successful requests and is
+multiplied by `decrease` when the server throttles (429) or fails (5xx).
+
+FairBudget caps the requests in flight across several accounts seeded at the
+same time, handing free slots to the waiting accounts in turn.
+"""
+import asyncio
+import contextlib
+import random
+import time
+from collections import OrderedDict, deque
+
+# Retried besides every 5xx
+RETRYABLE_STATUSES = {429}
+
+
+def is_retryable(status):
+    """429 and 5xx responses are worth retrying, other statuses are final"""
+    return status in RETRYABLE_STATUSES or 500 <= status < 600
+
+
+def backoff_delay(attempt, base=0.25, cap=30.0, retry_after=None, rng=random):
+    """Exponential backoff with full jitter, or the server's Retry-After if given"""
+    if retry_after is not None:
+        return min(cap, retry_after)
+    return rng.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def parse_retry_after(headers):
+    """Retry-After in seconds (only the delta-seconds form is used by TimeTac)"""
+    value = (headers or {}).get("retry-after")
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+class AimdLimiter:
+    """Additive-increase / multiplicative-decrease limit on requests in flight"""
+
+    def __init__(self, initial=8, minimum=1, maximum=64, increase=1.0, decrease=0.5):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.increase = increase
+        self.decrease = decrease
+        self.limit = float(max(minimum, min(initial, maximum)))
+        self.in_flight = 0
+        # Callers waiting for a free slot
+        self.waiting = 0
+        self.throttled = 0
+        self._cond = asyncio.Condition()
+        self._last_decrease = 0.0
+
+    async def acquire(self):
+        async with self._cond:
+            self.waiting += 1
+            try:
+                await self._cond.wait_for(lambda: self.in_flight < int(self.limit))
+            finally:
+                self.waiting -= 1
+            self.in_flight += 1
+
+    async def release(self):
+        async with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.release()
+
+    def on_success(self):
+        """Grow by `increase` per full window of successes (one step per round trip)"""
+        self.limit = min(self.maximum, self.limit + self.increase / max(self.limit, 1.0))
+
+    def on_throttle(self, latency_s=0.0):
+        """Shrink once per round trip, so a burst of 429s only halves the limit once"""
+        now = time.monotonic()
+        self.throttled += 1
+        if now - self._last_decrease < max(latency_s, 0.05):
+            return
+        self._last_decrease = now
+        self.limit = max(float(self.minimum), self.limit * self.decrease)
+
+
+class FairBudget:
+    """Global limit on requests in flight, shared round-robin between accounts
+
+    Each account keeps its own AimdLimiter; a request additionally needs a slot
+    of the budget. When the budget is exhausted, freed slots go to the waiting
+    accounts in turn, so an account with a deep queue cannot starve the others.
+    """
+
+    def __init__(self, total):
+        self.total = total
+        self.in_flight = 0
+        # account -> futures of its waiting requests, in the order accounts are served
+        self._waiters = OrderedDict()
+
+    @property
+    def waiting(self):
+        return sum(len(queue) for queue in self._waiters.values())
+
+    async def acquire(self, account):
+        if self.in_flight < self.total and not self._waiters:
+            self.in_flight += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(account, deque()).append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just before the cancellation
+                self.release()
+            else:
+                self._discard(account, future)
+            raise
+
+    def release(self):
+        self.in_flight -= 1
+        self._wake()
+
+    def _discard(self, account, future):
+        queue = self._waiters.get(account)
+        if queue is not None and future in queue:
+            queue.remove(future)
+            if not queue:
+                del self._waiters[account]
+
+    def _wake(self):
+        while self.in_flight < self.total and self._waiters:
+            # Serve the account at the front, then move it to the back
+            account, queue = self._waiters.popitem(last=False)
+            future = queue.popleft()
+            if queue:
+                self._waiters[account] = queue
+            if not future.done():
+                self.in_flight += 1
+                future.set_result(None)
+
+    @contextlib.asynccontextmanager
+    async def slot(self, account):
+        await self.acquire(account)
+        try:
+            yield
+        finally:
+            self.release()
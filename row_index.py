@@ -0,0 +1,300 @@
+"""
+Row-offset index for random access into JSON-array and NDJSON data files.
+
+An index records the byte offset at which every row of a data file starts, so
+a reader can memory-map the file and parse just the rows it needs: one shard
+of the file, or everything after the resume point of an interrupted upload.
+Opening an indexed file costs two mmap calls no matter how many rows it has,
+and only the rows being iterated are ever held in memory.
+
+    python row_index.py build test_data/timetrackings.json     # writes test_data/timetrackings.json.idx
+    python row_index.py info test_data/timetrackings.json
+
+    # Four processes (or machines sharing the file) upload disjoint quarters
+    python uploader.py timetrackings --shard 1/4
+    python uploader.py timetrackings --shard 2/4 ...
+
+The index file `<data file>.idx` is a small header (magic, size and mtime of
+the data file, row count) followed by one little-endian uint64 offset per row.
+An index whose data file changed since it was built is rebuilt on open.
+Building scans the file once; JSON arrays are scanned in windows with the C
+JSON decoder, so memory stays constant while the index is written.
+"""
+import argparse
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+from array import array
+
+from streaming import detect_format, partial_marker
+
+INDEX_SUFFIX = ".idx"
+INDEX_MAGIC = b"RIX1"
+# magic, data file size, data file mtime_ns, rows
+HEADER = struct.Struct("<4sQqQ")
+# Bytes of a JSON array decoded at a time while building; doubled for larger rows
+SCAN_WINDOW = 1 << 22
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+def index_path(data_file):
+    return data_file + INDEX_SUFFIX
+
+
+def _signature(data_file):
+    stat = os.stat(data_file)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _map(path):
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+# ==================================================================================
+# Building
+# ==================================================================================
+
+def ndjson_offsets(data):
+    """Offsets of the non-blank lines of an NDJSON file"""
+    offsets = array("Q")
+    size = len(data)
+    position = 0
+    while position < size:
+        newline = data.find(b"\n", position)
+        if newline < 0:
+            newline = size
+        if data[position:newline].strip():
+            offsets.append(position)
+        position = newline + 1
+    return offsets
+
+
+def json_array_offsets(data, window=SCAN_WINDOW):
+    """Offsets of the elements of a top-level JSON array
+
+    The file is decoded as latin-1 one window at a time, so character positions
+    are byte positions; UTF-8 text inside strings does not disturb the scan.
+    """
+    decoder = json.JSONDecoder()
+    offsets = array("Q")
+    size = len(data)
+    base = 0
+    text = data[:window].decode("latin-1")
+    position = 0
+    expect = "["
+    while True:
+        position = _WHITESPACE.match(text, position).end()
+        at_eof = base + len(text) >= size
+        if position == len(text):
+            if at_eof:
+                raise ValueError("unexpected end of the JSON array")
+            base, position = base + position, 0
+            text = data[base:base + window].decode("latin-1")
+            continue
+        char = text[position]
+        if expect == "[":
+            if char != "[":
+                raise ValueError("data file is not a JSON array")
+            position += 1
+            expect = "first"
+            continue
+        if expect == "separator":
+            if char == "]":
+                return offsets
+            if char != ",":
+                raise ValueError(f"expected ',' or ']' at byte {base + position}")
+            position += 1
+            expect = "value"
+            continue
+        if expect == "first" and char == "]":
+            return offsets
+        try:
+            _, end = decoder.raw_decode(text, position)
+            complete = end < len(text) or at_eof
+        except ValueError:
+            if at_eof:
+                raise
+            complete = False
+        if not complete:
+            # The row crosses the window: restart the window at the row, larger
+            # if the row alone does not fit
+            if position == 0:
+                window *= 2
+            base, position = base + position, 0
+            text = data[base:base + window].decode("latin-1")
+            continue
+        offsets.append(base + position)
+        position = end
+        expect = "separator"
+
+
+def build_index(data_file, path=None):
+    """Scan a data file and write its index; returns the row count"""
+    fmt = detect_format(data_file)
+    if fmt == "npz":
+        raise ValueError(f"{data_file}: .npz files are indexed by their columns already")
+    if os.path.exists(partial_marker(data_file)):
+        raise ValueError(f"{data_file} is still being written")
+    path = path or index_path(data_file)
+    size, mtime_ns = _signature(data_file)
+    if size:
+        data = _map(data_file)
+        try:
+            offsets = ndjson_offsets(data) if fmt == "ndjson" else json_array_offsets(data)
+        finally:
+            data.close()
+    else:
+        offsets = array("Q")
+    if sys.byteorder != "little":
+        offsets.byteswap()
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(INDEX_MAGIC, size, mtime_ns, len(offsets)))
+        offsets.tofile(f)
+    os.replace(tmp, path)
+    return len(offsets)
+
+
+def is_fresh(data_file, path=None):
+    """Whether an index exists and matches the data file as it is now"""
+    try:
+        with open(path or index_path(data_file), "rb") as f:
+            magic, size, mtime_ns, _ = HEADER.unpack(f.read(HEADER.size))
+    except (OSError, struct.error):
+        return False
+    return magic == INDEX_MAGIC and (size, mtime_ns) == _signature(data_file)
+
+
+# ==================================================================================
+# Reading
+# ==================================================================================
+
+class RowIndex:
+    """Memory-mapped data file plus its row offsets
+
+    Iterating yields the rows as parsed dicts, like iterating the JSON file;
+    `iter_rows(first, end)` and indexing only parse the rows asked for.
+    """
+
+    def __init__(self, data_file, path=None):
+        self.data_file = data_file
+        self.path = path or index_path(data_file)
+        self._index = _map(self.path)
+        magic, self.size, _, self.rows = HEADER.unpack_from(self._index)
+        if magic != INDEX_MAGIC:
+            raise ValueError(f"{self.path} is not a row index")
+        self._data = _map(data_file) if self.size else b""
+        offsets = memoryview(self._index)[HEADER.size:HEADER.size + 8 * self.rows].cast("Q")
+        if sys.byteorder != "little":
+            offsets = array("Q", offsets)
+            offsets.byteswap()
+        self._offsets = offsets
+        self._decoder = json.JSONDecoder()
+
+    @classmethod
+    def open(cls, data_file, rebuild=True):
+        """Open the index of a data file, building it first if it is missing or stale"""
+        if not is_fresh(data_file):
+            if not rebuild:
+                raise ValueError(f"{index_path(data_file)} is missing or out of date")
+            build_index(data_file)
+        return cls(data_file)
+
+    def __len__(self):
+        return self.rows
+
+    def offset(self, index):
+        return self._offsets[index]
+
+    def _row(self, index):
+        start = self._offsets[index]
+        end = self._offsets[index + 1] if index + 1 < self.rows else self.size
+        # Trailing separators (",\n  " or the closing "]") are ignored by raw_decode
+        return self._decoder.raw_decode(self._data[start:end].decode("utf-8"))[0]
+
+    def iter_rows(self, first=0, end=None):
+        """Yield rows [first, end)"""
+        end = self.rows if end is None else min(end, self.rows)
+        for index in range(first, end):
+            yield self._row(index)
+
+    __iter__ = iter_rows
+
+    def __getitem__(self, index):
+        if not 0 <= index < self.rows:
+            raise IndexError(index)
+        return self._row(index)
+
+    def close(self):
+        # The offsets view must be released before its mmap can be closed
+        if isinstance(self._offsets, memoryview):
+            self._offsets.release()
+        self._index.close()
+        if self.size:
+            self._data.close()
+
+
+def shard_range(rows, shard, shards):
+    """Rows [first, end) of shard k of N (1-based); shards cover all rows exactly once"""
+    if not 1 <= shard <= shards:
+        raise ValueError(f"shard {shard} is not between 1 and {shards}")
+    return rows * (shard - 1) // shards, rows * shard // shards
+
+
+def parse_shard(value):
+    """argparse type for "k/N" """
+    shard, _, shards = value.partition("/")
+    try:
+        shard, shards = int(shard), int(shards)
+        shard_range(0, shard, shards)
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected k/N with 1 <= k <= N, e.g. 2/4") from None
+    return shard, shards
+
+
+def resume_point(done, first, end):
+    """First row of [first, end) not yet acknowledged in `done`"""
+    while first < end and first in done:
+        first += 1
+    return first
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or inspect row-offset indexes of JSON/NDJSON data files")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="Index data files (writes <file>.idx)")
+    build.add_argument("files", nargs="+")
+    info = commands.add_parser("info", help="Show rows, freshness and shard boundaries of an index")
+    info.add_argument("file")
+    info.add_argument("--shards", type=int, help="Also print the row ranges of N shards")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        for data_file in args.files:
+            try:
+                rows = build_index(data_file)
+            except (OSError, ValueError) as e:
+                print(f"❌ {data_file}: {e}", file=sys.stderr)
+                return 1
+            print(f"🗂️  {index_path(data_file)}: {rows} rows")
+        return 0
+
+    if not is_fresh(args.file):
+        print(f"{index_path(args.file)} is missing or out of date, run: python row_index.py build {args.file}")
+        return 1
+    index = RowIndex(args.file)
+    print(f"{args.file}: {len(index)} rows, {index.size} bytes, index {os.path.getsize(index.path)} bytes")
+    for shard in range(1, (args.shards or 0) + 1):
+        first, end = shard_range(len(index), shard, args.shards)
+        print(f"  shard {shard}/{args.shards}: rows {first}-{end - 1} ({end - first} rows)")
+    index.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,267 @@
+"""
+Structured NDJSON log of every request of an upload run.
+
+Each request becomes one compact line instead of the full `newman --verbose`
+dump in output.txt:
+
+    {"ts": 1760000000.123, "resource": "timetrackings", "row": 17, "attempt": 0,
+     "status": 201, "latency_ms": 12.4, "created_id": 4711}
+
+Failed requests also get an "error" and, for the first failures, the start of
+the response body. Bodies of successful requests are only kept for a sampled
+fraction (--log-bodies), so a record costs about the same ~150 bytes no matter
+how large the folder is. Records are handed to a background thread that writes
+them in batches, so the upload loop never waits for the disk. A path ending in
+.gz is written gzip-compressed.
+
+    python uploader.py timetrackings --run-log reports/run_log.ndjson
+    python run_log.py summary reports/run_log.ndjson
+    python run_log.py failures reports/run_log.ndjson --resource timetrackings
+    python run_log.py slow reports/run_log.ndjson --top 20
+    python run_log.py import-newman projects reports/projects.json reports/run_log.ndjson
+
+create_test_data.sh imports every Newman JSON report into reports/run_log.ndjson.
+"""
+import argparse
+import gzip
+import heapq
+import json
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from queue import Empty, SimpleQueue
+
+from histogram import LatencyHistogram
+from id_registry import parse_response
+
+RUN_LOG_FILE = "reports/run_log.ndjson"
+# Bytes of a response body kept in a record
+MAX_BODY = 1024
+# Failures after this many are logged without their body
+MAX_ERROR_BODIES = 1000
+WRITE_BATCH = 512
+
+
+def open_log(path, mode="r"):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def is_failure(record):
+    status = record.get("status")
+    return bool(record.get("error")) or status is None or not 200 <= status < 300
+
+
+def _body_text(body):
+    if isinstance(body, bytes):
+        body = body[:MAX_BODY].decode("utf-8", "replace")
+    return body[:MAX_BODY]
+
+
+class RunLog:
+    """Buffered NDJSON writer fed from the request loop, written by a background thread"""
+
+    def __init__(self, path=RUN_LOG_FILE, body_sample=0.0, max_error_bodies=MAX_ERROR_BODIES,
+                 append=True, rng=None):
+        self.path = path
+        self.body_sample = body_sample
+        self.max_error_bodies = max_error_bodies
+        self.rng = rng or random.Random()
+        self.records = 0
+        self.failures = 0
+        self._queue = SimpleQueue()
+        self._file = open_log(path, "a" if append else "w")
+        self._thread = threading.Thread(target=self._write_loop, name="run-log", daemon=True)
+        self._thread.start()
+
+    def record(self, resource, row, status, latency_ms, created_id=None, error=None, body=None, attempt=0):
+        """Queue one request; only cheap bookkeeping happens on the caller's thread"""
+        self.records += 1
+        failed = bool(error) or status is None or not 200 <= status < 300
+        keep_body = body is not None and (
+            self.failures < self.max_error_bodies if failed
+            else self.body_sample and self.rng.random() < self.body_sample)
+        if failed:
+            self.failures += 1
+        self._queue.put((time.time(), resource, row, attempt, status, latency_ms, created_id,
+                         error, body if keep_body else None))
+
+    def _write_loop(self):
+        while True:
+            item = self._queue.get()
+            batch = []
+            while item is not None:
+                batch.append(self._encode(item))
+                if len(batch) >= WRITE_BATCH:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except Empty:
+                    break
+            if batch:
+                self._file.write("".join(batch))
+                self._file.flush()
+            if item is None:
+                return
+
+    @staticmethod
+    def _encode(item):
+        ts, resource, row, attempt, status, latency_ms, created_id, error, body = item
+        record = {"ts": round(ts, 3), "resource": resource, "row": row, "attempt": attempt,
+                  "status": status, "latency_ms": round(latency_ms, 2)}
+        if created_id is not None:
+            record["created_id"] = created_id
+        if error:
+            record["error"] = error
+        if body is not None:
+            record["body"] = _body_text(body)
+        return json.dumps(record, separators=(",", ":")) + "\n"
+
+    def close(self):
+        if self._file is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._file.close()
+        self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ==================================================================================
+# Newman reports
+# ==================================================================================
+
+def import_newman_report(run_log, resource, report_path):
+    """Append one record per create request of a `newman --reporters json` run; returns the count"""
+    with open(report_path) as f:
+        report = json.load(f)
+    count = 0
+    for execution in report.get("run", {}).get("executions", []):
+        if execution.get("item", {}).get("name") != "create":
+            continue
+        response = execution.get("response") or {}
+        body = bytes((response.get("stream") or {}).get("data", [])).decode("utf-8", "replace")
+        status = response.get("code")
+        error = (execution.get("requestError") or {}).get("message")
+        failed = [a["error"]["message"] for a in execution.get("assertions") or [] if a.get("error")]
+        if failed and not error:
+            error = "; ".join(failed)
+        success, created_id = parse_response(body)
+        run_log.record(resource, execution.get("cursor", {}).get("iteration", count), status,
+                       float(response.get("responseTime") or 0), created_id if success else None,
+                       error, body or None)
+        count += 1
+    return count
+
+
+# ==================================================================================
+# Queries
+# ==================================================================================
+
+def read_records(path, resource=None):
+    """Stream the records of a run log, skipping a torn last line"""
+    with open_log(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if resource is None or record.get("resource") == resource:
+                yield record
+
+
+def summarize(records):
+    """Per resource: request and failure counts, statuses and a latency histogram"""
+    resources = {}
+    for record in records:
+        entry = resources.setdefault(record["resource"], {
+            "requests": 0, "failed": 0, "retries": 0, "statuses": Counter(), "latency": LatencyHistogram()})
+        entry["requests"] += 1
+        entry["failed"] += is_failure(record)
+        entry["retries"] += record.get("attempt", 0) > 0
+        entry["statuses"][record.get("status") or "connection error"] += 1
+        entry["latency"].record(record.get("latency_ms", 0))
+    return resources
+
+
+def format_record(record):
+    fields = [record["resource"], f"row {record.get('row')}", str(record.get("status") or "-"),
+              f"{record.get('latency_ms', 0)}ms"]
+    if record.get("attempt"):
+        fields.append(f"attempt {record['attempt']}")
+    if record.get("error"):
+        fields.append(record["error"])
+    if record.get("body"):
+        fields.append(record["body"].replace("\n", " ")[:200])
+    return "\t".join(fields)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query or import structured upload run logs")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    summary = commands.add_parser("summary", help="Requests, failures and latency per resource")
+    failures = commands.add_parser("failures", help="Failed requests")
+    failures.add_argument("--limit", type=int, help="Print at most this many")
+    slow = commands.add_parser("slow", help="Slowest requests")
+    slow.add_argument("--top", type=int, default=20, help="How many to print")
+    slow.add_argument("--over-ms", type=float, help="Print every request slower than this instead")
+    for command in (summary, failures, slow):
+        command.add_argument("log", help="Run log file")
+        command.add_argument("--resource", help="Only this resource")
+        command.add_argument("--json", action="store_true", help="Print matching records as NDJSON")
+
+    imp = commands.add_parser("import-newman", help="Append the requests of a newman JSON report")
+    imp.add_argument("resource")
+    imp.add_argument("report")
+    imp.add_argument("log", nargs="?", default=RUN_LOG_FILE, help="Run log file")
+    imp.add_argument("--log-bodies", type=float, default=0.0,
+                     help="Fraction of successful responses whose body is kept")
+    args = parser.parse_args(argv)
+
+    if args.command == "import-newman":
+        with RunLog(args.log, body_sample=args.log_bodies) as run_log:
+            count = import_newman_report(run_log, args.resource, args.report)
+        print(f"Logged {count} {args.resource} requests ({run_log.failures} failed) to {args.log}")
+        return 0
+
+    records = read_records(args.log, args.resource)
+    if args.command == "summary":
+        for resource, entry in sorted(summarize(records).items()):
+            latency = entry["latency"].summary()
+            if args.json:
+                print(json.dumps({"resource": resource, "requests": entry["requests"],
+                                  "failed": entry["failed"], "retries": entry["retries"],
+                                  "statuses": {str(k): v for k, v in entry["statuses"].items()},
+                                  "latency": latency}))
+                continue
+            statuses = ", ".join(f"{k}: {v}" for k, v in sorted(entry["statuses"].items(), key=str))
+            print(f"{resource}: {entry['requests']} requests, {entry['failed']} failed, "
+                  f"{entry['retries']} retries ({statuses})")
+            print(f"   latency p50={latency['p50_ms']}ms p95={latency['p95_ms']}ms "
+                  f"p99={latency['p99_ms']}ms max={latency['max_ms']}ms")
+        return 0
+
+    if args.command == "failures":
+        selected = (r for r in records if is_failure(r))
+        if args.limit is not None:
+            selected = (r for _, r in zip(range(args.limit), selected))
+    elif args.over_ms is not None:
+        selected = (r for r in records if r.get("latency_ms", 0) > args.over_ms)
+    else:
+        selected = heapq.nlargest(args.top, records, key=lambda r: r.get("latency_ms", 0))
+    for record in selected:
+        print(json.dumps(record) if args.json else format_record(record))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+"""
+Dependency-aware scheduling of several folders in one upload run.
+
+The folders form a foreign-key graph:
+
+    departments ──> users ──┬──> timetrackings
+    projects ────> tasks ───┘    absences (users only)
+
+Folders without a path between them (departments and projects, timetrackings
+and absences) are uploaded at the same time over the uploader's shared
+connection pool and concurrency limit. Links that are assigned per row are
+pipelined: a task without a mother_id is given one of the project rows of
+this run up front and is sent as soon as that project's id is known, instead
+of after the whole projects folder. Timetrackings and absences reference
+existing user/task ids from their data file, so they wait for the users and
+tasks folders of the run to finish.
+"""
+import asyncio
+
+# Folder -> folders that must be complete before it starts
+DEPENDENCIES = {
+    "departments": (),
+    "projects": (),
+    "users": (),
+    "tasks": (),
+    "timetrackings": ("users", "tasks"),
+    "absences": ("users",),
+}
+
+# Folder -> (field, parent folder, context key of ids that existed before the run)
+ROW_LINKS = {
+    "tasks": ("mother_id", "projects", None),
+    "users": ("department_id", "departments", "department_ids"),
+}
+
+
+def parent_folders(folder):
+    """Folders whose ids rows of `folder` reference"""
+    parents = set(DEPENDENCIES.get(folder, ()))
+    if folder in ROW_LINKS:
+        parents.add(ROW_LINKS[folder][1])
+    return parents
+
+
+def dependency_order(folders):
+    """Folders sorted so every folder comes after the folders it depends on"""
+    requested = set(folders)
+    ordered, placed = [], set()
+    while len(ordered) < len(requested):
+        ready = [f for f in folders if f not in placed and not (parent_folders(f) & requested) - placed]
+        if not ready:
+            raise ValueError(f"Circular dependency between {sorted(requested - placed)}")
+        ordered.extend(ready)
+        placed.update(ready)
+    return ordered
+
+
+def teardown_stages(folders):
+    """Folders grouped for deletion: each stage only holds folders that no folder
+    of a later stage references, e.g. timetrackings and absences before users"""
+    remaining = list(dict.fromkeys(folders))
+    stages = []
+    while remaining:
+        stage = [f for f in remaining if not any(f in parent_folders(o) for o in remaining if o != f)]
+        if not stage:
+            raise ValueError(f"Circular dependency between {sorted(remaining)}")
+        stages.append(stage)
+        remaining = [f for f in remaining if f not in stage]
+    return stages
+
+
+class RowIds:
+    """Ids created for the rows of one parent folder, available as they arrive"""
+
+    def __init__(self, count):
+        loop = asyncio.get_running_loop()
+        self.count = count
+        self._futures = [loop.create_future() for _ in range(count)]
+        self.known = set()
+
+    def set(self, index, created_id):
+        """Record the id of a row (None if it failed)"""
+        if 0 <= index < self.count and not self._futures[index].done():
+            self._futures[index].set_result(created_id)
+            if created_id is not None:
+                self.known.add(int(created_id))
+
+    def close(self):
+        """The folder is finished: rows that never got an id resolve to None"""
+        for future in self._futures:
+            if not future.done():
+                future.set_result(None)
+
+    async def get(self, index):
+        return await self._futures[index]
+
+    async def all(self):
+        return [i for i in await asyncio.gather(*self._futures) if i is not None]
+
+
+class RowLinker:
+    """Fills a missing foreign-key field of a child row from a parent folder of the run"""
+
+    def __init__(self, field, parent, context, existing_key, rng):
+        self.field = field
+        self.parent = parent
+        self.context = context
+        self.existing_key = existing_key
+        self.rng = rng
+
+    def _existing(self):
+        # Ids that already existed on the server; the bulk read may include
+        # parents created by this run, which are picked through their row
+        ids = (self.context.get(self.existing_key) or []) if self.existing_key else []
+        return [i for i in ids if int(i) not in self.parent.known]
+
+    async def resolve(self, row):
+        if row.get(self.field) not in (None, "") or not self.parent.count:
+            return row
+        existing = self._existing()
+        slot = self.rng.randrange(len(existing) + self.parent.count)
+        if slot < len(existing):
+            return dict(row, **{self.field: str(existing[slot])})
+        created_id = await self.parent.get(slot - len(existing))
+        if created_id is None:
+            # The chosen parent failed; pick among the ones that were created
+            ids = existing + await self.parent.all()
+            if not ids:
+                return row
+            created_id = self.rng.choice(ids)
+        return dict(row, **{self.field: str(created_id)})
+
+
+async def run_graph(folders, row_counts, upload_folder, context, rng):
+    """Upload folders concurrently in dependency order
+
+    `row_counts` maps parent folders to their number of data rows and
+    `upload_folder(folder, resolve, created)` uploads one folder, calling the
+    async `resolve(row)` before sending a row and `created(index, id)` after it.
+    Returns the results of upload_folder in the order of `folders`.
+    """
+    requested = set(folders)
+    parents = {folder: RowIds(row_counts[folder]) for folder in folders
+               if any(link[1] == folder for child, link in ROW_LINKS.items() if child in requested)}
+    finished = {folder: asyncio.Event() for folder in folders}
+
+    async def run_folder(folder):
+        try:
+            for dependency in DEPENDENCIES.get(folder, ()):
+                if dependency in requested:
+                    await finished[dependency].wait()
+            resolve = None
+            if folder in ROW_LINKS and ROW_LINKS[folder][1] in parents:
+                field, parent, existing_key = ROW_LINKS[folder]
+                resolve = RowLinker(field, parents[parent], context, existing_key, rng).resolve
+            created = parents[folder].set if folder in parents else None
+            return await upload_folder(folder, resolve, created)
+        finally:
+            if folder in parents:
+                parents[folder].close()
+            finished[folder].set()
+
+    return await asyncio.gather(*(run_folder(folder) for folder in folders))
@@ -0,0 +1,174 @@
+"""
+Streaming readers and writers for generated test data.
+
+Generators hand entries to write_entries() one at a time, so memory stays
+constant no matter how many users x days are generated. Two formats are
+supported, chosen by file extension:
+
+- `.json`: the JSON array Newman reads with `-d` (same layout as json.dump(..., indent=2))
+- `.ndjson` / `.jsonl`: one entry per line, which the uploader can read while it
+  is still being written (`python uploader.py timetrackings --data-file x.ndjson --follow`)
+- `.npz`: one binary column per field, see columnar.py (requires numpy)
+
+While a file is being written a `<path>.partial` marker exists next to it;
+followers keep reading until the marker is gone.
+"""
+import asyncio
+import json
+import os
+import shutil
+import time
+
+NDJSON_EXTENSIONS = (".ndjson", ".jsonl")
+PARTIAL_SUFFIX = ".partial"
+
+
+def partial_marker(path):
+    return path + PARTIAL_SUFFIX
+
+
+def detect_format(path):
+    if path.endswith(NDJSON_EXTENSIONS):
+        return "ndjson"
+    return "npz" if path.endswith(".npz") else "json"
+
+
+def write_json_array(entries, f):
+    """Write entries as an indent=2 JSON array without holding them in memory"""
+    count = 0
+    for entry in entries:
+        f.write("[\n  " if count == 0 else ",\n  ")
+        f.write(json.dumps(entry, indent=2).replace("\n", "\n  "))
+        count += 1
+    f.write("\n]" if count else "[]")
+    return count
+
+
+def write_ndjson(entries, f, flush_every=1000):
+    """Write one compact JSON object per line, flushing regularly for followers"""
+    count = 0
+    for entry in entries:
+        f.write(json.dumps(entry, separators=(",", ":")))
+        f.write("\n")
+        count += 1
+        if count % flush_every == 0:
+            f.flush()
+    return count
+
+
+def write_fragment(entries, f, fmt):
+    """Write entries without the array brackets so shards can be concatenated later"""
+    if fmt == "ndjson":
+        return write_ndjson(entries, f)
+    count = 0
+    for entry in entries:
+        f.write("  " if count == 0 else ",\n  ")
+        f.write(json.dumps(entry, indent=2).replace("\n", "\n  "))
+        count += 1
+    return count
+
+
+def write_shards(shards, path, fmt=None):
+    """Concatenate (shard path, count) fragments in the order given and delete them
+
+    The result is byte-identical to write_entries() over the same entries, so the
+    number of shards does not change the output.
+    """
+    fmt = fmt or detect_format(path)
+    marker = partial_marker(path)
+    open(marker, "w").close()
+    total = 0
+    try:
+        with open(path, "w") as out:
+            if fmt == "json":
+                out.write("[")
+            for shard_path, count in shards:
+                if count:
+                    if fmt == "json":
+                        out.write("\n" if total == 0 else ",\n")
+                    with open(shard_path) as shard:
+                        shutil.copyfileobj(shard, out)
+                    out.flush()
+                    total += count
+                os.remove(shard_path)
+            if fmt == "json":
+                out.write("\n]" if total else "]")
+    finally:
+        os.remove(marker)
+    return total
+
+
+def write_entries(entries, path, fmt=None):
+    """Stream entries to path (format from extension unless given) and return the count"""
+    fmt = fmt or detect_format(path)
+    if fmt == "npz":
+        # Assembled in a temp dir and renamed into place, so no marker is needed
+        from columnar import write_rows
+        return write_rows(entries, path)
+    marker = partial_marker(path)
+    open(marker, "w").close()
+    try:
+        with open(path, "w") as f:
+            if fmt == "ndjson":
+                return write_ndjson(entries, f)
+            return write_json_array(entries, f)
+    finally:
+        os.remove(marker)
+
+
+def _read_ndjson(path, follow):
+    """Yield parsed rows, or None whenever a follower should wait for more data"""
+    marker = partial_marker(path)
+    while follow and not os.path.exists(path):
+        yield None
+
+    with open(path) as f:
+        finishing = False
+        while True:
+            position = f.tell()
+            line = f.readline()
+            if line.endswith("\n"):
+                if line.strip():
+                    yield json.loads(line)
+                continue
+            if follow and not finishing:
+                # Re-read once more after the writer is gone, it may have
+                # flushed its last lines right before removing the marker
+                finishing = not os.path.exists(marker)
+                f.seek(position)
+                if not finishing:
+                    yield None
+                continue
+            if line.strip():
+                yield json.loads(line)
+            return
+
+
+def iter_ndjson(path, follow=False, poll_interval=0.2):
+    """Iterate an NDJSON file; with follow, keep tailing it until its writer finishes"""
+    for row in _read_ndjson(path, follow):
+        if row is None:
+            time.sleep(poll_interval)
+        else:
+            yield row
+
+
+async def aiter_ndjson(path, follow=False, poll_interval=0.2):
+    """Async variant of iter_ndjson that does not block the event loop while waiting"""
+    for row in _read_ndjson(path, follow):
+        if row is None:
+            await asyncio.sleep(poll_interval)
+        else:
+            yield row
+
+
+def iter_rows(path, follow=False):
+    """Rows of a data file in either format"""
+    fmt = detect_format(path)
+    if fmt == "ndjson":
+        return iter_ndjson(path, follow)
+    if fmt == "npz":
+        from columnar import ColumnarFile
+        return iter(ColumnarFile(path))
+    with open(path) as f:
+        return iter(json.load(f))
@@ -0,0 +1,303 @@
+"""
+Bulk teardown of seeded test data.
+
+Deletes what uploader.py (or create_test_data.sh) created, so a staging account
+can be reset between load-test rounds. The ids to delete come from the ID
+registry (everything recorded as created in the namespace) or, with
+--bulk-read, from a paged read of the timetrackings and absences of the seeded
+users and date range in the data files (see preflight.py).
+
+Folders are deleted in reverse dependency order, in stages that only contain
+folders nothing later depends on:
+
+    timetrackings + absences  ->  users + tasks  ->  departments + projects
+
+A stage only starts when every delete of the stage before succeeded. Within a
+stage the folders run at the same time, and every delete goes through
+the uploader's connection pool, AIMD limiter, retries and token cache. Deleted
+ids are appended to reports/teardown/<folder>.progress, so an interrupted
+teardown continues with --resume, and are then dropped from the registry
+together with the upload journals of their data files. An id the server
+answers with 404 and an error saying the entity does not exist is already gone
+and counts as deleted; any other 404 (e.g. a wrong path) is a failed delete.
+
+    python teardown.py --dry-run                             # how many entities would go
+    python teardown.py --yes
+    python teardown.py timetrackings --bulk-read --yes
+    python teardown.py --namespace acme --env envs/acme.json --yes --resume
+
+Only folders with a delete endpoint documented in .gitlab/API_CONTEXT.md can be
+torn down (DELETE_ENDPOINTS). Today that is timetrackings,
+{{url}}/{{account}}/userapi/{{version}}/timeTrackings/delete/{id}; the other
+folders are refused rather than sent to a guessed path.
+"""
+import argparse
+import asyncio
+import os
+import json
+import random
+import re
+import sys
+
+from columnar import resolve_data_file
+from id_registry import REGISTRY_FILE, IdRegistry
+from journal import ProgressJournal, journal_path
+from metrics import Metrics, live_metrics, profiled
+from metrics import add_arguments as add_metrics_arguments
+from preflight import CONTENT_FIELDS, PreflightError, match_existing, read_existing
+from run_log import RunLog
+from scheduler import teardown_stages
+from streaming import iter_rows
+from token_cache import TOKEN_CACHE_FILE, TokenCache
+from uploader import (COLLECTION, ENVIRONMENT, FOLDER_DATA_MAP, Uploader, UploadStats, build_request,
+                      load_collection, load_environment, print_summary)
+
+TEARDOWN_DIR = "reports/teardown"
+# Delete endpoints documented in .gitlab/API_CONTEXT.md, folder -> resource
+DELETE_ENDPOINTS = {
+    "timetrackings": "timeTrackings",  # "Delete Time Tracking"
+}
+DELETE_URL = "{{url}}/{{account}}/userapi/{{version}}/<resource>/delete/{{id}}"
+# Error of a 404 for an id that does not exist (as opposed to an unknown path)
+MISSING_ENTITY = re.compile(r"\bdoes not exist\b|\bnot found\b", re.IGNORECASE)
+
+
+def delete_request(folder, requests):
+    """DELETE request of a folder, with the headers of its create request"""
+    if folder not in DELETE_ENDPOINTS:
+        raise ValueError(f"No documented delete endpoint for {folder}")
+    create = requests["create"]
+    return {"method": "DELETE", "url": DELETE_URL.replace("<resource>", DELETE_ENDPOINTS[folder]),
+            "header": [h for h in create.get("header", []) if h.get("key", "").lower() != "content-type"]}
+
+
+def entity_missing(body):
+    """Whether an error response says the entity to delete does not exist"""
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return False
+    if not isinstance(data, dict) or data.get("Success", False):
+        return False
+    error = str(data.get("Error") or data.get("message") or "")
+    return bool(MISSING_ENTITY.search(error)) and "unknown endpoint" not in error.lower()
+
+
+class Teardown(Uploader):
+    """Uploader whose requests delete one entity by id instead of creating a row"""
+
+    async def send_row(self, folder, server_id):
+        request = delete_request(folder, self.collection[folder])
+        result = await self.send_request(folder, *build_request(request, dict(self.env, id=server_id)))
+        if result.status == 404 and entity_missing(result.body):
+            # Deleted out of band or by an earlier run: nothing left to do
+            return result._replace(success=True, error=None)
+        return result
+
+    async def delete(self, folder, ids, journal, done=()):
+        """Delete ids concurrently, journaling each deleted one; returns (stats, deleted ids)
+
+        Ids the server reports as missing (404) count as deleted, `stats.already_deleted` counts them.
+        """
+        await self.authenticate()
+        stats = UploadStats(folder)
+        stats.skipped = sum(1 for server_id in ids if server_id in done)
+        stats.already_deleted = 0
+        deleted = []
+        queue = asyncio.Queue(maxsize=self.concurrency * 2)
+
+        async def worker():
+            while True:
+                server_id = await queue.get()
+                if server_id is None:
+                    return
+                result = await self.send_with_retry(folder, server_id, stats, server_id)
+                stats.record(result.success, result.latency_ms)
+                if self.metrics is not None:
+                    self.metrics.count("rows" if result.success else "failed_rows", label=folder)
+                if result.success:
+                    journal.record(server_id)
+                    deleted.append(server_id)
+                    if result.status == 404:
+                        stats.already_deleted += 1
+
+        workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+        try:
+            for server_id in ids:
+                if server_id not in done:
+                    await queue.put(server_id)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for w in workers:
+                w.cancel()
+        stats.finish()
+        stats.final_limit = int(self.limiter.limit)
+        return stats, deleted
+
+
+def data_file(folder, args):
+    return dict(args.data).get(folder) or resolve_data_file(FOLDER_DATA_MAP[folder])
+
+
+async def collect_ids(teardown, folder, args, registry):
+    """Server ids to delete for a folder, sorted"""
+    if args.bulk_read and folder in CONTENT_FIELDS:
+        rows = list(iter_rows(data_file(folder, args)))
+        existing = await read_existing(teardown, folder, rows) if rows else []
+        if args.all_in_range:
+            return sorted({int(entry["id"]) for entry in existing})
+        # Only entries whose content matches a row of the data file
+        matched, _ = match_existing(folder, rows, existing)
+        return sorted({int(server_id) for server_id in matched.values()})
+    return sorted(set(registry.created_ids(folder))) if registry is not None else []
+
+
+async def run(args, metrics=None):
+    env = load_environment(args.env)
+    if args.token:
+        env["access_token"] = args.token
+    tag = f"[{args.namespace}] " if args.namespace else ""
+    registry = None if args.no_registry else IdRegistry(args.registry, args.namespace)
+    run_log = RunLog(args.run_log) if args.run_log else None
+    teardown = Teardown(env, load_collection(args.collection), concurrency=args.concurrency, url=args.url,
+                        rng=random.Random(), retries=args.retries, adaptive=not args.fixed_concurrency,
+                        token_cache=None if args.no_token_cache else TokenCache(args.token_cache),
+                        run_log=run_log, metrics=metrics)
+
+    async def plan(folder):
+        ids = await collect_ids(teardown, folder, args, registry)
+        journal = ProgressJournal(journal_path(os.path.join(TEARDOWN_DIR, folder), args.namespace))
+        done = journal.load() if args.resume else {}
+        return folder, ids, journal, done
+
+    async def teardown_folder(folder, ids, journal, done):
+        sources = registry.sources(folder) if registry is not None else []
+        os.makedirs(TEARDOWN_DIR, exist_ok=True)
+        with journal.open(resume=args.resume):
+            stats, deleted = await teardown.delete(folder, ids, journal, done)
+        if registry is not None:
+            registry.forget(folder, list(deleted) + list(done))
+        summary = dict(stats.summary(), already_deleted=stats.already_deleted)
+        print_summary(summary, tag)
+        if stats.already_deleted:
+            print(f"{tag}   {stats.already_deleted} of them were already deleted (404)")
+        if not summary["failed"]:
+            # Rows of these files no longer exist, a later --resume must not skip them
+            for source in sources + ([data_file(folder, args)] if args.bulk_read else []):
+                path = journal_path(source, args.namespace)
+                if os.path.exists(path):
+                    os.remove(path)
+                    print(f"{tag}🗑️  Removed upload journal {path}")
+        return summary
+
+    try:
+        stages = teardown_stages(args.folders)
+        print(f"{tag}🧹 Teardown order: {' -> '.join(' + '.join(stage) for stage in stages)}")
+        summaries = []
+        for stage in stages:
+            plans = [await plan(folder) for folder in stage]
+            for folder, ids, _, done in plans:
+                pending = sum(1 for server_id in ids if server_id not in done)
+                print(f"{tag}🧹 {folder}: {pending} to delete"
+                      + (f", {len(ids) - pending} already deleted" if len(ids) > pending else ""))
+            if args.dry_run:
+                summaries += [{"folder": folder, "to_delete": len(ids) - sum(1 for i in ids if i in done)}
+                              for folder, ids, _, done in plans]
+                continue
+            results = await asyncio.gather(*(teardown_folder(*p) for p in plans))
+            summaries += results
+            if any(r["failed"] for r in results):
+                # Entities of later stages may still be referenced by the ones left over
+                print(f"{tag}⛔ Stopping after failed deletes, rerun to delete the rest")
+                break
+    finally:
+        await teardown.close()
+        if registry is not None:
+            registry.close()
+        if run_log is not None:
+            run_log.close()
+    return summaries
+
+
+def _data_file(value):
+    folder, sep, path = value.partition("=")
+    if not sep or folder not in FOLDER_DATA_MAP:
+        raise argparse.ArgumentTypeError("expected <folder>=<data file>")
+    return folder, path
+
+
+def confirm(args):
+    target = args.url or load_environment(args.env).get("url", "?")
+    if not sys.stdin.isatty():
+        print("❌ Refusing to delete without --yes (stdin is not a terminal)")
+        return False
+    answer = input(f"Delete the seeded {', '.join(args.folders)} from {target}? [y/N] ")
+    return answer.strip().lower() in ("y", "yes")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Delete seeded test data in reverse dependency order")
+    parser.add_argument("folders", nargs="*", metavar="folder",
+                        help=f"Folders to delete (default: {', '.join(sorted(DELETE_ENDPOINTS))}, "
+                             "the ones with a documented delete endpoint)")
+    parser.add_argument("--dry-run", action="store_true", help="Only count what would be deleted")
+    parser.add_argument("--yes", action="store_true", help="Do not ask for confirmation")
+    parser.add_argument("--bulk-read", action="store_true",
+                        help="Find timetrackings and absences by reading the seeded users and date range "
+                             "of the data files instead of from the registry")
+    parser.add_argument("--all-in-range", action="store_true",
+                        help="With --bulk-read: delete every entry read, not only those matching a data file row")
+    parser.add_argument("--data", type=_data_file, action="append", default=[], metavar="FOLDER=FILE",
+                        help="Data file for --bulk-read (default: FOLDER_DATA_MAP)")
+    parser.add_argument("--resume", action="store_true",
+                        help=f"Skip ids already deleted according to {TEARDOWN_DIR}/<folder>.progress")
+    parser.add_argument("--env", default=ENVIRONMENT, help="Postman environment file")
+    parser.add_argument("--collection", default=COLLECTION, help="Postman collection file")
+    parser.add_argument("--url", help="Override the environment url (e.g. a local mock server)")
+    parser.add_argument("--token", help="Use this access token instead of the password grant")
+    parser.add_argument("--concurrency", type=int, default=16, help="Max requests in flight")
+    parser.add_argument("--fixed-concurrency", action="store_true",
+                        help="Disable AIMD and always keep --concurrency requests in flight")
+    parser.add_argument("--retries", type=int, default=5, help="Retries per id on 429/5xx/connection errors")
+    parser.add_argument("--registry", default=REGISTRY_FILE, help="SQLite registry of created ids")
+    parser.add_argument("--namespace", default="", help="Registry namespace (e.g. one per account)")
+    parser.add_argument("--no-registry", action="store_true",
+                        help="Do not use the registry (requires --bulk-read)")
+    parser.add_argument("--token-cache", default=TOKEN_CACHE_FILE,
+                        help="Shared access token cache (0600 JSON file)")
+    parser.add_argument("--no-token-cache", action="store_true", help="Always fetch a new token")
+    parser.add_argument("--run-log", help="Append one NDJSON record per delete request to this file")
+    add_metrics_arguments(parser)
+    args = parser.parse_args(argv)
+    unknown = set(args.folders) - set(FOLDER_DATA_MAP)
+    if unknown:
+        parser.error(f"unknown folders: {', '.join(sorted(unknown))}")
+    undocumented = set(args.folders) - set(DELETE_ENDPOINTS) - unknown
+    if undocumented:
+        parser.error(f"no documented delete endpoint for {', '.join(sorted(undocumented))}")
+    args.folders = args.folders or list(DELETE_ENDPOINTS)
+    if args.no_registry and not args.bulk_read:
+        parser.error("--no-registry needs --bulk-read to find the ids to delete")
+    if args.all_in_range and not args.bulk_read:
+        parser.error("--all-in-range only applies to --bulk-read")
+    if not args.dry_run and not args.yes and not confirm(args):
+        return 1
+
+    metrics = Metrics() if args.metrics_port is not None or args.stats_interval else None
+    try:
+        with profiled(args.profile, args.tracemalloc), live_metrics(metrics, args.metrics_port,
+                                                                    args.stats_interval):
+            summaries = asyncio.run(run(args, metrics))
+    except PreflightError as e:
+        print(f"❌ {e}")
+        return 1
+    if args.dry_run:
+        print(f"🧹 Dry run: {sum(s['to_delete'] for s in summaries)} entities would be deleted")
+        return 0
+    return 1 if any(s["failed"] for s in summaries) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
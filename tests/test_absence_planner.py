@@ -0,0 +1,67 @@
+import random
+from datetime import datetime
+
+from absence_planner import (Absence, FreeSlots, absence_rows, absences_from_days, absent_days,
+                             half_day_dates, plan_absences)
+from work_calendar import WorkCalendar
+
+CALENDAR = WorkCalendar(datetime(2025, 4, 1), datetime(2025, 6, 30))
+
+
+def test_free_slots_allocate_splits_gaps():
+    slots = FreeSlots(10)
+    assert slots.positions(3) == 8
+    first = slots.allocate(3, random.Random(1))
+    assert slots.gaps == [gap for gap in ((0, first), (first + 3, 10)) if gap[0] < gap[1]]
+    assert sum(end - start for start, end in slots.gaps) == 7
+
+
+def test_free_slots_draw_every_position():
+    firsts = set()
+    for seed in range(200):
+        firsts.add(FreeSlots(6).allocate(4, random.Random(seed)))
+    assert firsts == {0, 1, 2}
+
+
+def test_free_slots_shorten_or_give_up():
+    slots = FreeSlots(5)
+    slots.gaps = [(0, 2), (3, 5)]
+    assert slots.allocate(3) is None
+    assert slots.allocate_up_to(3, random.Random(1))[1] == 2
+    assert FreeSlots(0).allocate_up_to(1) is None
+
+
+def test_plan_absences_never_overlap_and_respect_totals():
+    days = CALENDAR.working_days()
+    for seed in range(20):
+        absences = plan_absences(days, vacation_days=15, sick_days=4, half_days=3, rng=random.Random(seed))
+        taken = [d for a in absences for d in CALENDAR.working_days(a.first, a.last)]
+        assert len(taken) == len(set(taken)) == 22
+        assert absences == sorted(absences, key=lambda a: a.first)
+        assert sum(a.kind == "half_day" for a in absences) == 3
+
+
+def test_plan_absences_stops_when_no_day_is_left():
+    days = CALENDAR.working_days(datetime(2025, 4, 1), datetime(2025, 4, 4))
+    absences = plan_absences(days, vacation_days=10, sick_days=5, rng=random.Random(1))
+    assert sum(len(CALENDAR.working_days(a.first, a.last)) for a in absences) == 4
+    assert {a.kind for a in absences} == {"vacation"}
+
+
+def test_absences_from_days_merges_consecutive_working_days():
+    # Thursday and Friday before the Easter weekend and Easter Monday (a holiday) are one run
+    vacation = [datetime(2025, 4, 17), datetime(2025, 4, 18), datetime(2025, 4, 22), datetime(2025, 5, 6)]
+    absences = absences_from_days(CALENDAR, vacation, [datetime(2025, 4, 30)])
+    assert absences == [Absence("vacation", datetime(2025, 4, 17), datetime(2025, 4, 22)),
+                        Absence("half_day", datetime(2025, 4, 30), datetime(2025, 4, 30)),
+                        Absence("vacation", datetime(2025, 5, 6), datetime(2025, 5, 6))]
+    assert absent_days(CALENDAR, absences) == vacation
+    assert half_day_dates(absences) == [datetime(2025, 4, 30)]
+
+
+def test_absence_rows():
+    rows = list(absence_rows(51, [Absence("vacation", datetime(2025, 4, 17), datetime(2025, 4, 22)),
+                                  Absence("half_day", datetime(2025, 4, 30), datetime(2025, 4, 30))]))
+    assert rows[0] == {"user_id": "51", "type_id": "1", "subtype_id": "0", "from_date": "2025-04-17",
+                       "to_date": "2025-04-22", "duration": "6", "replacement_user_id": "0"}
+    assert rows[1]["duration"] == "0.5"
@@ -0,0 +1,68 @@
+import json
+
+from chunk_cache import ChunkCache, chunk_key, diff_rows, rows_of
+from timetracking_batch import TimetrackingBatch
+
+import generate_multi_user_timetrackings as generator
+
+
+def batch(*rows):
+    result = TimetrackingBatch()
+    for row in rows:
+        result.append(*row)
+    return result
+
+
+def test_chunk_key_is_order_independent():
+    assert chunk_key(user=1, month="2025-04") == chunk_key(month="2025-04", user=1)
+    assert chunk_key(user=1, month="2025-04") != chunk_key(user=2, month="2025-04")
+
+
+def test_diff_rows_is_a_multiset_difference():
+    old = batch((51, 4, 100, 200), (51, 9, 200, 210), (51, 9, 200, 210))
+    new = batch((51, 4, 100, 200), (51, 9, 200, 210), (51, 6, 210, 300))
+    added, removed = diff_rows(new, old)
+    assert list(rows_of(added)) == [(51, 6, 210, 300)]
+    assert list(rows_of(removed)) == [(51, 9, 200, 210)]
+    added, removed = diff_rows(new, None)
+    assert list(rows_of(added)) == list(rows_of(new)) and len(removed) == 0
+
+
+def test_store_load_and_prune(tmp_path):
+    cache = ChunkCache(str(tmp_path))
+    chunk = batch((51, 4, 100, 200), (51, 9, 200, 210))
+    cache.store("ab" * 32, chunk)
+    cache.store("cd" * 32, batch())
+    assert list(rows_of(cache.load("ab" * 32))) == list(rows_of(chunk))
+    assert len(cache.load("cd" * 32)) == 0
+    assert cache.load("ef" * 32) is None
+
+    cache.save_manifest("out/timetrackings.json", {"51:2025-04": "ab" * 32})
+    assert cache.load_manifest("out/timetrackings.json") == {"51:2025-04": "ab" * 32}
+    assert cache.load_manifest("other/timetrackings.json") == {}
+    assert cache.prune() == 1
+    assert set(cache.keys()) == {"ab" * 32}
+
+
+def generate(tmp_path, end):
+    generator.main(["--users", "51,52", "--start", "2025-04-01", "--end", end, "--seed", "7", "--quiet",
+                    "--cache-dir", str(tmp_path / "cache"), "--output", str(tmp_path / "tt.json")])
+    with open(tmp_path / "tt.json") as f:
+        rows = json.load(f)
+    with open(tmp_path / "tt.delta.json") as f:
+        delta = json.load(f)
+    return rows, delta
+
+
+def test_extending_the_range_only_adds_the_new_days(tmp_path):
+    first, first_delta = generate(tmp_path, "2025-04-30")
+    assert first_delta == first
+
+    again, delta = generate(tmp_path, "2025-04-30")
+    assert again == first and delta == []
+
+    extended, delta = generate(tmp_path, "2025-05-15")
+    assert [row for row in extended if row["start_time"] < "2025-05"] == first
+    assert delta and all(row["start_time"] >= "2025-05-01" for row in delta)
+    assert sorted(map(json.dumps, delta)) == sorted(json.dumps(row) for row in extended if row not in first)
+    assert not (tmp_path / "tt.delta.removed.json").exists()
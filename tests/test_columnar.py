@@ -0,0 +1,81 @@
+import json
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import columnar
+from columnar import ColumnarFile, infer_kind, resolve_data_file, write_batches, write_rows
+from streaming import write_entries
+from timetracking_batch import TimetrackingBatch
+
+TIMETRACKINGS = [
+    {"user_id": "51", "task_id": "4", "start_time": "2025-04-01 08:00:00", "end_time": "2025-04-01 10:15:00"},
+    {"user_id": "51", "task_id": "9", "start_time": "2025-04-01 10:15:00", "end_time": "2025-04-01 10:30:00"},
+    {"user_id": "5099", "task_id": "162", "start_time": "2025-12-31 23:45:00", "end_time": "2026-01-01 00:15:00"},
+]
+ABSENCES = [
+    {"user_id": "51", "type_id": "1", "subtype_id": "0", "from_date": "2025-04-17", "to_date": "2025-04-22",
+     "duration": "6", "replacement_user_id": "0"},
+    {"user_id": "52", "type_id": "1", "subtype_id": "0", "from_date": "2025-04-30", "to_date": "2025-04-30",
+     "duration": "0.5", "replacement_user_id": "0"},
+]
+
+
+def test_infer_kind():
+    assert [infer_kind(v) for v in ("51", "2025-04-01", "2025-04-01 08:00:00", "0.5", "007")] == \
+        ["int", "day", "minute", "text", "text"]
+
+
+@pytest.mark.parametrize("rows", [TIMETRACKINGS, ABSENCES, []], ids=["timetrackings", "absences", "empty"])
+def test_rows_round_trip(tmp_path, rows):
+    path = str(tmp_path / "data.npz")
+    assert write_rows(rows, path) == len(rows)
+    data = ColumnarFile(path)
+    assert len(data) == len(rows)
+    assert list(data) == rows
+    assert list(data.iter_rows(1, 2)) == rows[1:2]
+    data.close()
+
+
+def test_round_trip_through_json_is_byte_identical(tmp_path):
+    source, npz, target = (str(tmp_path / name) for name in ("a.json", "a.npz", "b.json"))
+    write_entries(iter(TIMETRACKINGS), source)
+    with open(source) as f:
+        write_rows(json.load(f), npz)
+    columnar.main(["to-json", npz, target])
+    with open(source, "rb") as a, open(target, "rb") as b:
+        assert a.read() == b.read()
+
+
+def test_batches_round_trip(tmp_path):
+    batch = TimetrackingBatch()
+    batch.append(51, 4, 100, 235)
+    batch.append(51, 9, 235, 250)
+    path = str(tmp_path / "tt.npz")
+    assert write_batches([batch, TimetrackingBatch()], path) == 2
+    data = ColumnarFile(path)
+    assert list(data) == list(batch.entries())
+    assert data.column("start_time").tolist() == [100, 235]
+    data.close()
+
+
+def test_rows_need_the_same_fields(tmp_path):
+    with pytest.raises(ValueError):
+        write_rows([TIMETRACKINGS[0], ABSENCES[0]], str(tmp_path / "mixed.npz"))
+    assert not os.path.exists(tmp_path / "mixed.npz")
+
+
+def test_resolve_data_file_prefers_the_newer_npz(tmp_path, capsys):
+    json_path, npz_path = str(tmp_path / "tt.json"), str(tmp_path / "tt.npz")
+    assert resolve_data_file(json_path) == json_path
+    open(npz_path, "w").close()
+    assert resolve_data_file(json_path) == npz_path
+    open(json_path, "w").close()
+    os.utime(npz_path, (0, 0))
+    assert resolve_data_file(json_path) == json_path
+    os.utime(json_path, (0, 0))
+    os.utime(npz_path, (100, 100))
+    assert resolve_data_file(json_path) == npz_path
+    assert "newer than" in capsys.readouterr().err
@@ -0,0 +1,98 @@
+import json
+
+import id_registry
+from id_registry import IdRegistry, parse_response
+
+
+def execution(iteration, body, name="create"):
+    return {"item": {"name": name}, "cursor": {"iteration": iteration},
+            "response": {"stream": {"type": "Buffer", "data": list(json.dumps(body).encode())}}}
+
+
+def newman_report(tmp_path):
+    path = tmp_path / "report.json"
+    path.write_text(json.dumps({"run": {"executions": [
+        execution(0, {"Success": True, "Results": [{"id": 101, "name": "A"}]}),
+        execution(0, {"Success": True, "Results": [{"id": 1}]}, name="read-departments"),
+        execution(1, {"Success": False, "Error": "Name already exists"}),
+        execution(2, {"Success": True, "Results": {"id": 103}}),
+    ]}}))
+    return str(path)
+
+
+def test_parse_response():
+    assert parse_response(b'{"Success": true, "Results": [{"id": 7}]}') == (True, 7)
+    assert parse_response(b'{"Success": true, "Results": {"id": 8}}') == (True, 8)
+    assert parse_response(b'{"Results": []}') == (True, None)
+    assert parse_response(b'{"Success": false, "Results": [{"id": 9}]}') == (False, 9)
+    assert parse_response(b"<html>") == (False, None)
+    assert parse_response(None) == (False, None)
+
+
+def test_created_ids_rows_and_sources(tmp_path):
+    with IdRegistry(str(tmp_path / "ids.sqlite3"), batch_size=2) as registry:
+        registry.record_created("projects", "a.json", 0, 11)
+        registry.record_created("projects", "a.json", 1, "12")
+        registry.record_created("projects", "b.json", 0, 13)
+        registry.record_created("tasks", "t.json", 0, 21)
+        assert registry.created_ids("projects") == [11, 12, 13]
+        assert registry.created_ids("projects", "b.json") == [13]
+        assert registry.created_rows("projects", "a.json") == {0: 11, 1: 12}
+        assert registry.sources("projects") == ["a.json", "b.json"]
+        # A retried row replaces its earlier id
+        registry.record_created("projects", "a.json", 1, 14)
+        assert registry.created_rows("projects", "a.json") == {0: 11, 1: 14}
+
+
+def test_namespaces_are_separate(tmp_path):
+    path = str(tmp_path / "ids.sqlite3")
+    with IdRegistry(path, "acme") as acme, IdRegistry(path, "globex") as globex:
+        acme.record_created("users", "u.json", 0, 1)
+        globex.record_created("users", "u.json", 0, 2)
+        acme.flush()
+        globex.flush()
+        assert acme.created_ids("users") == [1]
+        assert globex.created_ids("users") == [2]
+        assert acme.summary() == [{"namespace": "acme", "resource": "users", "created": 1},
+                                  {"namespace": "globex", "resource": "users", "created": 1}]
+
+
+def test_forget_drops_created_and_known_ids(tmp_path):
+    with IdRegistry(str(tmp_path / "ids.sqlite3")) as registry:
+        for row, server_id in enumerate([5, 6, 7]):
+            registry.record_created("timetrackings", "tt.json", row, server_id)
+        registry.store_read("timetrackings", [6, 8])
+        registry.forget("timetrackings", [6, 7])
+        assert registry.created_ids("timetrackings") == [5]
+        assert registry.known_ids("timetrackings") == [8]
+
+
+def test_store_read_replaces_the_previous_read(tmp_path):
+    with IdRegistry(str(tmp_path / "ids.sqlite3")) as registry:
+        registry.store_read("departments", [3, 2, 2])
+        assert registry.known_ids("departments") == [2, 3]
+        registry.store_read("departments", [4])
+        assert registry.known_ids("departments") == [4]
+
+
+def test_import_newman_records_successful_creates(tmp_path):
+    with IdRegistry(str(tmp_path / "ids.sqlite3")) as registry:
+        count = id_registry.import_newman_report(registry, "departments", newman_report(tmp_path), "d.json")
+        assert count == 2
+        assert registry.created_rows("departments", "d.json") == {0: 101, 2: 103}
+
+
+def test_cli_import_ids_and_summary(tmp_path, capsys):
+    db = ["--registry", str(tmp_path / "ids.sqlite3"), "--namespace", "acme"]
+    assert id_registry.main(db + ["import-newman", "departments", newman_report(tmp_path)]) == 0
+    assert "Recorded 2 departments ids" in capsys.readouterr().out
+
+    with IdRegistry(db[1], "acme") as registry:
+        registry.store_read("departments", [101, 150])
+    id_registry.main(db + ["ids", "departments"])
+    assert json.loads(capsys.readouterr().out) == [101, 103]
+    id_registry.main(db + ["ids", "departments", "--include-read"])
+    assert json.loads(capsys.readouterr().out) == [101, 103, 150]
+
+    id_registry.main(db + ["summary"])
+    assert capsys.readouterr().out == "acme\tdepartments\t2\n"
@@ -0,0 +1,16 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import numpy_backend
+
+
+def test_backends_are_statistically_equivalent():
+    assert numpy_backend.compare_backends(num_users=200, seed=1) == []
+
+
+def test_ks_statistic():
+    assert numpy_backend.ks_statistic([1, 2, 3], [1, 2, 3]) == 0
+    assert numpy_backend.ks_statistic([1, 2], [3, 4]) == 1
+    assert numpy_backend.ks_statistic([1, 2, 3, 4], [3, 4, 5, 6]) == 0.5
+
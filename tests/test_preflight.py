@@ -0,0 +1,69 @@
+from preflight import content_key, match_existing, normalize, sweep
+
+
+def booking(user, start, end, task="4", **extra):
+    return dict(user_id=str(user), task_id=task, start_time=f"2025-04-01 {start}:00",
+                end_time=f"2025-04-01 {end}:00", **extra)
+
+
+def absence(user, first, last, **extra):
+    return dict(user_id=str(user), type_id="1", subtype_id="0", from_date=f"2025-04-{first:02d}",
+                to_date=f"2025-04-{last:02d}", **extra)
+
+
+def test_normalize_server_formatting():
+    assert normalize("2025-04-01T08:00:00+02:00") == "2025-04-01 08:00:00"
+    assert normalize(" 007 ") == "7"
+    assert normalize(51) == "51"
+
+
+def test_content_key_ignores_formatting_and_other_fields():
+    row = booking(51, "08:00", "12:00")
+    entry = dict(row, user_id="051", start_time="2025-04-01T08:00:00+02:00", id=7, comment="x")
+    assert content_key("timetrackings", row) == content_key("timetrackings", entry)
+    assert content_key("timetrackings", row) != content_key("timetrackings", booking(51, "08:00", "12:01"))
+
+
+def test_sweep_finds_overlaps_per_user():
+    rows = [booking(51, "08:00", "12:00"), booking(51, "11:30", "13:00"),
+            booking(52, "11:30", "13:00"), booking(51, "13:00", "14:00")]
+    overlaps, conflicts = sweep("timetrackings", enumerate(rows))
+    assert overlaps == [(0, 1)]
+    assert conflicts == {}
+
+
+def test_sweep_reports_the_interval_that_reaches_furthest():
+    # Row 2 starts after row 1 ends but inside the long row 0
+    rows = [booking(51, "08:00", "16:00"), booking(51, "09:00", "10:00"), booking(51, "11:00", "12:00")]
+    overlaps, _ = sweep("timetrackings", enumerate(rows))
+    assert sorted(overlaps) == [(0, 1), (0, 2)]
+
+
+def test_sweep_timetrackings_end_is_exclusive_absences_inclusive():
+    assert sweep("timetrackings", enumerate([booking(51, "08:00", "12:00"),
+                                             booking(51, "12:00", "13:00")]))[0] == []
+    assert sweep("absences", enumerate([absence(51, 1, 3), absence(51, 3, 4)]))[0] == [(0, 1)]
+    assert sweep("absences", enumerate([absence(51, 1, 3), absence(51, 4, 4)]))[0] == []
+
+
+def test_sweep_conflicts_with_existing_entries():
+    rows = [booking(51, "08:00", "12:00"), booking(51, "13:00", "14:00"), booking(52, "08:00", "09:00")]
+    existing = [booking(51, "07:00", "08:30", id=100), booking(51, "13:30", "15:00", id=101),
+                booking(52, "09:00", "10:00", id=102)]
+    overlaps, conflicts = sweep("timetrackings", enumerate(rows), existing)
+    assert overlaps == []
+    assert conflicts == {0: 100, 1: 101}
+
+
+def test_match_existing_is_a_multiset():
+    rows = [booking(51, "08:00", "12:00"), booking(51, "08:00", "12:00"), booking(51, "13:00", "14:00")]
+    existing = [booking(51, "08:00", "12:00", id=100), booking(52, "08:00", "12:00", id=101)]
+    matched, unmatched = match_existing("timetrackings", rows, existing)
+    assert matched == {0: 100}
+    assert [entry["id"] for entry in unmatched] == [101]
+
+
+def test_match_existing_absences():
+    rows = [absence(51, 1, 3), absence(52, 1, 3)]
+    existing = [absence(52, 1, 3, id=5)]
+    assert match_existing("absences", rows, existing) == ({1: 5}, [])
@@ -0,0 +1,128 @@
+import asyncio
+import random
+
+from rate_limit import AimdLimiter, FairBudget, backoff_delay, is_retryable, parse_retry_after
+
+
+def test_retryable_statuses():
+    assert is_retryable(429)
+    assert all(is_retryable(status) for status in (500, 502, 503, 504, 599))
+    assert not any(is_retryable(status) for status in (200, 400, 401, 404, 409))
+
+
+def test_backoff_delay():
+    rng = random.Random(1)
+    assert all(0 <= backoff_delay(attempt, rng=rng) <= 0.25 * 2 ** attempt for attempt in range(5))
+    assert all(backoff_delay(20, rng=rng) <= 30.0 for _ in range(100))
+    assert backoff_delay(3, retry_after=2.5) == 2.5
+    assert backoff_delay(3, retry_after=120) == 30.0
+
+
+def test_parse_retry_after():
+    assert parse_retry_after({"retry-after": "3"}) == 3.0
+    assert parse_retry_after({"retry-after": "-1"}) == 0.0
+    assert parse_retry_after({"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"}) is None
+    assert parse_retry_after(None) is None
+
+
+def test_aimd_grows_by_one_per_window():
+    limiter = AimdLimiter(initial=4, maximum=8)
+    for _ in range(4):
+        limiter.on_success()
+    assert 4.9 < limiter.limit < 5.0
+    for _ in range(1000):
+        limiter.on_success()
+    assert limiter.limit == 8
+
+
+def test_aimd_halves_once_per_round_trip():
+    limiter = AimdLimiter(initial=16, maximum=64)
+    for _ in range(10):
+        limiter.on_throttle(latency_s=10)
+    assert limiter.limit == 8
+    assert limiter.throttled == 10
+    limiter._last_decrease -= 11
+    limiter.on_throttle(latency_s=10)
+    assert limiter.limit == 4
+
+
+def test_aimd_never_drops_below_the_minimum():
+    limiter = AimdLimiter(initial=2, minimum=1)
+    for _ in range(5):
+        limiter._last_decrease = 0.0
+        limiter.on_throttle()
+    assert limiter.limit == 1
+
+
+def test_aimd_limits_requests_in_flight():
+    async def run():
+        limiter = AimdLimiter(initial=3, maximum=3)
+        peak = 0
+
+        async def request():
+            nonlocal peak
+            async with limiter:
+                peak = max(peak, limiter.in_flight)
+                await asyncio.sleep(0.001)
+
+        await asyncio.gather(*(request() for _ in range(20)))
+        return peak, limiter.in_flight, limiter.waiting
+
+    assert asyncio.run(run()) == (3, 0, 0)
+
+
+def test_fair_budget_serves_waiting_accounts_in_turn():
+    async def run():
+        budget = FairBudget(1)
+        order = []
+        await budget.acquire("holder")
+
+        async def request(account, n):
+            async with budget.slot(account):
+                order.append(f"{account}{n}")
+                await asyncio.sleep(0)
+
+        # The big account queues all its requests before the small one
+        tasks = [asyncio.create_task(request("big", n)) for n in range(4)]
+        tasks += [asyncio.create_task(request("small", n)) for n in range(2)]
+        await asyncio.sleep(0)
+        assert budget.waiting == 6
+        budget.release()
+        await asyncio.gather(*tasks)
+        return order, budget.in_flight, budget.waiting
+
+    order, in_flight, waiting = asyncio.run(run())
+    assert order == ["big0", "small0", "big1", "small1", "big2", "big3"]
+    assert (in_flight, waiting) == (0, 0)
+
+
+def test_fair_budget_caps_requests_in_flight():
+    async def run():
+        budget = FairBudget(4)
+        peak = 0
+
+        async def request(account):
+            nonlocal peak
+            async with budget.slot(account):
+                peak = max(peak, budget.in_flight)
+                await asyncio.sleep(0.001)
+
+        await asyncio.gather(*(request(f"account{i % 3}") for i in range(30)))
+        return peak, budget.in_flight
+
+    assert asyncio.run(run()) == (4, 0)
+
+
+def test_fair_budget_cancelled_waiter_gives_up_its_place():
+    async def run():
+        budget = FairBudget(1)
+        await budget.acquire("a")
+        waiter = asyncio.create_task(budget.acquire("b"))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert budget.waiting == 0
+        budget.release()
+        return budget.in_flight
+
+    assert asyncio.run(run()) == 0
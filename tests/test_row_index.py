@@ -0,0 +1,125 @@
+import argparse
+import json
+import os
+
+import pytest
+
+from row_index import (RowIndex, build_index, index_path, is_fresh, json_array_offsets, ndjson_offsets,
+                       parse_shard, resume_point, shard_range)
+
+ROWS = [
+    {"user_id": str(51 + i % 3), "task_id": "4", "start_time": f"2025-04-{1 + i % 28:02d} 08:00:00",
+     "comment": "Überstunden – café ☕" if i % 4 == 0 else "x" * (i % 50)}
+    for i in range(40)
+]
+
+
+def write(tmp_path, rows, fmt):
+    path = str(tmp_path / f"data.{fmt}")
+    # Raw UTF-8, so byte offsets and character positions differ
+    with open(path, "w", encoding="utf-8") as f:
+        if fmt == "json":
+            json.dump(rows, f, ensure_ascii=False, indent=2)
+        else:
+            for row in rows:
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+    return path
+
+
+@pytest.mark.parametrize("window", [7, 64, 1 << 22])
+def test_json_array_offsets_with_rows_crossing_the_window(window):
+    rows = [{"n": i, "s": "é" * i} for i in range(20)]
+    data = json.dumps(rows, ensure_ascii=False, indent=2).encode("utf-8")
+    offsets = json_array_offsets(data, window=window)
+    assert len(offsets) == len(rows)
+    decoder = json.JSONDecoder()
+    assert [decoder.raw_decode(data[o:].decode("utf-8"))[0] for o in offsets] == rows
+
+
+def test_json_array_offsets_empty_and_invalid():
+    assert list(json_array_offsets(b" [ ] ", window=2)) == []
+    with pytest.raises(ValueError):
+        json_array_offsets(b'{"n": 1}')
+    with pytest.raises(ValueError):
+        json_array_offsets(b'[{"n": 1}, {"n": 2}', window=4)
+
+
+def test_ndjson_offsets_skip_blank_lines():
+    data = b'{"n": 1}\n\n  \n{"n": 2}\n{"n": 3}'
+    assert list(ndjson_offsets(data)) == [0, 13, 22]
+
+
+@pytest.mark.parametrize("fmt", ["json", "ndjson"])
+def test_index_reads_every_row(tmp_path, fmt):
+    path = write(tmp_path, ROWS, fmt)
+    assert build_index(path) == len(ROWS)
+    assert is_fresh(path)
+    index = RowIndex(path)
+    try:
+        assert len(index) == len(ROWS)
+        assert list(index) == ROWS
+        assert [index._row(i) for i in (0, 4, 39)] == [ROWS[0], ROWS[4], ROWS[39]]
+        assert index[4]["comment"] == "Überstunden – café ☕"
+        assert list(index.iter_rows(10, 13)) == ROWS[10:13]
+        assert list(index.iter_rows(38, 100)) == ROWS[38:]
+        with pytest.raises(IndexError):
+            index[len(ROWS)]
+    finally:
+        index.close()
+
+
+def test_stale_index_is_rebuilt(tmp_path):
+    path = write(tmp_path, ROWS[:5], "json")
+    build_index(path)
+    write(tmp_path, ROWS[:8], "json")
+    assert not is_fresh(path)
+    with pytest.raises(ValueError):
+        RowIndex.open(path, rebuild=False)
+    index = RowIndex.open(path)
+    try:
+        assert list(index) == ROWS[:8]
+    finally:
+        index.close()
+    assert is_fresh(path)
+
+
+def test_empty_file(tmp_path):
+    path = str(tmp_path / "empty.ndjson")
+    open(path, "w").close()
+    assert build_index(path) == 0
+    index = RowIndex(path)
+    assert list(index) == []
+    index.close()
+    assert os.path.exists(index_path(path))
+
+
+@pytest.mark.parametrize("rows,shards", [(40, 4), (41, 4), (3, 5), (0, 2), (719, 7)])
+def test_shards_cover_every_row_exactly_once(rows, shards):
+    ranges = [shard_range(rows, k, shards) for k in range(1, shards + 1)]
+    assert ranges[0][0] == 0 and ranges[-1][1] == rows
+    assert all(end == first for (_, end), (first, _) in zip(ranges, ranges[1:]))
+    sizes = [end - first for first, end in ranges]
+    assert max(sizes) - min(sizes) <= 1
+
+
+def test_sharded_reads_return_every_row_once(tmp_path):
+    path = write(tmp_path, ROWS, "ndjson")
+    index = RowIndex.open(path)
+    try:
+        shards = [list(index.iter_rows(*shard_range(len(index), k, 3))) for k in range(1, 4)]
+    finally:
+        index.close()
+    assert [row for shard in shards for row in shard] == ROWS
+
+
+def test_parse_shard():
+    assert parse_shard("2/4") == (2, 4)
+    for value in ("0/4", "5/4", "2", "a/b"):
+        with pytest.raises(argparse.ArgumentTypeError):
+            parse_shard(value)
+
+
+def test_resume_point_stops_at_the_first_missing_row():
+    assert resume_point({}, 10, 20) == 10
+    assert resume_point({10: 1, 11: 2, 13: 3}, 10, 20) == 12
+    assert resume_point({i: i for i in range(10, 20)}, 10, 20) == 20
@@ -0,0 +1,91 @@
+import json
+
+import pytest
+
+import run_log
+from run_log import RunLog, read_records, summarize
+
+
+def write_log(path, **kwargs):
+    with RunLog(str(path), append=False, **kwargs) as log:
+        for row in range(1200):
+            log.record("timetrackings", row, 200, float(row % 100), created_id=1000 + row, body=b'{"Success":true}')
+        log.record("timetrackings", 7, 429, 5.0, error="HTTP 429", body=b"slow down", attempt=1)
+        log.record("projects", 0, None, 30000.0, error="timeout")
+        log.record("projects", 1, 201, 250.0, created_id=5)
+    return log
+
+
+@pytest.mark.parametrize("name", ["run.ndjson", "run.ndjson.gz"])
+def test_background_writer_keeps_every_record_in_order(tmp_path, name):
+    log = write_log(tmp_path / name)
+    records = list(read_records(str(tmp_path / name)))
+    assert log.records == len(records) == 1203
+    assert log.failures == 2
+    assert [r["row"] for r in records[:1200]] == list(range(1200))
+    assert records[0] == {"ts": records[0]["ts"], "resource": "timetrackings", "row": 0, "attempt": 0,
+                          "status": 200, "latency_ms": 0.0, "created_id": 1000}
+    assert records[1200]["body"] == "slow down"
+    assert [r["row"] for r in read_records(str(tmp_path / name), "projects")] == [0, 1]
+
+
+def test_bodies_of_successes_are_sampled_and_failures_capped(tmp_path):
+    path = str(tmp_path / "run.ndjson")
+    with RunLog(path, body_sample=1.0, max_error_bodies=1) as log:
+        log.record("users", 0, 200, 1.0, body=b"ok")
+        log.record("users", 1, 500, 1.0, error="HTTP 500", body=b"first")
+        log.record("users", 2, 500, 1.0, error="HTTP 500", body=b"second")
+    assert [r.get("body") for r in read_records(path)] == ["ok", "first", None]
+
+
+def test_torn_last_line_is_skipped(tmp_path):
+    path = tmp_path / "run.ndjson"
+    write_log(path)
+    with open(path, "a") as f:
+        f.write('{"ts": 1, "resource": "time')
+    assert len(list(read_records(str(path)))) == 1203
+
+
+def test_summarize(tmp_path):
+    write_log(tmp_path / "run.ndjson")
+    summary = summarize(read_records(str(tmp_path / "run.ndjson")))
+    tt, projects = summary["timetrackings"], summary["projects"]
+    assert (tt["requests"], tt["failed"], tt["retries"]) == (1201, 1, 1)
+    assert tt["statuses"] == {200: 1200, 429: 1}
+    assert (projects["requests"], projects["failed"]) == (2, 1)
+    assert projects["statuses"] == {"connection error": 1, 201: 1}
+
+
+def test_cli_failures_and_slow(tmp_path, capsys):
+    path = str(tmp_path / "run.ndjson")
+    write_log(path)
+    run_log.main(["failures", path, "--json"])
+    assert [(r["resource"], r["row"]) for r in map(json.loads, capsys.readouterr().out.splitlines())] == \
+        [("timetrackings", 7), ("projects", 0)]
+    run_log.main(["slow", path, "--top", "2", "--json"])
+    assert [r["latency_ms"] for r in map(json.loads, capsys.readouterr().out.splitlines())] == [30000.0, 250.0]
+    run_log.main(["summary", path, "--resource", "projects"])
+    assert capsys.readouterr().out.startswith("projects: 2 requests, 1 failed, 0 retries")
+
+
+def test_import_newman(tmp_path, capsys):
+    def execution(iteration, code, body, assertions=()):
+        return {"item": {"name": "create"}, "cursor": {"iteration": iteration},
+                "response": {"code": code, "responseTime": 12,
+                             "stream": {"data": list(json.dumps(body).encode())}},
+                "assertions": list(assertions)}
+
+    report = tmp_path / "report.json"
+    report.write_text(json.dumps({"run": {"executions": [
+        execution(0, 200, {"Success": True, "Results": [{"id": 41}]}),
+        {"item": {"name": "read-projects"}, "cursor": {"iteration": 0}, "response": {"code": 200}},
+        execution(1, 200, {"Success": False, "Error": "duplicate"},
+                  [{"assertion": "Success", "error": {"message": "expected false to be true"}}]),
+    ]}}))
+    path = str(tmp_path / "run.ndjson")
+    assert run_log.main(["import-newman", "projects", str(report), path]) == 0
+    assert "Logged 2 projects requests (1 failed)" in capsys.readouterr().out
+    first, second = read_records(path)
+    assert (first["row"], first["status"], first["created_id"]) == (0, 200, 41)
+    assert second["error"] == "expected false to be true"
+    assert "created_id" not in second
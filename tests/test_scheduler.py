@@ -0,0 +1,39 @@
+import pytest
+
+import scheduler
+from scheduler import dependency_order, teardown_stages
+
+ALL_FOLDERS = ["departments", "users", "projects", "tasks", "timetrackings", "absences"]
+
+
+def test_teardown_stages_reverse_the_dependencies():
+    assert teardown_stages(ALL_FOLDERS) == [["timetrackings", "absences"], ["users", "tasks"],
+                                            ["departments", "projects"]]
+
+
+def test_teardown_stages_of_a_subset_and_duplicates():
+    assert teardown_stages(["users", "timetrackings", "users"]) == [["timetrackings"], ["users"]]
+    assert teardown_stages(["projects", "departments"]) == [["projects", "departments"]]
+    assert teardown_stages([]) == []
+
+
+def test_teardown_stages_never_delete_a_parent_before_its_children():
+    position = {folder: i for i, stage in enumerate(teardown_stages(ALL_FOLDERS)) for folder in stage}
+    for folder in ALL_FOLDERS:
+        for parent in scheduler.parent_folders(folder):
+            assert position[folder] < position[parent]
+
+
+def test_dependency_order_is_the_reverse_of_teardown():
+    order = dependency_order(ALL_FOLDERS)
+    for folder in ALL_FOLDERS:
+        for parent in scheduler.parent_folders(folder):
+            assert order.index(parent) < order.index(folder)
+
+
+def test_circular_dependencies_are_rejected(monkeypatch):
+    monkeypatch.setitem(scheduler.DEPENDENCIES, "users", ("timetrackings",))
+    with pytest.raises(ValueError, match="Circular"):
+        teardown_stages(["users", "timetrackings"])
+    with pytest.raises(ValueError, match="Circular"):
+        dependency_order(["users", "timetrackings"])
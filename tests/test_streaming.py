@@ -0,0 +1,108 @@
+import asyncio
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from streaming import (aiter_ndjson, detect_format, iter_ndjson, iter_rows, partial_marker, write_entries,
+                       write_fragment, write_shards)
+
+ROWS = [{"user_id": str(51 + i), "task_id": "4", "start_time": f"2025-04-01 0{i}:00:00",
+         "comment": "Grüße"} for i in range(5)]
+
+
+def test_detect_format():
+    assert [detect_format(p) for p in ("a.json", "a.ndjson", "a.jsonl", "a.npz", "a")] == \
+        ["json", "ndjson", "ndjson", "npz", "json"]
+
+
+@pytest.mark.parametrize("rows", [ROWS, []], ids=["rows", "empty"])
+def test_json_array_matches_json_dump(tmp_path, rows):
+    path = str(tmp_path / "data.json")
+    assert write_entries(iter(rows), path) == len(rows)
+    with open(path) as f:
+        assert f.read() == json.dumps(rows, indent=2)
+    assert list(iter_rows(path)) == rows
+
+
+@pytest.mark.parametrize("name", ["data.ndjson", "data.jsonl"])
+def test_ndjson_round_trip(tmp_path, name):
+    path = str(tmp_path / name)
+    assert write_entries(iter(ROWS), path) == len(ROWS)
+    with open(path) as f:
+        assert len(f.read().splitlines()) == len(ROWS)
+    assert list(iter_rows(path)) == ROWS
+
+
+def test_partial_marker_exists_only_while_writing(tmp_path):
+    path = str(tmp_path / "data.ndjson")
+    seen = []
+
+    def entries():
+        for row in ROWS:
+            seen.append(os.path.exists(partial_marker(path)))
+            yield row
+
+    write_entries(entries(), path)
+    assert seen == [True] * len(ROWS)
+    assert not os.path.exists(partial_marker(path))
+
+
+def test_partial_marker_is_removed_when_the_writer_fails(tmp_path):
+    path = str(tmp_path / "data.json")
+
+    def entries():
+        yield ROWS[0]
+        raise RuntimeError("generator failed")
+
+    with pytest.raises(RuntimeError):
+        write_entries(entries(), path)
+    assert not os.path.exists(partial_marker(path))
+
+
+@pytest.mark.parametrize("fmt", ["json", "ndjson"])
+def test_shards_concatenate_to_the_same_bytes(tmp_path, fmt):
+    expected, combined = str(tmp_path / f"a.{fmt}"), str(tmp_path / f"b.{fmt}")
+    write_entries(iter(ROWS), expected)
+    shards = []
+    for i, part in enumerate([ROWS[:2], [], ROWS[2:]]):
+        shard = str(tmp_path / f"shard{i}")
+        with open(shard, "w") as f:
+            shards.append((shard, write_fragment(iter(part), f, fmt)))
+    assert write_shards(shards, combined) == len(ROWS)
+    with open(expected) as a, open(combined) as b:
+        assert a.read() == b.read()
+    assert not any(os.path.exists(shard) for shard, _ in shards)
+
+
+def slow_writer(path):
+    def entries():
+        for row in ROWS:
+            time.sleep(0.02)
+            yield row
+
+    thread = threading.Thread(target=write_entries, args=(entries(), path, "ndjson"))
+    # Create the marker first, like a writer that has started but not written yet
+    open(partial_marker(path), "w").close()
+    thread.start()
+    return thread
+
+
+def test_follow_reads_until_the_writer_finishes(tmp_path):
+    path = str(tmp_path / "data.ndjson")
+    thread = slow_writer(path)
+    assert list(iter_ndjson(path, follow=True, poll_interval=0.005)) == ROWS
+    thread.join()
+
+
+def test_async_follow(tmp_path):
+    path = str(tmp_path / "data.ndjson")
+    thread = slow_writer(path)
+
+    async def read():
+        return [row async for row in aiter_ndjson(path, follow=True, poll_interval=0.005)]
+
+    assert asyncio.run(read()) == ROWS
+    thread.join()
@@ -0,0 +1,92 @@
+import asyncio
+import json
+
+import pytest
+
+from journal import ProgressJournal
+from uploader import RowResult, build_request
+from teardown import Teardown, delete_request, entity_missing, main
+
+ENV = {"url": "https://api.example.com", "account": "acme", "version": "v3", "access_token": "token"}
+
+
+def create(url):
+    return {"create": {"method": "POST", "url": {"raw": url},
+                       "header": [{"key": "Content-Type", "value": "application/x-www-form-urlencoded"},
+                                  {"key": "Authorization", "value": "Bearer {{access_token}}"}]}}
+
+
+def test_delete_request_uses_the_documented_userapi_path():
+    request = delete_request("timetrackings", create("{{url}}/{{account}}/{{version}}/timeTrackings/create/"))
+    method, url, headers, body = build_request(request, dict(ENV, id=42))
+    assert method == "DELETE"
+    assert url == "https://api.example.com/acme/userapi/v3/timeTrackings/delete/42"
+    assert headers == {"Authorization": "Bearer token"}
+    assert body == b""
+
+
+def test_folders_without_a_documented_delete_endpoint_are_refused(capsys):
+    with pytest.raises(ValueError):
+        delete_request("users", create("{{url}}/{{account}}/{{version}}/users/create/"))
+    with pytest.raises(SystemExit):
+        main(["users", "--dry-run"])
+    assert "no documented delete endpoint for users" in capsys.readouterr().err
+
+
+def test_only_a_missing_entity_error_means_already_deleted():
+    assert entity_missing(b'{"Success": false, "Error": "timeTrackings 3 does not exist"}')
+    assert not entity_missing(b'{"Success": false, "Error": "Unknown endpoint DELETE /acme/x/delete/3"}')
+    assert not entity_missing(b'{"Success": true}')
+    assert not entity_missing(b"<html>Not Found</html>")
+    assert not entity_missing(b"")
+
+
+class FakeTeardown(Teardown):
+    """Teardown whose server knows the ids in `existing`"""
+
+    def __init__(self, existing, missing_body=None):
+        super().__init__(ENV, {"timetrackings": create("{{url}}/{{account}}/{{version}}/timeTrackings/create/")},
+                         concurrency=4, retries=0)
+        self.existing = set(existing)
+        self.missing_body = missing_body
+
+    async def send_request(self, folder, method, url, headers, body=b""):
+        server_id = int(url.rsplit("/", 1)[1])
+        if server_id in self.existing:
+            self.existing.discard(server_id)
+            return RowResult(True, 200, server_id, 1.0, None, None, b"")
+        body = self.missing_body
+        if body is None:
+            body = json.dumps({"Success": False, "Error": f"timeTrackings {server_id} does not exist"}).encode()
+        return RowResult(False, 404, None, 1.0, None, "HTTP 404", body)
+
+
+def delete(tmp_path, teardown, ids):
+    async def run():
+        journal = ProgressJournal(str(tmp_path / "timetrackings.progress"))
+        try:
+            with journal.open():
+                return await teardown.delete("timetrackings", ids, journal), journal.load()
+        finally:
+            await teardown.close()
+
+    return asyncio.run(run())
+
+
+def test_ids_that_are_already_gone_count_as_deleted(tmp_path):
+    (stats, deleted), journaled = delete(tmp_path, FakeTeardown(existing=[1, 2, 4]), [1, 2, 3, 4])
+    assert stats.failed == 0
+    assert stats.ok == 4
+    assert stats.already_deleted == 1
+    assert sorted(deleted) == [1, 2, 3, 4]
+    assert sorted(journaled) == [1, 2, 3, 4]
+
+
+def test_a_404_without_a_missing_entity_error_is_a_failed_delete(tmp_path):
+    # A wrong path must not make the registry forget ids that still exist
+    teardown = FakeTeardown(existing=[1], missing_body=b'{"Success": false, "Error": "Unknown endpoint"}')
+    (stats, deleted), journaled = delete(tmp_path, teardown, [1, 2])
+    assert stats.failed == 1
+    assert stats.already_deleted == 0
+    assert deleted == [1]
+    assert list(journaled) == [1]
@@ -0,0 +1,97 @@
+import json
+import random
+from datetime import date, datetime
+
+from generate_multi_user_timetrackings import (derive_seed, generate_daily_timetrackings, generate_timetrackings,
+                                               plan_users)
+from timetracking_batch import BREAK_TASK_ID, TimestampFormatter, TimetrackingBatch, day_minute
+from work_calendar import SHORT_DAY, VACATION, WorkCalendar
+
+APRIL_1 = date(2025, 4, 1)
+APRIL_2 = date(2025, 4, 2)
+
+
+def batch_of(*users):
+    """Two days of 08:00-12:00 work, a 30 minute break and 12:30-16:30 work per user"""
+    batch = TimetrackingBatch()
+    for user_id in users:
+        for day in (APRIL_1, APRIL_2):
+            batch.extend_day(user_id, day, [(4, 480, 720), (BREAK_TASK_ID, 720, 750), (6, 750, 990)])
+    return batch
+
+
+def test_timestamp_formatter():
+    fmt = TimestampFormatter()
+    assert fmt(day_minute(APRIL_1) + 8 * 60 + 15) == "2025-04-01 08:15:00"
+    assert fmt(0) == "1970-01-01 00:00:00"
+    assert fmt(day_minute(date(2024, 2, 29)) + 1439) == "2024-02-29 23:59:00"
+
+
+def test_extend_keeps_user_ranges():
+    batch = batch_of(51, 52)
+    batch.extend(batch_of(52, 53))
+    assert len(batch) == 24
+    assert batch.users() == [51, 52, 53]
+    assert batch.user_range(51) == (0, 6)
+    assert batch.user_range(52) == (6, 18)
+    assert batch.user_range(53) == (18, 24)
+    assert batch.user_range(99) == (0, 0)
+    assert list(batch.for_user(53).entries()) == list(batch_of(53).entries())
+
+
+def test_day_range_and_for_day():
+    batch = batch_of(51, 52)
+    assert batch.day_range(52, APRIL_1) == (6, 9)
+    assert batch.day_range(52, APRIL_2) == (9, 12)
+    assert batch.day_range(52, date(2025, 4, 3)) == (12, 12)
+    day = batch.for_day(51, APRIL_2)
+    assert [e["start_time"] for e in day.entries()] == \
+        ["2025-04-02 08:00:00", "2025-04-02 12:00:00", "2025-04-02 12:30:00"]
+    assert day.users() == [51]
+
+
+def test_user_summary():
+    batch = batch_of(51, 52)
+    assert batch.user_summary(51) == {"entries": 6, "days": 2, "work_minutes": 960, "break_minutes": 60}
+    assert batch.user_summary(99) == {"entries": 0, "days": 0, "work_minutes": 0, "break_minutes": 0}
+    assert batch.work_entry_count() == 8
+
+
+def test_entries_across_midnight():
+    batch = TimetrackingBatch()
+    batch.extend_day(5099, date(2025, 12, 31), [(162, 23 * 60 + 45, 24 * 60 + 15)])
+    assert list(batch.entries()) == [{"user_id": "5099", "task_id": "162",
+                                      "start_time": "2025-12-31 23:45:00", "end_time": "2026-01-01 00:15:00"}]
+    # The entry belongs to the day it starts on
+    assert batch.day_range(5099, date(2025, 12, 31)) == (0, 1)
+    assert batch.day_range(5099, date(2026, 1, 1)) == (1, 1)
+
+
+def test_from_columns_matches_appending():
+    batch = batch_of(51, 52)
+    rebuilt = TimetrackingBatch.from_columns(list(batch.user_ids), list(batch.task_ids),
+                                             list(batch.starts), list(batch.ends))
+    assert list(rebuilt.entries()) == list(batch.entries())
+    assert rebuilt.user_range(52) == batch.user_range(52)
+
+
+def dict_generator(user_ids, calendar, user_vacation_days, user_short_days, base_seed):
+    """The generator as it was before TimetrackingBatch: one dict per entry, built with strftime"""
+    for user_id in user_ids:
+        rng = random.Random(derive_seed(base_seed, user_id, "entries"))
+        mask = calendar.user_mask(user_vacation_days[user_id], user_short_days[user_id])
+        for day in calendar.working_days():
+            flags = calendar.flags(mask, day)
+            if flags & VACATION:
+                continue
+            yield from generate_daily_timetrackings(day, user_id, bool(flags & SHORT_DAY), rng)
+
+
+def test_entries_are_byte_identical_to_the_dict_generator():
+    calendar = WorkCalendar(datetime(2025, 4, 1), datetime(2025, 6, 30), "AT")
+    user_ids = list(range(51, 56))
+    _, vacation, short = plan_users(user_ids, calendar, 20, base_seed=5)
+    batched = json.dumps(list(generate_timetrackings(user_ids, calendar, vacation, short, 5)), indent=2)
+    expected = json.dumps(list(dict_generator(user_ids, calendar, vacation, short, 5)), indent=2)
+    assert batched == expected
+    assert len(json.loads(batched)) > 5 * 50
@@ -0,0 +1,85 @@
+import asyncio
+import multiprocessing
+import os
+import stat
+import time
+
+import pytest
+
+import token_cache
+from token_cache import TokenCache
+
+ENV = {"url": "https://api.example.com/", "account": "acme", "client_id": "cli"}
+
+
+def test_store_and_get(tmp_path):
+    cache = TokenCache(str(tmp_path / "tokens.json"))
+    assert cache.get(ENV) is None
+    token, expires_at = cache.store(ENV, "abc", expires_in=3600)
+    assert cache.get(ENV) == (token, expires_at)
+    # Trailing slashes do not matter, other accounts do
+    assert cache.get(dict(ENV, url="https://api.example.com")) == ("abc", expires_at)
+    assert cache.get(dict(ENV, account="globex")) is None
+    assert stat.S_IMODE(os.stat(cache.path).st_mode) == 0o600
+
+
+def test_tokens_about_to_expire_are_not_returned(tmp_path):
+    cache = TokenCache(str(tmp_path / "tokens.json"), refresh_margin=300)
+    cache.store(ENV, "abc", expires_in=299)
+    assert cache.get(ENV) is None
+    cache.store(ENV, "def", expires_in=301)
+    assert cache.get(ENV)[0] == "def"
+
+
+def test_store_drops_expired_entries(tmp_path):
+    cache = TokenCache(str(tmp_path / "tokens.json"))
+    cache.store(dict(ENV, account="old"), "abc", expires_in=-1)
+    cache.store(ENV, "def")
+    assert list(cache._load()) == [token_cache.cache_key(ENV)]
+
+
+def test_invalidate_only_the_rejected_token(tmp_path):
+    cache = TokenCache(str(tmp_path / "tokens.json"))
+    cache.store(ENV, "new")
+    # A worker that was rejected with an older token must not drop the new one
+    cache.invalidate(ENV, access_token="old")
+    assert cache.get(ENV)[0] == "new"
+    cache.invalidate(ENV, access_token="new")
+    assert cache.get(ENV) is None
+
+
+def test_concurrent_coroutines_share_one_fetch(tmp_path):
+    cache = TokenCache(str(tmp_path / "tokens.json"))
+    fetches = []
+
+    async def fetch():
+        fetches.append(1)
+        await asyncio.sleep(0.05)
+        return {"access_token": f"token{len(fetches)}", "expires_in": 3600}
+
+    async def run():
+        return await asyncio.gather(*(cache.get_or_fetch(ENV, fetch) for _ in range(16)))
+
+    results = asyncio.run(run())
+    assert len(fetches) == 1
+    assert {token for token, _ in results} == {"token1"}
+
+
+def fetch_in_process(path, counter):
+    async def fetch():
+        with open(counter, "a") as f:
+            f.write("x")
+        time.sleep(0.2)
+        return {"access_token": f"token-{os.getpid()}", "expires_in": 3600}
+
+    return asyncio.run(TokenCache(path).get_or_fetch(ENV, fetch))[0]
+
+
+@pytest.mark.skipif(token_cache.fcntl is None, reason="no flock on this platform")
+def test_the_file_lock_makes_other_processes_wait_for_one_fetch(tmp_path):
+    path, counter = str(tmp_path / "tokens.json"), str(tmp_path / "fetches")
+    with multiprocessing.get_context("fork").Pool(4) as pool:
+        tokens = pool.starmap(fetch_in_process, [(path, counter)] * 4)
+    with open(counter) as f:
+        assert f.read() == "x"
+    assert len(set(tokens)) == 1
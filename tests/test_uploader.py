@@ -0,0 +1,24 @@
+import random
+
+from uploader import DEFAULT_TIMEZONE, prepare_row
+
+BOOKING = {"user_id": "51", "task_id": "4", "start_time": "2025-04-01 08:00:00", "end_time": "2025-04-01 12:00:00"}
+
+
+def test_timezones_default_only_when_the_key_is_absent():
+    variables = prepare_row("timetrackings", BOOKING, {})
+    assert variables["start_time_timezone"] == variables["end_time_timezone"] == DEFAULT_TIMEZONE
+    # Like the prerequest script's !pm.iterationData.has(...), present but empty is kept
+    row = dict(BOOKING, start_time_timezone="", end_time_timezone="Europe/Berlin")
+    variables = prepare_row("timetrackings", row, {})
+    assert variables["start_time_timezone"] == ""
+    assert variables["end_time_timezone"] == "Europe/Berlin"
+
+
+def test_empty_user_fields_get_the_documented_defaults():
+    row = {"firstname": "Lisa", "department_id": "", "timesheet_template_id": "",
+           "payroll_accounting_starts_at": "2025-01-01"}
+    variables = prepare_row("users", row, {"department_ids": [7]}, random.Random(1))
+    assert variables["department_id"] == "7"
+    assert variables["timesheet_template_id"] == "1"
+    assert variables["department_id_valid_from"] == "2025-01-01"
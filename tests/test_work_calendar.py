@@ -0,0 +1,70 @@
+import random
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from work_calendar import (SHORT_DAY, VACATION, WorkCalendar, austrian_holidays, easter_sunday, german_holidays,
+                           load_holiday_file)
+
+
+@pytest.mark.parametrize("year,easter", [(1818, date(1818, 3, 22)), (2000, date(2000, 4, 23)),
+                                         (2024, date(2024, 3, 31)), (2025, date(2025, 4, 20)),
+                                         (2026, date(2026, 4, 5)), (2038, date(2038, 4, 25))])
+def test_easter_sunday(year, easter):
+    assert easter_sunday(year) == easter
+
+
+def test_movable_holidays_2025():
+    at, de = set(austrian_holidays(2025)), set(german_holidays(2025))
+    assert {date(2025, 4, 21), date(2025, 5, 29), date(2025, 6, 9), date(2025, 6, 19)} <= at
+    assert date(2025, 4, 18) not in at
+    assert {date(2025, 4, 18), date(2025, 4, 21), date(2025, 10, 3)} <= de
+    assert date(2025, 6, 19) not in de and date(2025, 12, 8) not in de
+    assert len(at) == 13 and len(de) == 9
+
+
+def test_working_days_of_april_2025():
+    # 22 weekdays; Easter Monday in AT, Good Friday and Easter Monday in DE
+    assert len(WorkCalendar(date(2025, 4, 1), date(2025, 4, 30), "AT")) == 21
+    assert len(WorkCalendar(date(2025, 4, 1), date(2025, 4, 30), "DE")) == 20
+    calendar = WorkCalendar(date(2025, 4, 1), date(2025, 4, 30), "AT", extra_holidays=[date(2025, 4, 30)])
+    assert len(calendar) == 20
+    assert calendar.is_holiday(date(2025, 4, 21)) and not calendar.is_working_day(date(2025, 4, 21))
+    assert not calendar.is_working_day(date(2025, 4, 5))  # Saturday
+    assert calendar.working_days(date(2025, 4, 17), date(2025, 4, 22)) == \
+        [datetime(2025, 4, 17), datetime(2025, 4, 18), datetime(2025, 4, 22)]
+
+
+def test_prefix_counts_match_a_scan():
+    calendar = WorkCalendar(date(2024, 12, 1), date(2026, 1, 31), "AT")
+    rng = random.Random(7)
+    for _ in range(200):
+        start = date(2024, 11, 1) + timedelta(days=rng.randrange(480))
+        end = start + timedelta(days=rng.randrange(-5, 120))
+        expected = sum(1 for i in range((end - start).days + 1)
+                       if calendar.first <= (start + timedelta(days=i)).toordinal() <= calendar.last
+                       and calendar.is_working_day(start + timedelta(days=i)))
+        assert calendar.count_working_days(start, end) == expected
+        assert len(calendar.working_ordinals(start, end)) == expected
+
+
+def test_user_mask_flags():
+    calendar = WorkCalendar(date(2025, 4, 1), date(2025, 4, 30), "AT")
+    mask = calendar.user_mask([date(2025, 4, 2)], [date(2025, 4, 3), date(2025, 4, 2)])
+    assert calendar.flags(mask, date(2025, 4, 2)) == VACATION | SHORT_DAY
+    assert calendar.flags(mask, date(2025, 4, 3)) == SHORT_DAY
+    assert calendar.flags(mask, date(2025, 4, 4)) == 0
+    calendar.mark(mask, date(2025, 4, 4), VACATION)
+    assert calendar.flags(mask, date(2025, 4, 4)) == VACATION
+    with pytest.raises(ValueError):
+        calendar.flags(mask, date(2025, 5, 1))
+
+
+def test_holiday_file(tmp_path):
+    path = tmp_path / "holidays.txt"
+    path.write_text("# company days\n2025-04-02\n\n2025-04-03  # founder's day\n2026-04-02\n")
+    holidays = load_holiday_file(str(path))
+    assert holidays(2025) == [date(2025, 4, 2), date(2025, 4, 3)]
+    calendar = WorkCalendar(date(2025, 4, 1), date(2025, 4, 30), holidays)
+    assert len(calendar) == 20
+    assert calendar.holidays == [date(2025, 4, 2), date(2025, 4, 3)]
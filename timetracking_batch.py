@@ -0,0 +1,203 @@
+"""
+Compact column-wise container for generated timetrackings.
+
+A TimetrackingBatch keeps user ids, task ids and start/end times as four
+`array('i')` columns, with times in minutes since 1970-01-01. An entry costs 16
+bytes instead of a dict of four strings (several hundred bytes), and the
+"YYYY-MM-DD HH:MM:SS" strings the API expects are only built in entries(),
+i.e. when writing or uploading.
+
+Entries are appended user by user and day by day, which makes per-user and
+per-day slices cheap (an offset lookup and a bisect) for summaries.
+"""
+from array import array
+from bisect import bisect_left
+from datetime import date
+
+# date.toordinal() of 1970-01-01
+EPOCH_ORDINAL = 719163
+MINUTES_PER_DAY = 24 * 60
+BREAK_TASK_ID = 9
+
+# "HH:MM:00" for every minute of a day
+_CLOCK = [f"{m // 60:02d}:{m % 60:02d}:00" for m in range(MINUTES_PER_DAY)]
+
+
+def day_minute(day):
+    """Epoch minute of midnight of a date or datetime"""
+    return (day.toordinal() - EPOCH_ORDINAL) * MINUTES_PER_DAY
+
+
+class TimestampFormatter:
+    """Epoch minute -> 'YYYY-MM-DD HH:MM:SS', caching the date part per day"""
+
+    __slots__ = ("_days",)
+
+    def __init__(self):
+        self._days = {}
+
+    def __call__(self, minute):
+        day, clock = divmod(minute, MINUTES_PER_DAY)
+        prefix = self._days.get(day)
+        if prefix is None:
+            prefix = self._days[day] = date.fromordinal(day + EPOCH_ORDINAL).isoformat() + " "
+        return prefix + _CLOCK[clock]
+
+
+class TimetrackingBatch:
+    """Timetracking entries stored column-wise in typed arrays"""
+
+    __slots__ = ("user_ids", "task_ids", "starts", "ends", "_user_ranges")
+
+    def __init__(self):
+        self.user_ids = array("i")
+        self.task_ids = array("i")
+        self.starts = array("i")
+        self.ends = array("i")
+        # user id -> [first index, end index) while users are appended contiguously
+        self._user_ranges = {}
+
+    def __len__(self):
+        return len(self.starts)
+
+    @property
+    def nbytes(self):
+        return sum(len(c) * c.itemsize for c in (self.user_ids, self.task_ids, self.starts, self.ends))
+
+    def append(self, user_id, task_id, start, end):
+        """Add one entry; start and end are epoch minutes"""
+        index = len(self.starts)
+        self.user_ids.append(user_id)
+        self.task_ids.append(task_id)
+        self.starts.append(start)
+        self.ends.append(end)
+        first, _ = self._user_ranges.get(user_id, (index, index))
+        self._user_ranges[user_id] = (first, index + 1)
+
+    def extend_day(self, user_id, day, sessions):
+        """Add (task id, start minute of day, end minute of day) sessions of one day"""
+        base = day_minute(day)
+        for task_id, start, end in sessions:
+            self.append(user_id, task_id, base + start, base + end)
+
+    def extend(self, other):
+        """Append all entries of another batch"""
+        offset = len(self.starts)
+        self.user_ids.extend(other.user_ids)
+        self.task_ids.extend(other.task_ids)
+        self.starts.extend(other.starts)
+        self.ends.extend(other.ends)
+        for user_id, (first, end) in other._user_ranges.items():
+            start, _ = self._user_ranges.get(user_id, (first + offset, first + offset))
+            self._user_ranges[user_id] = (start, end + offset)
+
+    @classmethod
+    def from_columns(cls, user_ids, task_ids, starts, ends):
+        """Build a batch from equally long sequences (lists, arrays or NumPy int arrays)"""
+        batch = cls()
+        for column, values in ((batch.user_ids, user_ids), (batch.task_ids, task_ids),
+                               (batch.starts, starts), (batch.ends, ends)):
+            if hasattr(values, "astype"):
+                column.frombytes(values.astype(column.typecode).tobytes())
+            else:
+                column.extend(values)
+        batch._index_users()
+        return batch
+
+    def _index_users(self):
+        self._user_ranges = {}
+        for index, user_id in enumerate(self.user_ids):
+            first, _ = self._user_ranges.get(user_id, (index, index))
+            self._user_ranges[user_id] = (first, index + 1)
+
+    def to_numpy(self):
+        """Zero-copy NumPy views of the columns: (user_ids, task_ids, starts, ends)"""
+        import numpy as np
+        return tuple(np.frombuffer(c, dtype=np.intc) for c in (self.user_ids, self.task_ids,
+                                                                self.starts, self.ends))
+
+    # ------------------------------------------------------------------
+    # Slicing
+    # ------------------------------------------------------------------
+
+    def users(self):
+        return list(self._user_ranges)
+
+    def user_range(self, user_id):
+        """[first, end) indexes of a user's entries"""
+        return self._user_ranges.get(user_id, (0, 0))
+
+    def day_range(self, user_id, day):
+        """[first, end) indexes of a user's entries that start on `day`"""
+        first, end = self.user_range(user_id)
+        midnight = day_minute(day)
+        lo = bisect_left(self.starts, midnight, first, end)
+        hi = bisect_left(self.starts, midnight + MINUTES_PER_DAY, lo, end)
+        return lo, hi
+
+    def slice(self, first, end):
+        batch = TimetrackingBatch()
+        batch.user_ids = self.user_ids[first:end]
+        batch.task_ids = self.task_ids[first:end]
+        batch.starts = self.starts[first:end]
+        batch.ends = self.ends[first:end]
+        batch._index_users()
+        return batch
+
+    def for_user(self, user_id):
+        return self.slice(*self.user_range(user_id))
+
+    def for_day(self, user_id, day):
+        return self.slice(*self.day_range(user_id, day))
+
+    # ------------------------------------------------------------------
+    # Summaries
+    # ------------------------------------------------------------------
+
+    def work_entry_count(self):
+        return len(self) - self.task_ids.count(BREAK_TASK_ID)
+
+    def days(self, user_id):
+        """Dates on which a user has entries, in order"""
+        first, end = self.user_range(user_id)
+        seen = sorted({s // MINUTES_PER_DAY for s in self.starts[first:end]})
+        return [date.fromordinal(d + EPOCH_ORDINAL) for d in seen]
+
+    def minutes(self, first=0, end=None):
+        """(work minutes, break minutes) of the entries in [first, end)"""
+        end = len(self) if end is None else end
+        work = breaks = 0
+        for i in range(first, end):
+            duration = self.ends[i] - self.starts[i]
+            if self.task_ids[i] == BREAK_TASK_ID:
+                breaks += duration
+            else:
+                work += duration
+        return work, breaks
+
+    def user_summary(self, user_id):
+        first, end = self.user_range(user_id)
+        work, breaks = self.minutes(first, end)
+        return {"entries": end - first, "days": len(self.days(user_id)),
+                "work_minutes": work, "break_minutes": breaks}
+
+    # ------------------------------------------------------------------
+    # Serialization edge
+    # ------------------------------------------------------------------
+
+    def entries(self, formatter=None):
+        """Yield entries in the API's string form"""
+        fmt = formatter or TimestampFormatter()
+        user_strings = {}
+        for user_id, task_id, start, end in zip(self.user_ids, self.task_ids, self.starts, self.ends):
+            user = user_strings.get(user_id)
+            if user is None:
+                user = user_strings[user_id] = str(user_id)
+            yield {
+                "user_id": user,
+                "task_id": str(task_id),
+                "start_time": fmt(start),
+                "end_time": fmt(end),
+            }
+
+    __iter__ = entries
@@ -0,0 +1,181 @@
+"""
+Shared OAuth2 token cache.
+
+Access tokens from the password grant are cached in `.token_cache.json`
+(readable by the owner only), keyed by url, account and client_id of the
+environment. All uploader workers, parallel Newman runs and later runs reuse a
+cached token until shortly before it expires; a file lock makes sure only one
+process asks the server for a new one while the others wait and then read it.
+
+    python token_cache.py token       # print a valid token for stage-env.json
+    python token_cache.py clear       # forget all cached tokens
+
+create_test_data.sh passes the printed token to Newman with --env-var, so the
+collection's prerequest script does not fetch one per folder.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking, the cache still works
+    fcntl = None
+
+TOKEN_CACHE_FILE = ".token_cache.json"
+# Tokens are refreshed this many seconds before they expire
+REFRESH_MARGIN = 300
+# Used when the token response has no expires_in
+DEFAULT_EXPIRES_IN = 3600
+
+
+def cache_key(env):
+    return f"{env.get('url', '').rstrip('/')}|{env.get('account', '')}|{env.get('client_id', '')}"
+
+
+class TokenCache:
+    """File-backed {url|account|client_id: token} map shared between processes"""
+
+    def __init__(self, path=TOKEN_CACHE_FILE, refresh_margin=REFRESH_MARGIN):
+        self.path = path
+        self.refresh_margin = refresh_margin
+        self._lock = None
+
+    def _acquire(self):
+        """Block until this process holds the exclusive lock on <path>.lock"""
+        lock = open(self.path + ".lock", "a")
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        return lock
+
+    @staticmethod
+    def _release(lock):
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+        lock.close()
+
+    @contextmanager
+    def locked(self):
+        lock = self._acquire()
+        try:
+            yield
+        finally:
+            self._release(lock)
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self, entries):
+        # Write to a private temp file and rename, so readers never see half a file
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump(entries, f, indent=2)
+        os.replace(tmp, self.path)
+
+    def get(self, env):
+        """Cached (token, expires_at) that is not about to expire, or None"""
+        entry = self._load().get(cache_key(env))
+        if entry and entry["expires_at"] - self.refresh_margin > time.time():
+            return entry["access_token"], entry["expires_at"]
+        return None
+
+    def store(self, env, access_token, expires_in=None):
+        expires_at = time.time() + float(expires_in or DEFAULT_EXPIRES_IN)
+        entries = self._load()
+        now = time.time()
+        entries = {k: v for k, v in entries.items() if v.get("expires_at", 0) > now}
+        entries[cache_key(env)] = {"access_token": access_token, "expires_at": expires_at}
+        self._save(entries)
+        return access_token, expires_at
+
+    def invalidate(self, env, access_token=None):
+        """Forget the cached token, or only `access_token` if it is still the cached one"""
+        with self.locked():
+            entries = self._load()
+            entry = entries.get(cache_key(env))
+            if entry is not None and access_token in (None, entry["access_token"]):
+                del entries[cache_key(env)]
+                self._save(entries)
+
+    def clear(self):
+        with self.locked():
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+    async def get_or_fetch(self, env, fetch):
+        """A valid (token, expires_at); `fetch()` returns the token response payload
+
+        Coroutines of one process share a single fetch, and the file lock makes
+        other processes wait for it instead of fetching their own.
+        """
+        cached = self.get(env)
+        if cached:
+            return cached
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            cached = self.get(env)
+            if cached:
+                return cached
+            # Waiting for another process must not block the event loop
+            lock = await asyncio.to_thread(self._acquire)
+            try:
+                cached = self.get(env)
+                if cached:
+                    return cached
+                payload = await fetch()
+                return self.store(env, payload["access_token"], payload.get("expires_in"))
+            finally:
+                self._release(lock)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Shared OAuth2 token cache for the TimeTac API")
+    parser.add_argument("--cache", default=TOKEN_CACHE_FILE, help="Token cache file")
+    commands = parser.add_subparsers(dest="command", required=True)
+    token = commands.add_parser("token", help="Print a valid access token, fetching one if needed")
+    token.add_argument("--env", default="stage-env.json", help="Postman environment file")
+    token.add_argument("--url", help="Override the environment url")
+    commands.add_parser("clear", help="Forget all cached tokens")
+    args = parser.parse_args(argv)
+
+    cache = TokenCache(args.cache)
+    if args.command == "clear":
+        cache.clear()
+        return 0
+
+    from uploader import HttpClient, load_environment, make_ssl_context, request_token
+    from urllib.parse import urlsplit
+
+    env = load_environment(args.env)
+    if args.url:
+        env["url"] = args.url.rstrip("/")
+
+    async def fetch():
+        parts = urlsplit(env["url"])
+        client = HttpClient(f"{parts.scheme}://{parts.netloc}", pool_size=1, ssl_context=make_ssl_context())
+        try:
+            return await request_token(client, env)
+        finally:
+            await client.close()
+
+    try:
+        access_token, _ = asyncio.run(cache.get_or_fetch(env, fetch))
+    except Exception as e:
+        print(f"Failed to get token: {e}", file=sys.stderr)
+        return 1
+    print(access_token)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
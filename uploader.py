@@ -0,0 +1,850 @@
+"""
+Async Python uploader for test_data/*.json.
+
+Replaces the per-row Newman runs of create_test_data.sh with a single asyncio
+process that posts the same rows to the same endpoints of test_collection.json
+over a pool of keep-alive connections:
+
+    python uploader.py timetrackings
+    python uploader.py projects tasks --concurrency 32
+    python uploader.py timetrackings --url http://127.0.0.1:8080   # mock_server.py
+
+The smart defaults of the collection prerequest scripts (timezones, mother_id,
+department_id, timesheet_template_id, project status, ...) are applied in
+prepare_row() so the payloads match what Newman would send.
+
+Data files may be JSON arrays, NDJSON or columnar .npz (columnar.py); a
+test_data/<folder>.npz that is newer than the .json is used instead of it.
+JSON and NDJSON files with an up-to-date row index (row_index.py) are
+memory-mapped and parsed row by row, and --shard k/N uploads one of N disjoint
+row ranges, so several processes can share one large file:
+
+    python uploader.py timetrackings --shard 1/4 --resume
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import math
+import os
+import random
+import re
+import ssl
+import sys
+import time
+from collections import namedtuple
+from urllib.parse import urlencode, urlsplit
+
+from columnar import resolve_data_file
+from id_registry import REGISTRY_FILE, IdRegistry, parse_response
+from journal import ProgressJournal, journal_path
+from metrics import Metrics, live_metrics, profiled
+from metrics import add_arguments as add_metrics_arguments
+from rate_limit import AimdLimiter, backoff_delay, is_retryable, parse_retry_after
+from row_index import RowIndex, is_fresh, parse_shard, resume_point, shard_range
+from run_log import RUN_LOG_FILE, RunLog
+from scheduler import ROW_LINKS, dependency_order, run_graph
+from streaming import aiter_ndjson, detect_format, iter_rows
+from token_cache import DEFAULT_EXPIRES_IN, REFRESH_MARGIN, TOKEN_CACHE_FILE, TokenCache
+
+COLLECTION = "test_collection.json"
+ENVIRONMENT = "stage-env.json"
+CA_CERT = "timetac-dev-ca.crt"
+
+# Same folder-to-data-file mapping as create_test_data.sh
+FOLDER_DATA_MAP = {
+    "timetrackings": "test_data/timetrackings.json",
+    "departments": "test_data/departments.json",
+    "users": "test_data/users.json",
+    "tasks": "test_data/tasks.json",
+    "projects": "test_data/projects.json",
+    "absences": "test_data/absences.json",
+}
+
+DEFAULT_TIMEZONE = "Europe/Vienna"
+DEFAULT_PROJECT_ID = "3"
+DEFAULT_PROJECT_STATUS = "2"
+DEFAULT_VALID_FROM = "2024-09-17"
+
+VARIABLE_PATTERN = re.compile(r"\{\{(\w+)\}\}")
+
+# Context key that prepare_row() reads for the ids of a bulk-read resource
+READ_CONTEXT_KEYS = {
+    "departments": "department_ids",
+    "workSchedules": "workschedule_ids",
+}
+
+
+# ==================================================================================
+# Collection and environment
+# ==================================================================================
+
+def load_environment(path=ENVIRONMENT):
+    """Load the enabled values of a Postman environment file into a dict"""
+    with open(path) as f:
+        env = json.load(f)
+    return {v["key"]: v["value"] for v in env.get("values", []) if v.get("enabled", True)}
+
+
+def load_collection(path=COLLECTION):
+    """Return {folder: {request_name: request}} from a Postman collection"""
+    with open(path) as f:
+        collection = json.load(f)
+    folders = {}
+    for folder in collection.get("item", []):
+        folders[folder["name"]] = {item["name"]: item["request"] for item in folder.get("item", [])}
+    return folders
+
+
+def render(template, variables):
+    """Substitute {{name}} placeholders; unknown variables become empty strings"""
+    return VARIABLE_PATTERN.sub(lambda m: str(variables.get(m.group(1), "")), template)
+
+
+def build_request(request, variables):
+    """Turn a collection request into (method, url, headers, body bytes)"""
+    url = request["url"] if isinstance(request["url"], str) else request["url"]["raw"]
+    headers = {h["key"]: render(h["value"], variables)
+               for h in request.get("header", []) if not h.get("disabled")}
+    body = b""
+    if request.get("body", {}).get("mode") == "urlencoded":
+        fields = [(p["key"], render(p["value"], variables))
+                  for p in request["body"]["urlencoded"] if not p.get("disabled")]
+        body = urlencode(fields).encode()
+        headers.setdefault("Content-Type", "application/x-www-form-urlencoded")
+    return request["method"], render(url, variables), headers, body
+
+
+def load_rows(path, follow=False, indexed=False):
+    """Rows of a data file: JSON arrays are loaded, NDJSON is streamed (async iterator)
+    and .npz columns are memory-mapped
+
+    Indexed JSON/NDJSON files (or any with `indexed`, building the index if
+    needed) are memory-mapped as a RowIndex instead.
+    """
+    fmt = detect_format(path)
+    if fmt == "npz":
+        from columnar import ColumnarFile
+        return ColumnarFile(path)
+    if not follow and (indexed or is_fresh(path)):
+        return RowIndex.open(path)
+    if fmt == "ndjson":
+        return aiter_ndjson(path, follow=follow)
+    with open(path) as f:
+        return json.load(f)
+
+
+async def _enumerate(rows, start=0):
+    """enumerate() for both plain and async iterables"""
+    index = start
+    if hasattr(rows, "__aiter__"):
+        async for row in rows:
+            yield index, row
+            index += 1
+    else:
+        for row in rows:
+            yield index, row
+            index += 1
+
+
+# ==================================================================================
+# Prerequest defaulting logic (mirrors test_collection.json and .gitlab docs)
+# ==================================================================================
+
+def _is_missing(row, key):
+    """Missing or empty: the docs give "field included but empty" the default too"""
+    return row.get(key) in (None, "")
+
+
+def prepare_row(folder, row, context, rng=random):
+    """Return the request variables for one data row with collection defaults applied"""
+    variables = dict(row)
+
+    if folder == "timetrackings":
+        # Only when the key is absent (!pm.iterationData.has), an empty timezone is sent as is
+        for key in ("start_time_timezone", "end_time_timezone"):
+            if key not in row:
+                variables[key] = DEFAULT_TIMEZONE
+
+    elif folder == "tasks":
+        if _is_missing(row, "mother_id"):
+            project_ids = context.get("project_ids") or []
+            variables["mother_id"] = str(rng.choice(project_ids)) if project_ids else DEFAULT_PROJECT_ID
+
+    elif folder == "projects":
+        if _is_missing(row, "status"):
+            variables["status"] = DEFAULT_PROJECT_STATUS
+
+    elif folder == "users":
+        for key, pool in (("department_id", "department_ids"),
+                          ("timesheet_template_id", "workschedule_ids")):
+            if _is_missing(row, key):
+                ids = context.get(pool) or []
+                variables[key] = str(rng.choice(ids)) if ids else "1"
+
+        for key in ("timesheet_template_id_valid_starting_from", "department_id_valid_from"):
+            if _is_missing(row, key):
+                variables[key] = DEFAULT_VALID_FROM
+        if _is_missing(row, "payroll_accounting_starts_at"):
+            variables["payroll_accounting_starts_at"] = variables["timesheet_template_id_valid_starting_from"]
+
+        # Valid-from dates must not be earlier than payroll_accounting_starts_at
+        payroll = variables["payroll_accounting_starts_at"]
+        for key in ("timesheet_template_id_valid_starting_from", "department_id_valid_from"):
+            if variables[key] < payroll:
+                variables[key] = payroll
+
+    return variables
+
+
+# ==================================================================================
+# HTTP client
+# ==================================================================================
+
+def make_ssl_context(ca_cert=CA_CERT):
+    """Default trust store plus the TimeTac dev CA (like NODE_EXTRA_CA_CERTS)"""
+    context = ssl.create_default_context()
+    if ca_cert and os.path.exists(ca_cert):
+        context.load_verify_locations(ca_cert)
+    return context
+
+
+class HttpError(Exception):
+    """Raised when a response cannot be read"""
+
+
+Response = namedtuple("Response", "status headers body")
+
+
+class HttpClient:
+    """Keep-alive HTTP/1.1 client with a bounded connection pool for one origin"""
+
+    def __init__(self, origin, pool_size=10, ssl_context=None, timeout=30):
+        parts = urlsplit(origin)
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.ssl_context = (ssl_context or make_ssl_context()) if parts.scheme == "https" else None
+        self.timeout = timeout
+        self._slots = asyncio.Semaphore(pool_size)
+        self._idle = []
+
+    async def _connect(self):
+        return await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port, ssl=self.ssl_context), self.timeout)
+
+    async def request(self, method, target, headers=None, body=b""):
+        """Send one request and return a Response"""
+        async with self._slots:
+            reused = bool(self._idle)
+            conn = self._idle.pop() if reused else await self._connect()
+            try:
+                response, keep_alive = await asyncio.wait_for(
+                    self._exchange(conn, method, target, headers or {}, body), self.timeout)
+            except (ConnectionError, asyncio.IncompleteReadError, HttpError):
+                conn[1].close()
+                if not reused:
+                    raise
+                # The server dropped an idle keep-alive connection, retry on a fresh one
+                conn = await self._connect()
+                try:
+                    response, keep_alive = await asyncio.wait_for(
+                        self._exchange(conn, method, target, headers or {}, body), self.timeout)
+                except BaseException:
+                    conn[1].close()
+                    raise
+            except BaseException:
+                conn[1].close()
+                raise
+            if keep_alive:
+                self._idle.append(conn)
+            else:
+                conn[1].close()
+            return response
+
+    async def _exchange(self, conn, method, target, headers, body):
+        reader, writer = conn
+        default_port = 443 if self.scheme == "https" else 80
+        host = self.host if self.port == default_port else f"{self.host}:{self.port}"
+        lines = [f"{method} {target} HTTP/1.1", f"Host: {host}"]
+        lines += [f"{k}: {v}" for k, v in headers.items()]
+        lines.append(f"Content-Length: {len(body)}")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise HttpError("Connection closed before response")
+        status = int(status_line.split()[1])
+        response_headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            response_headers[name.strip().lower()] = value.strip()
+
+        keep_alive = response_headers.get("connection", "").lower() != "close"
+        if response_headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    await reader.readline()
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readline()
+            data = b"".join(chunks)
+        elif "content-length" in response_headers:
+            data = await reader.readexactly(int(response_headers["content-length"]))
+        else:
+            data = await reader.read()
+            keep_alive = False
+        return Response(status, response_headers, data), keep_alive
+
+    async def close(self):
+        while self._idle:
+            self._idle.pop()[1].close()
+
+
+async def request_token(client, env):
+    """OAuth2 password grant, same request as the collection-level prerequest script
+
+    Returns the token response payload (access_token, expires_in, ...).
+    """
+    path = urlsplit(f"{env['url']}/{env['account']}/auth/oauth2/token").path
+    body = urlencode({
+        "grant_type": "password",
+        "username": env.get("username", ""),
+        "password": env.get("password", ""),
+        "client_id": env.get("client_id", ""),
+        "client_secret": env.get("client_secret", ""),
+    }).encode()
+    response = await client.request(
+        "POST", path, {"Content-Type": "application/x-www-form-urlencoded"}, body)
+    if response.status != 200:
+        raise HttpError(f"Failed to get token. Status: {response.status}")
+    return json.loads(response.body)
+
+
+async def fetch_token(client, env):
+    return (await request_token(client, env))["access_token"]
+
+
+def read_resource(request):
+    """Resource name of a read-* request, from its URL path (.../departments/read/)"""
+    url = request["url"]["raw"] if isinstance(request["url"], dict) else request["url"]
+    segments = [s for s in urlsplit(url.split("?", 1)[0]).path.split("/") if s]
+    return segments[-2] if len(segments) >= 2 and segments[-1] == "read" else segments[-1]
+
+
+async def read_ids(client, request, variables):
+    """Run a read-* request of the collection and return ids > 1 (ID=1 is the default entry)"""
+    method, url, headers, body = build_request(request, variables)
+    parts = urlsplit(url)
+    target = parts.path + (f"?{parts.query}" if parts.query else "")
+    response = await client.request(method, target, headers, body)
+    if response.status != 200:
+        return []
+    try:
+        results = json.loads(response.body).get("Results") or []
+    except ValueError:
+        return []
+    return [r["id"] for r in results if isinstance(r, dict) and r.get("id", 0) > 1]
+
+
+# ==================================================================================
+# Statistics
+# ==================================================================================
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values), math.ceil(pct / 100 * len(sorted_values))) - 1)
+    return sorted_values[index]
+
+
+class UploadStats:
+    """Counts and request latencies for one folder"""
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.ok = 0
+        self.failed = 0
+        self.skipped = 0
+        self.retries = 0
+        self.latencies_ms = []
+        self.started = time.perf_counter()
+        self.finished = None
+        self.final_limit = None
+
+    def record(self, success, latency_ms):
+        if success:
+            self.ok += 1
+        else:
+            self.failed += 1
+        self.latencies_ms.append(latency_ms)
+
+    def finish(self):
+        self.finished = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.perf_counter()) - self.started
+
+    def summary(self):
+        latencies = sorted(self.latencies_ms)
+        rows = self.ok + self.failed
+        return {
+            "folder": self.folder,
+            "rows": rows,
+            "ok": self.ok,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "retries": self.retries,
+            "elapsed_s": round(self.elapsed, 3),
+            "rows_per_s": round(rows / self.elapsed, 1) if self.elapsed > 0 else 0.0,
+            "p50_ms": round(percentile(latencies, 50), 2),
+            "p95_ms": round(percentile(latencies, 95), 2),
+            "p99_ms": round(percentile(latencies, 99), 2),
+            "final_concurrency": self.final_limit,
+        }
+
+
+# ==================================================================================
+# Upload
+# ==================================================================================
+
+# Outcome of one request: status is None when the connection itself failed
+RowResult = namedtuple("RowResult", "success status created_id latency_ms retry_after error body")
+
+
+class Uploader:
+    """Posts data rows for one or more collection folders over a shared connection pool"""
+
+    def __init__(self, env, collection, concurrency=16, url=None, ssl_context=None,
+                 rng=None, verbose=False, retries=5, adaptive=True, registry=None, token_cache=None,
+                 run_log=None, metrics=None, budget=None, account=None):
+        self.env = dict(env)
+        if url:
+            self.env["url"] = url.rstrip("/")
+        self.collection = collection
+        self.concurrency = concurrency
+        self.rng = rng or random.Random()
+        self.verbose = verbose
+        self.retries = retries
+        # AIMD starts at a quarter of the ceiling and probes upwards; without
+        # adaptation the limit simply stays at `concurrency`
+        initial = max(1, concurrency // 4) if adaptive else concurrency
+        self.limiter = AimdLimiter(initial=initial, maximum=concurrency,
+                                   increase=1.0 if adaptive else 0.0,
+                                   decrease=0.5 if adaptive else 1.0)
+        parts = urlsplit(self.env["url"])
+        self.client = HttpClient(f"{parts.scheme}://{parts.netloc}", pool_size=concurrency,
+                                 ssl_context=ssl_context)
+        self.registry = registry
+        self.token_cache = token_cache
+        self.run_log = run_log
+        # Global limit shared with the uploaders of other accounts (rate_limit.FairBudget)
+        self.budget = budget
+        # Name of the account in fan-out runs, used to label metrics
+        self.account = account
+        self.metrics = metrics
+        if metrics is not None:
+            metrics.gauge("in_flight", lambda: self.limiter.in_flight, account or "")
+            metrics.gauge("queue_depth", lambda: self.limiter.waiting, account or "")
+            metrics.gauge("concurrency_limit", lambda: int(self.limiter.limit), account or "")
+        # None while using a token given up front (--token / environment file)
+        self._token_expires_at = None
+        self._auth_lock = asyncio.Lock()
+        # Shared between folders of one run, e.g. projects -> tasks
+        self.context = {"project_ids": []}
+        # Resources already bulk-read in this run: {resource: ids}
+        self._reads = {}
+
+    def _label(self, folder):
+        return (self.account, folder) if self.account else folder
+
+    def _slot(self):
+        """A slot of the shared budget, or nothing without one"""
+        return self.budget.slot(self.account) if self.budget is not None else contextlib.nullcontext()
+
+    def _token_valid(self):
+        if self._token_expires_at is None:
+            return bool(self.env.get("access_token"))
+        return time.time() < self._token_expires_at - REFRESH_MARGIN
+
+    async def authenticate(self, rejected=None):
+        """Get a token, or a fresh one shortly before the current one expires
+
+        `rejected` is a token the server answered with 401. It is replaced once:
+        workers that got the 401 with the same token wait for that refresh
+        instead of each fetching their own.
+        """
+        if rejected is None and self._token_valid():
+            return
+        async with self._auth_lock:
+            if rejected is None and self._token_valid():
+                return
+            if rejected is not None:
+                if self.env.get("access_token") != rejected:
+                    return
+                if self.token_cache is not None:
+                    await asyncio.to_thread(self.token_cache.invalidate, self.env, rejected)
+            fetch = lambda: request_token(self.client, self.env)
+            started = time.perf_counter()
+            if self.token_cache is not None:
+                token, expires_at = await self.token_cache.get_or_fetch(self.env, fetch)
+            else:
+                payload = await fetch()
+                token = payload["access_token"]
+                expires_at = time.time() + float(payload.get("expires_in") or DEFAULT_EXPIRES_IN)
+            if self.metrics is not None:
+                self.metrics.observe("token", (time.perf_counter() - started) * 1000)
+            self.env["access_token"] = token
+            self._token_expires_at = expires_at
+
+    async def prefetch(self, folder):
+        """Run the folder's read-* requests once per run instead of once per row"""
+        for name, request in self.collection[folder].items():
+            if not name.startswith("read-"):
+                continue
+            resource = read_resource(request)
+            if resource not in self._reads:
+                self._reads[resource] = await read_ids(self.client, request, self.env)
+                if self.registry is not None:
+                    self.registry.store_read(resource, self._reads[resource])
+            if resource in READ_CONTEXT_KEYS:
+                self.context[READ_CONTEXT_KEYS[resource]] = self._reads[resource]
+
+    async def send_row(self, folder, row):
+        """Post one row once and return a RowResult"""
+        variables = dict(self.env)
+        variables.update(prepare_row(folder, row, self.context, self.rng))
+        return await self.send_request(folder, *build_request(self.collection[folder]["create"], variables))
+
+    async def send_request(self, folder, method, url, headers, body=b""):
+        """Send one request of a folder and return a RowResult"""
+        parts = urlsplit(url)
+        target = parts.path + (f"?{parts.query}" if parts.query else "")
+
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, target, headers, body)
+        except (OSError, asyncio.TimeoutError, HttpError) as e:
+            latency_ms = (time.perf_counter() - started) * 1000
+            if self.verbose:
+                print(f"❌ {folder}: {e}")
+            return RowResult(False, None, None, latency_ms, None, str(e) or type(e).__name__, None)
+        latency_ms = (time.perf_counter() - started) * 1000
+        if self.metrics is not None:
+            self.metrics.observe("request", latency_ms, self._label(folder))
+
+        success, created_id = parse_response(response.body)
+        error = None
+        if not 200 <= response.status < 300:
+            error = f"HTTP {response.status}"
+        elif not success:
+            error = "Success is false"
+        if error and self.verbose:
+            print(f"❌ {folder}: {error} {response.body[:200]!r}")
+        return RowResult(error is None, response.status, created_id, latency_ms,
+                         parse_retry_after(response.headers), error, response.body)
+
+    async def send_with_retry(self, folder, row, stats, index=None):
+        """Post one row, backing off and retrying on throttling, 5xx and connection errors"""
+        for attempt in range(self.retries + 1):
+            await self.authenticate()
+            waited = time.perf_counter()
+            async with self.limiter, self._slot():
+                if self.metrics is not None:
+                    self.metrics.observe("queue_wait", (time.perf_counter() - waited) * 1000, self._label(folder))
+                token = self.env.get("access_token")
+                result = await self.send_row(folder, row)
+            if self.metrics is not None and not result.success:
+                self.metrics.count("errors", label=self._label(folder))
+            if self.run_log is not None:
+                self.run_log.record(folder, index, result.status, result.latency_ms, result.created_id,
+                                    result.error, result.body, attempt)
+            if result.status == 401 and self._token_expires_at is not None and attempt < self.retries:
+                # Revoked or expired early: fetch a new token and send again
+                await self.authenticate(rejected=token)
+                stats.retries += 1
+                continue
+            retryable = result.status is None or is_retryable(result.status)
+            if result.success or not retryable:
+                if result.success:
+                    self.limiter.on_success()
+                return result
+            self.limiter.on_throttle(result.latency_ms / 1000)
+            if attempt < self.retries:
+                stats.retries += 1
+                await asyncio.sleep(backoff_delay(attempt, retry_after=result.retry_after, rng=self.rng))
+        return result
+
+    async def upload(self, folder, rows, journal=None, done=None, source=None,
+                     resolve=None, created=None, first=0):
+        """Post all rows of a folder, skipping row indexes in `done` and journaling the rest
+
+        `first` is the index of the first row in `rows` when the caller seeked
+        into the data file; rows of `done` before it count as skipped.
+        Created ids are recorded in the registry under (folder, source, row index).
+        For scheduled runs, the async `resolve(row)` fills in parent ids before a
+        row is sent and `created(index, id)` is told about every row's outcome.
+        """
+        if folder not in self.collection or "create" not in self.collection[folder]:
+            raise ValueError(f"Unknown folder '{folder}'")
+        await self.authenticate()
+        await self.prefetch(folder)
+
+        done = done or {}
+        stats = UploadStats(folder)
+        created_ids = [int(i) for i in done.values() if i and str(i).isdigit()]
+        queue = asyncio.Queue(maxsize=self.concurrency * 2)
+
+        async def worker():
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                index, row = item
+                if resolve is not None:
+                    row = await resolve(row)
+                result = await self.send_with_retry(folder, row, stats, index)
+                stats.record(result.success, result.latency_ms)
+                if self.metrics is not None:
+                    self.metrics.count("rows" if result.success else "failed_rows", label=self._label(folder))
+                if created is not None:
+                    created(index, result.created_id if result.success else None)
+                if result.success:
+                    if journal is not None:
+                        journal.record(index, result.created_id)
+                    if result.created_id is not None:
+                        created_ids.append(result.created_id)
+                        if self.registry is not None:
+                            self.registry.record_created(folder, source or folder, index, result.created_id)
+
+        for index in (i for i in done if i < first):
+            stats.skipped += 1
+            if created is not None:
+                created(index, done[index])
+
+        workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+        try:
+            async for index, row in _enumerate(rows, first):
+                if index in done:
+                    stats.skipped += 1
+                    if created is not None:
+                        created(index, done[index])
+                    continue
+                await queue.put((index, row))
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for w in workers:
+                w.cancel()
+        stats.finish()
+        stats.final_limit = int(self.limiter.limit)
+
+        if self.registry is not None:
+            self.registry.flush()
+            created_ids = self.registry.created_ids(folder, source or folder) or created_ids
+        if folder in self._reads:
+            # Keep the bulk read of this run current instead of reading again
+            self._reads[folder] = self._reads[folder] + [i for i in created_ids if i not in self._reads[folder]]
+        if folder == "projects" and created_ids:
+            self.context["project_ids"] = created_ids
+        return stats
+
+    async def close(self):
+        await self.client.close()
+
+
+def print_summary(summary, tag=""):
+    print(f"{tag}📊 {summary['folder']}: {summary['ok']}/{summary['rows']} ok, {summary['failed']} failed, "
+          f"{summary['skipped']} skipped (resumed or existing) in {summary['elapsed_s']}s ({summary['rows_per_s']} rows/s)")
+    print(f"{tag}   latency p50={summary['p50_ms']}ms p95={summary['p95_ms']}ms p99={summary['p99_ms']}ms, "
+          f"{summary['retries']} retries, final concurrency {summary['final_concurrency']}")
+
+
+def data_file_for(folder, args):
+    """--data-file, a --data FOLDER=FILE entry, or the default data file of a folder"""
+    return args.data_file or dict(args.data).get(folder) or resolve_data_file(FOLDER_DATA_MAP[folder])
+
+
+async def run(folders, args, metrics=None, env=None, budget=None):
+    """Upload folders for one account; `env` replaces the --env file, `budget` is
+    a FairBudget shared with other accounts uploading at the same time"""
+    from preflight import CONTENT_FIELDS, preflight
+    env = dict(env) if env is not None else load_environment(args.env)
+    # Output of concurrent accounts is told apart by their namespace
+    tag = f"[{args.namespace}] " if args.namespace else ""
+    collection = load_collection(args.collection)
+    if args.token:
+        env["access_token"] = args.token
+    registry = None if args.no_registry else IdRegistry(args.registry, args.namespace)
+    token_cache = None if args.no_token_cache else TokenCache(args.token_cache)
+    run_log = None
+    if args.run_log:
+        os.makedirs(os.path.dirname(args.run_log) or ".", exist_ok=True)
+        run_log = RunLog(args.run_log, body_sample=args.log_bodies)
+        print(f"{tag}📝 Logging every request to {args.run_log}")
+    uploader = Uploader(env, collection, concurrency=args.concurrency, url=args.url,
+                        rng=random.Random(args.seed), verbose=args.verbose,
+                        retries=args.retries, adaptive=not args.fixed_concurrency,
+                        registry=registry, token_cache=token_cache, run_log=run_log, metrics=metrics,
+                        budget=budget, account=args.namespace or None)
+
+    # Parent folders are read up front so linked rows know how many parents there are
+    parent_rows = {}
+    for folder in folders:
+        if folder in ROW_LINKS and ROW_LINKS[folder][1] in folders:
+            parent = ROW_LINKS[folder][1]
+            parent_rows[parent] = list(iter_rows(data_file_for(parent, args)))
+
+    async def upload_folder(folder, resolve=None, created=None):
+        data_file = data_file_for(folder, args)
+        print(f"{tag}🚀 Uploading folder: {folder} with data file: {data_file}")
+        journal = ProgressJournal(journal_path(data_file, args.namespace, args.shard))
+        done = journal.load() if args.resume else {}
+        if done:
+            print(f"{tag}⏭️  Resuming: {len(done)} rows already acknowledged in {journal.path}")
+        rows = parent_rows.get(folder)
+        if rows is None:
+            rows = load_rows(data_file, follow=args.follow, indexed=args.shard is not None)
+        try:
+            return await upload_rows(folder, data_file, journal, done, rows, resolve, created)
+        finally:
+            # Row indexes and .npz files hold memory maps of the data file
+            if hasattr(rows, "close"):
+                rows.close()
+
+    async def upload_rows(folder, data_file, journal, done, rows, resolve, created):
+        first, end = 0, None
+        if args.shard:
+            first, end = shard_range(len(rows), *args.shard)
+            print(f"{tag}🧩 Shard {args.shard[0]}/{args.shard[1]}: rows {first}-{end - 1} of {len(rows)}")
+        if args.skip_existing and folder in CONTENT_FIELDS:
+            # Rows already on the server (or clashing with entries there) are skipped like resumed ones
+            if hasattr(rows, "iter_rows"):
+                checked = list(rows.iter_rows(first, end))
+            else:
+                rows = checked = rows if isinstance(rows, list) else list(iter_rows(data_file))
+            check = await preflight(uploader, folder, checked, args.allow_overlaps)
+            print(tag + check.report())
+            done = {**{first + index: server_id for index, server_id in check.skip.items()}, **done}
+        if hasattr(rows, "iter_rows"):
+            # Random access (row index or .npz): seek straight past the acknowledged rows
+            resume = resume_point(done, first, len(rows) if end is None else end)
+            if resume > first:
+                print(f"{tag}⏩ Seeking to row {resume}")
+            rows, first = rows.iter_rows(resume, end), resume
+        with journal.open(resume=args.resume):
+            stats = await uploader.upload(folder, rows, journal, done, source=data_file,
+                                          resolve=resolve, created=created, first=first)
+        summary = stats.summary()
+        print_summary(summary, tag)
+        return summary
+
+    try:
+        if args.sequential or len(folders) == 1:
+            summaries = [await upload_folder(folder) for folder in folders]
+        else:
+            print(f"{tag}🗺️  Dependency order: {' -> '.join(dependency_order(folders))}")
+            # Authenticate once before the folders start concurrently
+            await uploader.authenticate()
+            counts = {folder: len(rows) for folder, rows in parent_rows.items()}
+            summaries = await run_graph(folders, counts, upload_folder, uploader.context, uploader.rng)
+    finally:
+        await uploader.close()
+        if registry is not None:
+            registry.close()
+        if run_log is not None:
+            run_log.close()
+    return summaries
+
+
+def _data_file(value):
+    folder, sep, path = value.partition("=")
+    if not sep or folder not in FOLDER_DATA_MAP:
+        raise argparse.ArgumentTypeError("expected <folder>=<data file>")
+    return folder, path
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Upload test_data/*.json to the TimeTac API")
+    parser.add_argument("folders", nargs="+", choices=sorted(FOLDER_DATA_MAP), metavar="folder",
+                        help=f"One or more of: {', '.join(sorted(FOLDER_DATA_MAP))}")
+    parser.add_argument("--env", default=ENVIRONMENT, help="Postman environment file")
+    parser.add_argument("--collection", default=COLLECTION, help="Postman collection file")
+    parser.add_argument("--url", help="Override the environment url (e.g. a local mock server)")
+    parser.add_argument("--token", help="Use this access token instead of the password grant")
+    parser.add_argument("--concurrency", type=int, default=16, help="Max requests in flight")
+    parser.add_argument("--fixed-concurrency", action="store_true",
+                        help="Disable AIMD and always keep --concurrency requests in flight")
+    parser.add_argument("--retries", type=int, default=5, help="Retries per row on 429/5xx/connection errors")
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip rows already acknowledged in <data file>.progress")
+    parser.add_argument("--sequential", action="store_true",
+                        help="Upload folders one after another in the order given instead of "
+                             "scheduling them by dependency")
+    parser.add_argument("--data-file", help="Use this data file instead of FOLDER_DATA_MAP (one folder only)")
+    parser.add_argument("--data", type=_data_file, action="append", default=[], metavar="FOLDER=FILE",
+                        help="Data file for one of several folders (default: FOLDER_DATA_MAP)")
+    parser.add_argument("--shard", type=parse_shard, metavar="K/N",
+                        help="Upload only the K-th of N disjoint row ranges of the data file "
+                             "(builds <data file>.idx if needed, one folder only)")
+    parser.add_argument("--follow", action="store_true",
+                        help="Keep reading an NDJSON data file while its generator is still writing it")
+    parser.add_argument("--skip-existing", action="store_true",
+                        help="Check timetrackings/absences for overlaps and only upload rows that "
+                             "do not exist on the server yet (see preflight.py)")
+    parser.add_argument("--allow-overlaps", action="store_true",
+                        help="With --skip-existing: upload overlapping rows instead of failing/skipping them")
+    parser.add_argument("--registry", default=REGISTRY_FILE, help="SQLite registry of created ids")
+    parser.add_argument("--namespace", default="", help="Registry namespace (e.g. one per account)")
+    parser.add_argument("--no-registry", action="store_true", help="Do not record created ids")
+    parser.add_argument("--token-cache", default=TOKEN_CACHE_FILE,
+                        help="File that shares access tokens between runs and processes")
+    parser.add_argument("--no-token-cache", action="store_true", help="Always fetch a new token")
+    parser.add_argument("--seed", type=int, help="Seed for the random default assignment")
+    parser.add_argument("--json", dest="json_out", help="Write the run summary to this file")
+    parser.add_argument("--run-log", help=f"Append one NDJSON record per request to this file "
+                                          f"(e.g. {RUN_LOG_FILE}, see run_log.py)")
+    parser.add_argument("--log-bodies", type=float, default=0.0,
+                        help="Fraction of successful responses whose body goes into the run log "
+                             "(the first failed ones are always kept)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Log failed requests")
+    add_metrics_arguments(parser)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.data_file and len(args.folders) > 1:
+        parser.error("--data-file can only be used with a single folder")
+    if args.shard and (len(args.folders) > 1 or args.follow):
+        parser.error("--shard splits the data file of a single folder and cannot be used with --follow")
+    if args.skip_existing and args.follow:
+        parser.error("--skip-existing needs the complete data file and cannot be used with --follow")
+
+    from preflight import PreflightError
+    metrics = Metrics() if args.metrics_port is not None or args.stats_interval else None
+    try:
+        with profiled(args.profile, args.tracemalloc), live_metrics(metrics, args.metrics_port,
+                                                                    args.stats_interval):
+            summaries = asyncio.run(run(args.folders, args, metrics))
+    except PreflightError as e:
+        print(f"❌ {e}")
+        return 1
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump(summaries, f, indent=2)
+    return 1 if any(s["failed"] for s in summaries) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
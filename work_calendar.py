@@ -0,0 +1,175 @@
+"""
+Shared working-day calendar for the generator scripts.
+
+A WorkCalendar precomputes, for a date range and a holiday set, a one-byte-per-day
+working-day bitmap, the sorted ordinals of all working days and a prefix count.
+That gives O(1) "is this a working day" lookups and O(1)/O(log n) range queries,
+instead of scanning a holiday list for every user and every day.
+
+Holiday sets are pluggable: AT and DE are computed for any year, more can be
+added with register_holidays() or loaded from a file with one YYYY-MM-DD per line.
+"""
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta
+
+# Flags of a per-user day mask
+VACATION = 1
+SHORT_DAY = 2
+
+
+def easter_sunday(year):
+    """Gregorian Easter Sunday (anonymous Gregorian algorithm)"""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def austrian_holidays(year):
+    """Austrian public holidays"""
+    easter = easter_sunday(year)
+    return [
+        date(year, 1, 1),                # New Year's Day
+        date(year, 1, 6),                # Epiphany
+        easter + timedelta(days=1),      # Easter Monday
+        date(year, 5, 1),                # Labour Day
+        easter + timedelta(days=39),     # Ascension Day
+        easter + timedelta(days=50),     # Whit Monday
+        easter + timedelta(days=60),     # Corpus Christi
+        date(year, 8, 15),               # Assumption Day
+        date(year, 10, 26),              # National Day
+        date(year, 11, 1),               # All Saints' Day
+        date(year, 12, 8),               # Immaculate Conception
+        date(year, 12, 25),              # Christmas Day
+        date(year, 12, 26),              # St. Stephen's Day
+    ]
+
+
+def german_holidays(year):
+    """German nationwide public holidays"""
+    easter = easter_sunday(year)
+    return [
+        date(year, 1, 1),                # New Year's Day
+        easter - timedelta(days=2),      # Good Friday
+        easter + timedelta(days=1),      # Easter Monday
+        date(year, 5, 1),                # Labour Day
+        easter + timedelta(days=39),     # Ascension Day
+        easter + timedelta(days=50),     # Whit Monday
+        date(year, 10, 3),               # German Unity Day
+        date(year, 12, 25),              # Christmas Day
+        date(year, 12, 26),              # Second Day of Christmas
+    ]
+
+
+HOLIDAY_SETS = {
+    "AT": austrian_holidays,
+    "DE": german_holidays,
+}
+
+
+def register_holidays(region, holidays_for_year):
+    """Add a holiday set: a function year -> list of dates"""
+    HOLIDAY_SETS[region] = holidays_for_year
+
+
+def load_holiday_file(path):
+    """Holiday set from a file with one YYYY-MM-DD per line (# starts a comment)"""
+    dates = []
+    with open(path) as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if line:
+                dates.append(datetime.strptime(line, "%Y-%m-%d").date())
+    return lambda year: [d for d in dates if d.year == year]
+
+
+def _ordinal(day):
+    return day.toordinal()
+
+
+class WorkCalendar:
+    """Precomputed working-day index for [start, end] and one holiday set"""
+
+    def __init__(self, start, end, region="AT", extra_holidays=()):
+        holidays_for_year = HOLIDAY_SETS[region] if isinstance(region, str) else region
+        self.first = _ordinal(start)
+        self.last = _ordinal(end)
+        size = max(0, self.last - self.first + 1)
+
+        holiday_ordinals = {_ordinal(d) for d in extra_holidays}
+        for year in range(start.year, end.year + 1):
+            holiday_ordinals.update(_ordinal(d) for d in holidays_for_year(year))
+        self._holiday_ordinals = frozenset(o for o in holiday_ordinals if self.first <= o <= self.last)
+        self.holidays = [date.fromordinal(o) for o in sorted(self._holiday_ordinals)]
+
+        # date.fromordinal(1) is a Monday, so (ordinal - 1) % 7 is the weekday
+        self._working = bytearray(size)
+        self._ordinals = array("l")
+        self._prefix = array("l", [0]) * (size + 1)
+        count = 0
+        for offset in range(size):
+            ordinal = self.first + offset
+            if (ordinal - 1) % 7 < 5 and ordinal not in holiday_ordinals:
+                self._working[offset] = 1
+                self._ordinals.append(ordinal)
+                count += 1
+            self._prefix[offset + 1] = count
+
+    def __len__(self):
+        return len(self._ordinals)
+
+    def _offset(self, day):
+        offset = _ordinal(day) - self.first
+        if not 0 <= offset < len(self._working):
+            raise ValueError(f"{day} is outside the calendar range")
+        return offset
+
+    def is_working_day(self, day):
+        """O(1) lookup"""
+        return bool(self._working[self._offset(day)])
+
+    def is_holiday(self, day):
+        return _ordinal(day) in self._holiday_ordinals
+
+    def count_working_days(self, start, end):
+        """Number of working days in [start, end], O(1)"""
+        lo = max(_ordinal(start), self.first) - self.first
+        hi = min(_ordinal(end), self.last) - self.first
+        if hi < lo:
+            return 0
+        return self._prefix[hi + 1] - self._prefix[lo]
+
+    def working_ordinals(self, start=None, end=None):
+        """Sorted ordinals of the working days in [start, end]"""
+        lo = 0 if start is None else bisect_left(self._ordinals, _ordinal(start))
+        hi = len(self._ordinals) if end is None else bisect_right(self._ordinals, _ordinal(end))
+        return self._ordinals[lo:hi]
+
+    def working_days(self, start=None, end=None):
+        """Working days in [start, end] as datetimes (the type the generators use)"""
+        return [datetime.fromordinal(o) for o in self.working_ordinals(start, end)]
+
+    def user_mask(self, vacation_days=(), short_days=()):
+        """Per-user flags for every day of the range: VACATION and/or SHORT_DAY"""
+        mask = bytearray(len(self._working))
+        for day in vacation_days:
+            mask[self._offset(day)] |= VACATION
+        for day in short_days:
+            mask[self._offset(day)] |= SHORT_DAY
+        return mask
+
+    def mark(self, mask, day, flag):
+        """Set a flag for one day in a mask built by user_mask()"""
+        mask[self._offset(day)] |= flag
+
+    def flags(self, mask, day):
+        """O(1) lookup in a mask built by user_mask(); days outside the range raise ValueError"""
+        return mask[self._offset(day)]